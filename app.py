@@ -1,70 +1,208 @@
+import config
+
+# Cooperative backends have to patch the stdlib (threading, socket, time)
+# before Flask or any of our modules create locks or sockets.
+if config.ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif config.ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 from flask import Flask, request, jsonify, send_from_directory, Response
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import cv2
-import threading
+import atexit
+import logging
+import os
 import time
 
+from controller_protocol import ControllerUpdate, ProtocolError
+from controllers import ControllerTable, DEFAULT_CONTROLLER, DEFAULT_HANDS, compact
+from journal import Journal
+from metrics import Metrics
+from registry import Registry
+from room_ticker import RoomTicker
+from room_simulation import SimulationHost
+from static_assets import StaticIndex
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'flick-games-secret!'
 
+def message_queue_options():
+    """Socket.IO options that bridge emits between cluster workers, if any."""
+    url = config.MESSAGE_QUEUE
+    if not url:
+        return {}
+    if url.startswith('flick://'):
+        from backplane import BackplaneManager
+        return {'client_manager': BackplaneManager(url)}
+    return {'message_queue': url}
+
 # Initialize Socket.IO for real-time multiplayer
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Backend comes from FLICK_ASYNC_MODE (see config.py)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=config.ASYNC_MODE,
+                    **message_queue_options())
 
 # ========== DATA STORES ==========
-joystick_data = {"x": 0, "y": 0, "sw": 0}
-flick_data = None
-punch_data = None
-aim_data = {"x": 0.5, "y": 0.5}
-hands_data = {"left": {"x": 0.3, "y": 0.5}, "right": {"x": 0.7, "y": 0.5}}
-active_game = None
-game_state = {"status": "waiting", "message": "Show high-five to start"}  # waiting, countdown, playing, paused
+# Joystick/aim/hands/gestures/game state, one compact record per controller
+controllers = ControllerTable(config.MAX_CONTROLLERS)
 
 # ========== MULTIPLAYER STATE ==========
-players = {}  # {session_id: {name, game, room, hands, score, ...}}
-rooms = {}    # {room_code: {game, players: [], state: {}}}
+# Player/Room records by session id and room code, with a deadline heap for eviction
+registry = Registry(config.SESSION_IDLE_TIMEOUT, config.HEARTBEAT_TIMEOUT)
+
+# ========== METRICS ==========
+# Gesture latency per stage, from the wall-clock stamps each hop adds:
+# t_capture (camera frame) -> timestamp (detected) -> t_server (received)
+# -> emitted -> t_client (browser handled it, sent back in 'gesture_ack')
+metrics = Metrics()
+metrics.histogram('capture_to_detect_ms', 'Camera capture to gesture detected')
+metrics.histogram('detect_to_server_ms', 'Gesture detected to received by the server')
+metrics.histogram('server_emit_ms', 'Received by the server to emitted to subscribers')
+metrics.histogram('server_to_client_ms', 'Emitted by the server to handled by the browser')
+metrics.histogram('capture_to_client_ms', 'Camera capture to handled by the browser')
+metrics.histogram('ack_roundtrip_ms', 'Server receipt to browser ack received (one clock)')
+metrics.gauge('players', 'Connected players', lambda: len(registry))
+metrics.gauge('rooms', 'Open rooms', lambda: registry.room_count)
+metrics.gauge('session_deadlines', 'Entries in the session sweeper heap',
+              lambda: registry.pending_deadlines)
+metrics.gauge('sessions_evicted_total', 'Sessions evicted by the sweeper',
+              lambda: registry.evicted_total, kind='counter')
+metrics.gauge('controllers', 'Known controllers', lambda: len(controllers))
+
+# Handler events go to a background-written journal instead of print()
+journal = Journal(config.JOURNAL_PATH, config.JOURNAL_LEVEL, config.JOURNAL_MAX_BYTES,
+                  config.JOURNAL_BACKUPS, config.JOURNAL_QUEUE, config.JOURNAL_CONSOLE,
+                  config.JOURNAL_SAMPLE).start()
+atexit.register(journal.stop)
+metrics.gauge('journal_dropped', 'Journal events dropped on a full queue', lambda: journal.dropped)
+def emit_snapshot(room, snapshot):
+    socketio.emit('room_snapshot', snapshot, room=room)
+
+# Latest-wins hands/ball state per player, one 'room_snapshot' per room per tick
+ticker = RoomTicker(emit_snapshot, config.TICK_RATE) if config.TICK_RATE > 0 else None
+
+def emit_simulation(room, snapshot, hits):
+    for hit in hits:
+        socketio.emit('got_punched', hit, room=room, skip_sid=hit['by'])
+    if snapshot is not None:
+        socketio.emit('sim_snapshot', snapshot, room=room)
+
+# Optional server-owned ball state and hit resolution (FLICK_SIMULATION=1)
+simulation = (SimulationHost(emit_simulation, config.SIM_TICK_RATE)
+              if config.SIMULATION else None)
+
+def forget_in_room(room, sid):
+    """Drop per-room state of a player who left; free it once the room is gone."""
+    if ticker:
+        ticker.discard(room, sid)
+    if simulation:
+        sim = simulation.room(room)
+        if sim:
+            sim.remove(sid)
+        if registry.get_room(room) is None:
+            simulation.drop(room)
 
 # ========== VIDEO STREAMING ==========
-camera = None
-camera_lock = threading.Lock()
-latest_frame = None
-
-def generate_frames():
-    """Generator for video streaming - optimized for smooth playback."""
-    global latest_frame
-    while True:
-        if latest_frame is not None:
-            ret, buffer = cv2.imencode('.jpg', latest_frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
-            if ret:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        time.sleep(0.016)
-
-@app.route('/video_feed')
-def video_feed():
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
-
-@app.route('/video_frame', methods=['POST'])
-def receive_frame():
-    global latest_frame
-    import base64
-    import numpy as np
-    
-    data = request.json
-    if data and 'frame' in data:
-        img_data = base64.b64decode(data['frame'])
-        nparr = np.frombuffer(img_data, np.uint8)
-        latest_frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    return {"status": "ok"}
+# FLICK_VIDEO=0 is the no-video profile: no frame buffer or video routes.
+# OpenCV/NumPy are never imported at startup in either profile;
+# video_stream only loads them the first time a frame needs transcoding.
+frames = None
+frames_dropped = 0
+
+def store_frame(jpeg):
+    """
+    Publish the newest encoded frame; it is never decoded on the server.
+
+    Without a frame buffer (the no-video profile, or a cluster worker
+    other than 0) the frame is counted and dropped. The first drop is
+    journaled so the misrouting is visible. Returns whether it was kept.
+    """
+    global frames_dropped
+    if not jpeg:
+        return False
+    if frames is None:
+        if not frames_dropped:
+            journal.event('frame_dropped', logging.WARNING, reason='no video on this server',
+                          worker=config.WORKER_INDEX)
+        frames_dropped += 1
+        return False
+    frames.publish(jpeg)
+    return True
+
+metrics.gauge('video_frames_dropped', 'Frames received where no video is served',
+              lambda: frames_dropped, kind='counter')
+
+if config.VIDEO:
+    from video_stream import FrameBroadcaster, BOUNDARY, quality_levels
+
+    def off_hub(async_mode):
+        """Runs a transcode on a real thread under eventlet/gevent; None under threading."""
+        if async_mode == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute
+        if async_mode == 'gevent':
+            import gevent
+            return lambda fn, *args: gevent.get_hub().threadpool.apply(fn, args)
+        return None
+
+    # Newest encoded JPEG, fanned out to every viewer at a quality its link keeps up with
+    frames = FrameBroadcaster(quality_levels(config.VIDEO_MAX_FPS, config.VIDEO_MIN_FPS,
+                                             config.VIDEO_MIN_QUALITY, config.VIDEO_MIN_SCALE,
+                                             config.VIDEO_QUALITY_STEPS),
+                              off_hub(socketio.async_mode))
+    metrics.gauge('video_viewers', 'Connected /video_feed viewers', lambda: len(frames.viewers()))
+    metrics.gauge('video_viewer_level', 'Quality level per viewer (0 = full quality)',
+                  lambda: {v['id']: v['level'] for v in frames.viewers()}, label='viewer')
+    metrics.gauge('video_viewer_kbytes_per_sec', 'Measured send rate per viewer',
+                  lambda: {v['id']: v['kbytes_per_sec'] for v in frames.viewers()}, label='viewer')
+    metrics.gauge('video_viewer_dropped', 'Stale frames skipped per viewer',
+                  lambda: {v['id']: v['dropped'] for v in frames.viewers()}, label='viewer')
+
+    @app.route('/video_feed')
+    def video_feed():
+        return Response(frames.stream(),
+                        mimetype='multipart/x-mixed-replace; boundary=' + BOUNDARY.decode())
+
+    @app.route('/video_frame', methods=['POST'])
+    def receive_frame():
+        if request.mimetype == 'image/jpeg':
+            # Raw JPEG body - the fast path used by gptScript1.py
+            store_frame(request.get_data())
+        else:
+            # Legacy JSON body with a base64 JPEG
+            import base64
+            import binascii
+            data = request.get_json(silent=True)
+            if data and 'frame' in data:
+                try:
+                    store_frame(base64.b64decode(data['frame'], validate=True))
+                except (binascii.Error, TypeError, ValueError):
+                    return {"status": "error", "message": "frame must be base64-encoded JPEG"}, 400
+        return {"status": "ok"}
 
 # ========== CORS HANDLING ==========
 @app.after_request
 def add_cors_headers(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS, DELETE'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Controller-Id, If-None-Match'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag, X-State-Version, Deprecation'
+    return response
+
+@app.after_request
+def count_request(response):
+    metrics.requests.inc(request.url_rule.rule if request.url_rule else 'unmatched', request.method)
     return response
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route("/metrics.json", methods=["GET"])
+def get_metrics_json():
+    return jsonify(metrics.summary())
+
 @app.route("/flick", methods=["OPTIONS"])
 @app.route("/joystick", methods=["OPTIONS"])
 @app.route("/video_frame", methods=["OPTIONS"])
@@ -73,166 +211,410 @@ def add_cors_headers(response):
 @app.route("/hands", methods=["OPTIONS"])
 @app.route("/game", methods=["OPTIONS"])
 @app.route("/game_state", methods=["OPTIONS"])
+@app.route("/bind", methods=["OPTIONS"])
+@app.route("/controller_update", methods=["OPTIONS"])
 def handle_options():
     return '', 204
 
+# ========== CONTROLLER ROUTING ==========
+# A controller (one camera running gptScript1.py) is bound either to the
+# player socket of the game page it drives, or directly to a room code.
+
+def controller_id():
+    """Which controller an HTTP request came from (header or ?controller=)."""
+    return request.headers.get('X-Controller-Id') or request.args.get('controller') or DEFAULT_CONTROLLER
+
+def current_controller():
+    return controllers.get(controller_id())
+
+def emit_from_controller(event, data, to_opponents=False):
+    """
+    Emit an event produced by a controller's HTTP request.
+
+    Bound controllers reach only their own room, so fan-out is O(room
+    size); with to_opponents=True the bound player's own socket is
+    skipped. Unbound controllers keep the old send-to-everyone behaviour.
+    """
+    kind, target, *bound_room = current_controller().binding or (None, None)
+    if kind is None:
+        socketio.emit(event, data)
+        return
+    skip_sid = None
+    if kind == 'player':
+        # A binding made over HTTP names the room: in a cluster the player's
+        # registry entry lives on the room's worker, not necessarily this one
+        room = bound_room[0] if bound_room else registry.room_of(target)
+        if room is None:
+            # Player hasn't joined a room yet: only their own page listens
+            if not to_opponents:
+                socketio.emit(event, data, to=target)
+            return
+        if to_opponents:
+            skip_sid = target
+    else:
+        room = target
+    socketio.emit(event, data, room=room, skip_sid=skip_sid)
+
+def versioned_state(field, body):
+    """
+    GET handler for one piece of controller state, with long-poll and ETags.
+
+    ?since=<version> blocks until the state changes (or the timeout
+    passes, answered with 304), so pollers only wake up for news. A
+    matching If-None-Match gets a 304 too. The version travels in the
+    ETag and X-State-Version headers.
+    """
+    controller = current_controller()
+    since = request.args.get('since', type=int)
+    if since is not None:
+        timeout = request.args.get('timeout', config.LONG_POLL_TIMEOUT, type=float)
+        version = controller.wait_for_change(field, since, min(max(timeout, 0.0), config.LONG_POLL_TIMEOUT))
+    else:
+        version = controller.versions[field]
+    etag = f"{field}-{version}"
+    if version == since or request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(body(controller))
+    response.set_etag(etag)
+    response.headers['X-State-Version'] = str(version)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route("/bind", methods=["POST"])
+def bind_controller():
+    """
+    Bind the calling controller to a room code: {"room": "boxing-default"}.
+
+    A game page adds its player (Socket.IO session id) so opponent events
+    skip its own socket: {"room": ..., "player": sid}. Unlike the
+    'bind_controller' socket message, this reaches the controller's
+    worker in a cluster.
+    """
+    data = request.get_json(silent=True) or {}
+    room, player = data.get('room'), data.get('player')
+    if not isinstance(room, str) or not room:
+        return {"status": "error", "message": "room is required"}, 400
+    if player is not None and not isinstance(player, str):
+        return {"status": "error", "message": "player must be a session id"}, 400
+    current_controller().binding = ('player', player, room) if player else ('room', room)
+    return {"status": "ok", "controller": controller_id(), "room": room}
+
+@app.route("/bind", methods=["DELETE"])
+def unbind_controller():
+    current_controller().binding = None
+    return {"status": "ok"}
+
 # ========== JOYSTICK ENDPOINTS ==========
 @app.route("/joystick", methods=["POST"])
 def update_joystick():
-    global joystick_data
-    joystick_data = request.json
+    current_controller().set_joystick(request.json)
     return {"status": "ok"}
 
 @app.route("/joystick", methods=["GET"])
 def get_joystick():
-    return jsonify(joystick_data)
+    return jsonify(current_controller().joystick)
+
+# ========== GESTURE EVENT STREAM ==========
+def gesture_room(cid, kind):
+    """Socket.IO room that receives one controller's events of one gesture type."""
+    return f"gestures:{cid}:{kind}"
+
+def publish_gesture(kind, data):
+    """Append a gesture to the controller's log and push it to its subscribers."""
+    received = time.time()
+    controller = current_controller()
+    data = compact(data)
+    record_gesture_latency(data, received)
+    data['t_server'] = received
+    event = controller.gestures.append(kind, data)
+    socketio.emit('gesture_event', event, room=gesture_room(controller.id, kind))
+    metrics.observe_ms('server_emit_ms', time.time() - received)
+    return event
+
+def record_gesture_latency(data, received):
+    """Observe the controller-side stages from the stamps gptScript1.py sends."""
+    captured, detected = data.get('t_capture'), data.get('timestamp')
+    if isinstance(captured, (int, float)) and isinstance(detected, (int, float)):
+        metrics.observe_ms('capture_to_detect_ms', detected - captured)
+    if isinstance(detected, (int, float)):
+        metrics.observe_ms('detect_to_server_ms', received - detected)
+
+def parse_seq(value):
+    """A client-supplied gesture seq as a non-negative int, or None if it isn't one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+def read_gestures(kind):
+    """
+    GET handler shared by /flick and /punch.
+
+    With ?since=N the caller gets every event after N plus the current seq
+    to resume from. Without it, keep the old one-event-per-poll behaviour,
+    but walk the log in order so back-to-back gestures are not dropped.
+
+    The no-since form is deprecated: its read position is one cursor per
+    controller on the server, so two pages polling the same controller
+    still split its events between them. The games in public/ only use
+    ?since=; responses to the old form carry a Deprecation header.
+    """
+    controller = current_controller()
+    log = controller.gestures
+    raw_since = request.args.get('since')
+    if raw_since is not None:
+        since = parse_seq(raw_since)
+        if since is None:
+            return {"status": "error", "message": "since must be a non-negative integer"}, 400
+        return jsonify({"seq": log.seq, "events": log.since(since, (kind,))})
+    event = log.next_after(controller.legacy_cursors[kind], kind)
+    if event is not None:
+        controller.legacy_cursors[kind] = event['seq']
+    response = jsonify(event['data'] if event else None)
+    response.headers['Deprecation'] = 'true'
+    return response
 
 # ========== FLICK GESTURE ENDPOINTS ==========
+def apply_flick(data):
+    flick_data = publish_gesture('flick', data)['data']
+    journal.event('flick', controller=controller_id(), vx=flick_data.get('vx', 0),
+                  vy=flick_data.get('vy', 0), hand=flick_data.get('hand'))
+    # Send flick to the opponents in this controller's room
+    emit_from_controller('opponent_flick', flick_data, to_opponents=True)
+
 @app.route("/flick", methods=["POST"])
 def receive_flick():
-    global flick_data
-    flick_data = request.json
-    print(f"🏀 Flick: vx={flick_data.get('vx', 0):.2f}, vy={flick_data.get('vy', 0):.2f}")
-    # Broadcast flick to all players in the room
-    socketio.emit('opponent_flick', flick_data, broadcast=True)
+    apply_flick(request.json)
     return {"status": "ok"}
 
 @app.route("/flick", methods=["GET"])
 def get_flick():
-    global flick_data
-    if flick_data:
-        result = flick_data
-        flick_data = None
-        return jsonify(result)
-    return jsonify(None)
+    return read_gestures('flick')
 
 # ========== PUNCH GESTURE ENDPOINTS (Boxing) ==========
-@app.route("/punch", methods=["POST"])
-def receive_punch():
-    global punch_data
-    punch_data = request.json
+def apply_punch(data):
+    punch_data = publish_gesture('punch', data)['data']
     hand = punch_data.get('hand', 'Unknown')
     power = punch_data.get('power', 0)
-    print(f"🥊 Punch ({hand}): power={power:.2f}")
-    # Broadcast punch to opponent
-    socketio.emit('opponent_punch', punch_data, broadcast=True)
+    journal.event('punch', controller=controller_id(), hand=hand, power=power)
+    # Send punch to the opponents in this controller's room
+    emit_from_controller('opponent_punch', punch_data, to_opponents=True)
+
+@app.route("/punch", methods=["POST"])
+def receive_punch():
+    apply_punch(request.json)
     return {"status": "ok"}
 
 @app.route("/punch", methods=["GET"])
 def get_punch():
-    global punch_data
-    if punch_data:
-        result = punch_data
-        punch_data = None
-        return jsonify(result)
-    return jsonify(None)
+    return read_gestures('punch')
 
 # ========== AIM POSITION ENDPOINTS ==========
 @app.route("/aim", methods=["POST"])
 def receive_aim():
-    global aim_data
-    aim_data = request.json
+    current_controller().set_aim(request.json)
     return {"status": "ok"}
 
 @app.route("/aim", methods=["GET"])
 def get_aim():
-    return jsonify(aim_data)
+    return versioned_state('aim', lambda c: c.aim)
 
 # ========== HANDS POSITION ENDPOINTS ==========
+def apply_hands(data):
+    controller = current_controller()
+    controller.set_hands(data)
+    # Send hand positions to the opponents in this controller's room (boxing)
+    emit_from_controller('opponent_hands', controller.hands, to_opponents=True)
+
 @app.route("/hands", methods=["POST"])
 def receive_hands():
-    global hands_data
-    hands_data = request.json
-    # Broadcast hand positions to opponent for boxing
-    socketio.emit('opponent_hands', hands_data, broadcast=True)
+    apply_hands(request.json)
     return {"status": "ok"}
 
 @app.route("/hands", methods=["GET"])
 def get_hands():
-    return jsonify(hands_data)
+    return versioned_state('hands', lambda c: c.hands)
 
 # ========== GAME STATE ENDPOINTS (auto start/pause) ==========
+def apply_game_state(data):
+    controller = current_controller()
+    controller.set_game_state(data)
+    game_state = controller.game_state
+    journal.event('game_state', controller=controller.id, status=game_state.get('status'),
+                  message=game_state.get('message', ''))
+    # Tell every game page in this controller's room
+    emit_from_controller('game_state_change', game_state)
+
 @app.route("/game_state", methods=["POST"])
 def update_game_state():
-    global game_state
     data = request.json
     if data:
-        game_state = data
-        print(f"🎮 Game state: {game_state.get('status')} - {game_state.get('message', '')}")
-        # Broadcast to all connected games
-        socketio.emit('game_state_change', game_state, broadcast=True)
+        apply_game_state(data)
     return {"status": "ok"}
 
 @app.route("/game_state", methods=["GET"])
 def get_game_state():
-    return jsonify(game_state)
+    return versioned_state('game_state', lambda c: c.game_state)
 
 # ========== ACTIVE GAME REGISTRATION ==========
 @app.route("/game", methods=["POST"])
 def register_game():
-    global active_game
+    controller = current_controller()
     data = request.json
-    active_game = data.get('game') if data else None
-    print(f"🎮 Active game: {active_game}")
-    return {"status": "ok", "game": active_game}
+    controller.set_active_game(data.get('game') if data else None)
+    journal.event('game_open', controller=controller.id, game=controller.active_game)
+    return {"status": "ok", "game": controller.active_game}
 
 @app.route("/game", methods=["GET"])
 def get_game():
-    return jsonify({"game": active_game})
+    return versioned_state('active_game', lambda c: {"game": c.active_game})
 
 @app.route("/game", methods=["DELETE"])
 def unregister_game():
-    global active_game
-    print(f"🎮 Game closed: {active_game}")
-    active_game = None
+    controller = current_controller()
+    journal.event('game_close', controller=controller.id, game=controller.active_game)
+    controller.set_active_game(None)
     return {"status": "ok"}
 
+# ========== COMBINED CONTROLLER UPDATE ==========
+def apply_controller_update(body):
+    """
+    Decode one frame's controller_protocol update and apply every part.
+
+    The reply piggybacks what the controller would otherwise poll for:
+    the active game, the game state and their versions. "video" says
+    whether this server keeps frames; a controller told false should
+    post them to /video_frame instead (cluster.py routes that to the
+    worker that serves video).
+    """
+    try:
+        update = ControllerUpdate.decode(body)
+    except ProtocolError as exc:
+        return {"status": "error", "message": str(exc)}, 400
+    controller = current_controller()
+    if update.aim:
+        controller.set_aim(update.aim)
+    if update.hands:
+        apply_hands(update.hands)
+    # A retried update can repeat events that were already applied. Seqs
+    # are shared by flicks and punches, so both are applied in seq order.
+    duplicates = 0
+    events = sorted([(event.get('seq', 0), apply_flick, event) for event in update.flicks]
+                    + [(event.get('seq', 0), apply_punch, event) for event in update.punches],
+                    key=lambda item: item[0])
+    for seq, apply, event in events:
+        event.pop('seq', None)
+        if controller.fresh_event(update.sender, seq):
+            apply(event)
+        else:
+            duplicates += 1
+    if update.game_state:
+        apply_game_state(update.game_state)
+    if update.jpeg:
+        store_frame(update.jpeg)
+    return {"status": "ok", "game": controller.active_game, "game_state": controller.game_state,
+            "versions": dict(controller.versions), "video": frames is not None,
+            "duplicates": duplicates}, 200
+
+@app.route("/controller_update", methods=["POST"])
+def receive_controller_update():
+    return apply_controller_update(request.get_data())
+
+@socketio.on('controller_update')
+def handle_controller_update(data):
+    """Binary socket message with one update; the reply comes back as the ack."""
+    if not isinstance(data, (bytes, bytearray)):
+        return {"status": "error", "message": "expected a binary controller update"}
+    return apply_controller_update(data)[0]
+
+# ========== BACKGROUND TASKS ==========
+background_started = False
+
+def socket_connected(sid):
+    return socketio.server.manager.is_connected(sid, '/')
+
+def reap_sessions():
+    """Background task: evict sessions that went silent or vanished without a disconnect."""
+    while True:
+        socketio.sleep(config.REAP_INTERVAL)
+        evicted = registry.reap_stale(is_alive=socket_connected)
+        for sid, room in evicted:
+            if room:
+                forget_in_room(room, sid)
+                socketio.emit('player_left', {'id': sid}, room=room)
+            if socket_connected(sid):
+                # Heartbeats stopped but the transport hasn't noticed yet
+                socketio.server.disconnect(sid, namespace='/')
+        if evicted:
+            journal.event('reaped', logging.WARNING, sessions=len(evicted))
+
+def start_background_tasks():
+    """Start the reaper, room ticker and simulation with the first connection."""
+    global background_started
+    if not background_started:
+        background_started = True
+        socketio.start_background_task(reap_sessions)
+        if ticker:
+            socketio.start_background_task(ticker.run, socketio.sleep)
+        if simulation:
+            socketio.start_background_task(simulation.run, socketio.sleep)
+
 # ========== SOCKET.IO EVENTS (Multiplayer) ==========
 @socketio.on('connect')
 def handle_connect():
-    print(f"🔌 Player connected: {request.sid}")
-    players[request.sid] = {
-        'id': request.sid,
-        'name': f'Player {len(players) + 1}',
-        'room': None,
-        'score': 0,
-        'hands': hands_data.copy()
-    }
-    emit('player_id', {'id': request.sid, 'playerNum': len(players)})
+    role = request.args.get('role')
+    journal.event('connect', sid=request.sid, role=role)
+    start_background_tasks()
+    if role == 'gestures':
+        # A page's second socket, only for subscribe_gestures: not a player
+        return
+    registry.add_player(request.sid, DEFAULT_HANDS)
+    emit('player_id', {'id': request.sid, 'playerNum': len(registry),
+                       'heartbeat': config.HEARTBEAT_INTERVAL})
+
+@socketio.on('heartbeat')
+def handle_heartbeat(data=None):
+    """Sent every 'heartbeat' seconds by the game pages; keeps the session alive."""
+    registry.heartbeat(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f"🔌 Player disconnected: {request.sid}")
-    if request.sid in players:
-        room = players[request.sid].get('room')
-        if room and room in rooms:
-            rooms[room]['players'].remove(request.sid)
-            emit('player_left', {'id': request.sid}, room=room)
-        del players[request.sid]
+    journal.event('disconnect', sid=request.sid)
+    room = registry.remove(request.sid)
+    if room:
+        forget_in_room(room, request.sid)
+        emit('player_left', {'id': request.sid}, room=room)
 
 @socketio.on('join_room')
 def handle_join_room(data):
     room_code = data.get('room', 'default')
     game = data.get('game', 'unknown')
-    
-    if room_code not in rooms:
-        rooms[room_code] = {
-            'game': game,
-            'players': [],
-            'state': {'scores': {}, 'turn': 0}
-        }
-    
+
+    previous = registry.room_of(request.sid)
+    room = registry.join(request.sid, room_code, game)
+    if room is None:
+        return
+    if previous and previous != room_code:
+        leave_room(previous)
+        forget_in_room(previous, request.sid)
+        emit('player_left', {'id': request.sid}, room=previous)
     join_room(room_code)
-    rooms[room_code]['players'].append(request.sid)
-    players[request.sid]['room'] = room_code
-    
-    player_count = len(rooms[room_code]['players'])
-    print(f"🚪 Player joined room '{room_code}' ({player_count} players)")
+    sim = simulation.room(room_code, room.game) if simulation else None
+
+    player_ids = room.player_ids()
+    player_count = len(player_ids)
+    journal.event('join_room', sid=request.sid, room=room_code, game=room.game, players=player_count)
     
     emit('room_joined', {
         'room': room_code,
         'playerNum': player_count,
-        'players': rooms[room_code]['players']
+        'players': player_ids,
+        # Pages only send ball/hit events the server would act on
+        'simulated': sim is not None
     })
     emit('player_joined', {
         'id': request.sid,
@@ -244,17 +626,80 @@ def handle_leave_room(data):
     room_code = data.get('room')
     if room_code:
         leave_room(room_code)
-        if room_code in rooms and request.sid in rooms[room_code]['players']:
-            rooms[room_code]['players'].remove(request.sid)
+        if registry.room_of(request.sid) == room_code:
+            registry.leave(request.sid)
+        forget_in_room(room_code, request.sid)
         emit('player_left', {'id': request.sid}, room=room_code)
 
+@socketio.on('bind_controller')
+def handle_bind_controller(data):
+    """
+    A game page claims a controller: its gestures now go to this player's room.
+
+    Only valid when the controller lives in this process; pages bind with
+    POST /bind so it also works behind cluster.py.
+    """
+    cid = (data or {}).get('controller') or DEFAULT_CONTROLLER
+    controllers.get(cid).binding = ('player', request.sid)
+    emit('controller_bound', {'controller': cid})
+
+@socketio.on('video_frame')
+def handle_video_frame(data):
+    """Binary socket message carrying one raw JPEG frame."""
+    if not isinstance(data, (bytes, bytearray)):
+        return {"status": "error", "message": "expected a binary JPEG frame"}
+    store_frame(bytes(data))
+
+@socketio.on('subscribe_gestures')
+def handle_subscribe_gestures(data):
+    """
+    Push flick/punch events to this socket instead of HTTP polling.
+
+    On reconnect the client sends the last seq it processed and gets the
+    missed backlog right away; a fresh client omits it and only receives
+    the current seq. Live events then arrive as 'gesture_event' pushes.
+    """
+    data = data or {}
+    since = data.get('since')
+    if since is not None:
+        since = parse_seq(since)
+        if since is None:
+            return {"status": "error", "message": "since must be a non-negative integer"}
+    controller = controllers.get(data.get('controller') or DEFAULT_CONTROLLER)
+    kinds = [k for k in data.get('types', ['flick', 'punch']) if k in controller.legacy_cursors]
+    for kind in kinds:
+        join_room(gesture_room(controller.id, kind))
+    log = controller.gestures
+    emit('gesture_events', {
+        'seq': log.seq,
+        'events': log.since(since, kinds) if since is not None else []
+    })
+
+@socketio.on('gesture_ack')
+def handle_gesture_ack(data):
+    """A game page handled a pushed gesture: {seq, t_server, t_capture, t_client}."""
+    data = compact(data)
+    now = time.time()
+    sent, handled = data.get('t_server'), data.get('t_client')
+    if not isinstance(sent, (int, float)):
+        return
+    metrics.observe_ms('ack_roundtrip_ms', now - sent)
+    if isinstance(handled, (int, float)):
+        metrics.observe_ms('server_to_client_ms', handled - sent)
+        captured = data.get('t_capture')
+        if isinstance(captured, (int, float)):
+            metrics.observe_ms('capture_to_client_ms', handled - captured)
+
 @socketio.on('update_hands')
 def handle_update_hands(data):
     """Real-time hand position updates for boxing."""
-    if request.sid in players:
-        players[request.sid]['hands'] = data
-        room = players[request.sid].get('room')
-        if room:
+    player = registry.touch(request.sid)
+    if player:
+        player.hands = data
+        room = player.room
+        if room and ticker:
+            ticker.update(room, request.sid, 'hands', data)
+        elif room:
             emit('opponent_hands', {
                 'id': request.sid,
                 'hands': data
@@ -263,9 +708,10 @@ def handle_update_hands(data):
 @socketio.on('update_score')
 def handle_update_score(data):
     """Score updates for basketball/minigolf."""
-    if request.sid in players:
-        players[request.sid]['score'] = data.get('score', 0)
-        room = players[request.sid].get('room')
+    player = registry.touch(request.sid)
+    if player:
+        player.score = data.get('score', 0)
+        room = player.room
         if room:
             emit('score_update', {
                 'id': request.sid,
@@ -275,19 +721,42 @@ def handle_update_score(data):
 @socketio.on('punch_hit')
 def handle_punch_hit(data):
     """When a punch lands on opponent."""
-    room = players.get(request.sid, {}).get('room')
-    if room:
+    registry.touch(request.sid)
+    room = registry.room_of(request.sid)
+    sim = simulation.room(room) if simulation and room else None
+    if sim:
+        # The server decides whether the hit counts; it goes out with the next tick
+        sim.punch(request.sid, data.get('hand'), data.get('power'))
+    elif room:
         emit('got_punched', {
             'by': request.sid,
             'hand': data.get('hand'),
             'power': data.get('power')
         }, room=room, include_self=False)
 
+def vector(value):
+    """{x, y, z} payload from the browser as a list (missing = zero)."""
+    value = value or {}
+    return [float(value.get(axis, 0.0)) for axis in ('x', 'y', 'z')]
+
 @socketio.on('ball_update')
 def handle_ball_update(data):
     """Minigolf ball position updates."""
-    room = players.get(request.sid, {}).get('room')
-    if room:
+    registry.touch(request.sid)
+    room = registry.room_of(request.sid)
+    sim = simulation.room(room) if simulation and room else None
+    if sim:
+        # The server owns the ball from the shot onwards and streams snapshots;
+        # in-flight updates for the same stroke are ignored
+        stroke = data.get('stroke')
+        sim.shoot(request.sid, vector(data.get('position')), vector(data.get('velocity')),
+                  stroke if isinstance(stroke, int) and not isinstance(stroke, bool) else None)
+    elif room and ticker:
+        ticker.update(room, request.sid, 'ball', {
+            'position': data.get('position'),
+            'velocity': data.get('velocity')
+        })
+    elif room:
         emit('opponent_ball', {
             'id': request.sid,
             'position': data.get('position'),
@@ -295,10 +764,22 @@ def handle_ball_update(data):
         }, room=room, include_self=False)
 
 # ========== STATIC FILES ==========
+# public/ indexed in memory with precompressed variants and ETags;
+# in debug mode edited files are picked up on the next request
+static_files = StaticIndex(os.path.join(os.path.dirname(os.path.abspath(__file__)), config.STATIC_ROOT),
+                           check_changes=config.DEBUG)
+
 @app.route("/")
 def serve_page():
     return send_from_directory(".", "index.html")
 
+@app.route("/<path:filename>", methods=["GET"])
+def serve_static(filename):
+    response = static_files.response(filename, request)
+    if response is None:
+        return {"status": "error", "message": "not found"}, 404
+    return response
+
 # ========== GET LOCAL IP FOR LAN ==========
 def get_local_ip():
     import socket
@@ -315,10 +796,17 @@ def get_local_ip():
 if __name__ == "__main__":
     local_ip = get_local_ip()
     print("🎮 Starting Flick Games Multiplayer Server...")
-    print(f"📡 Local: http://localhost:5001")
-    print(f"🌐 LAN:   http://{local_ip}:5001")
+    print(f"📡 Local: http://localhost:{config.PORT}")
+    print(f"🌐 LAN:   http://{local_ip}:{config.PORT}")
+    print(f"⚙️  Async backend: {socketio.async_mode}")
     print("-" * 40)
     print("Share the LAN URL with other players on the same network!")
     print("-" * 40)
-    # Bind to 0.0.0.0 to allow network access
-    socketio.run(app, host='0.0.0.0', port=5001, debug=True, use_reloader=False)
+    if config.HANDOFF_FD is not None:
+        # A cluster.py worker: connections arrive already routed
+        import cluster
+        cluster.serve_worker(app, socketio.async_mode, config.HANDOFF_FD, (config.HOST, config.PORT))
+    else:
+        # Bind to 0.0.0.0 to allow network access
+        socketio.run(app, host=config.HOST, port=config.PORT, debug=config.DEBUG,
+                     use_reloader=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,151 @@
+"""
+In-repo message-queue backplane for running several app.py workers.
+
+Flask-SocketIO bridges emits between processes through a pub/sub
+"client manager". Redis works out of the box (FLICK_MESSAGE_QUEUE=
+redis://...); for a venue machine without Redis this module provides a
+tiny local stand-in: a TCP broker that fans every published message out
+to all other connected workers, and the matching client manager.
+
+    FLICK_MESSAGE_QUEUE=flick://127.0.0.1:6390
+"""
+import json
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+SCHEME = 'flick'
+_HEADER = struct.Struct('!I')
+
+
+def parse_url(url):
+    """flick://host:port -> (host, port)."""
+    parsed = urlparse(url)
+    if parsed.scheme != SCHEME:
+        raise ValueError(f"not a {SCHEME}:// backplane URL: {url!r}")
+    return parsed.hostname or '127.0.0.1', parsed.port or 6390
+
+
+def send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("backplane connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    (size,) = _HEADER.unpack(recv_exact(sock, _HEADER.size))
+    return recv_exact(sock, size)
+
+
+class Broker:
+    """Length-prefixed pub/sub fan-out: every frame goes to every other peer."""
+
+    def __init__(self, host='127.0.0.1', port=6390):
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()
+        self._peers = {}  # {socket: send lock}
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        while True:
+            conn, _ = self._server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._peers[conn] = threading.Lock()
+            threading.Thread(target=self._relay, args=(conn,), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _relay(self, conn):
+        try:
+            while True:
+                payload = recv_frame(conn)
+                with self._lock:
+                    peers = [(p, lock) for p, lock in self._peers.items() if p is not conn]
+                for peer, lock in peers:
+                    try:
+                        with lock:
+                            send_frame(peer, payload)
+                    except OSError:
+                        pass  # its own relay thread will clean it up
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            with self._lock:
+                self._peers.pop(conn, None)
+            conn.close()
+
+
+class BackplaneManager(socketio.PubSubManager):
+    """Socket.IO client manager that talks to a local Broker."""
+    name = 'flick-backplane'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.address = parse_url(url)
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+
+    def _connection(self):
+        """The one broker connection shared by publishing and listening."""
+        with self._connect_lock:
+            if self._sock is None:
+                sock = socket.create_connection(self.address)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._sock = sock
+            return self._sock
+
+    def _reset(self, sock):
+        with self._connect_lock:
+            if self._sock is sock:
+                self._sock = None
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _publish(self, data):
+        payload = json.dumps(data).encode('utf-8')
+        for attempt in range(2):
+            sock = None
+            try:
+                sock = self._connection()
+                with self._send_lock:
+                    send_frame(sock, payload)
+                return
+            except OSError:
+                if sock is not None:
+                    self._reset(sock)
+                if attempt:
+                    self._get_logger().error('Cannot publish to backplane, message dropped')
+
+    def _listen(self):
+        retry = 0.5
+        while True:
+            sock = None
+            try:
+                sock = self._connection()
+                retry = 0.5
+                while True:
+                    yield recv_frame(sock)
+            except (OSError, ConnectionError):
+                if sock is not None:
+                    self._reset(sock)
+                self._get_logger().error(f'Backplane unavailable, retrying in {retry:.1f}s')
+                time.sleep(retry)
+                retry = min(retry * 2, 10.0)
@@ -0,0 +1,151 @@
+"""
+Gesture-layer benchmark: per-frame cost of the hand-pose checks.
+
+Compares the old per-hand attribute walks (is_high_five, is_fist and the
+index tip lookup, once per hand) with hand_pose.HandFrame, which reads
+each of the 11 landmarks the checks need once per hand and compares
+plain floats. The legacy walk reads most of them twice, through
+HandLandmark enum members. For reference it also times the vectorised
+alternative: copy all landmarks into a (hands, 21, 3) array and answer
+the checks with NumPy over all hands at once.
+
+Synthetic MediaPipe-shaped results are used so the benchmark runs
+without a camera or MediaPipe installed (plain attribute access is
+cheaper than MediaPipe's protobuf messages, which flatters the
+per-attribute walk):
+
+    python benchmarks/bench_gestures.py --frames 20000 --hands 2
+"""
+import argparse
+import enum
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hand_pose import HandFrame
+
+class HandLandmark(enum.IntEnum):
+    """Stand-in for mp.solutions.hands.HandLandmark (the indices the checks use)."""
+    THUMB_IP = 3
+    THUMB_TIP = 4
+    INDEX_FINGER_PIP = 6
+    INDEX_FINGER_TIP = 8
+    MIDDLE_FINGER_PIP = 10
+    MIDDLE_FINGER_TIP = 12
+    RING_FINGER_PIP = 14
+    RING_FINGER_TIP = 16
+    PINKY_PIP = 18
+    PINKY_TIP = 20
+
+
+def fake_results(n_hands, rng):
+    hands = [SimpleNamespace(landmark=[SimpleNamespace(x=rng.random(), y=rng.random(), z=rng.random() - 0.5)
+                                      for _ in range(21)])
+             for _ in range(n_hands)]
+    handedness = [SimpleNamespace(classification=[SimpleNamespace(label=('Left', 'Right')[i % 2])])
+                  for i in range(n_hands)]
+    return SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=handedness)
+
+
+def is_high_five(hand_landmarks):
+    tips = [HandLandmark.THUMB_TIP, HandLandmark.INDEX_FINGER_TIP, HandLandmark.MIDDLE_FINGER_TIP,
+            HandLandmark.RING_FINGER_TIP, HandLandmark.PINKY_TIP]
+    pips = [HandLandmark.THUMB_IP, HandLandmark.INDEX_FINGER_PIP, HandLandmark.MIDDLE_FINGER_PIP,
+            HandLandmark.RING_FINGER_PIP, HandLandmark.PINKY_PIP]
+    fingers_extended = 0
+    for tip, pip in zip(tips, pips):
+        if hand_landmarks.landmark[tip].y < hand_landmarks.landmark[pip].y:
+            fingers_extended += 1
+    return fingers_extended >= 4
+
+
+def is_fist(hand_landmarks):
+    tips = [HandLandmark.INDEX_FINGER_TIP, HandLandmark.MIDDLE_FINGER_TIP,
+            HandLandmark.RING_FINGER_TIP, HandLandmark.PINKY_TIP]
+    pips = [HandLandmark.INDEX_FINGER_PIP, HandLandmark.MIDDLE_FINGER_PIP,
+            HandLandmark.RING_FINGER_PIP, HandLandmark.PINKY_PIP]
+    fingers_curled = 0
+    for tip, pip in zip(tips, pips):
+        if hand_landmarks.landmark[tip].y > hand_landmarks.landmark[pip].y:
+            fingers_curled += 1
+    return fingers_curled >= 3
+
+
+def legacy_frame(results):
+    """The checks as gptScript1.py used to run them, hand by hand."""
+    out = []
+    for hand, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+        label = handedness.classification[0].label
+        tip = hand.landmark[HandLandmark.INDEX_FINGER_TIP]
+        out.append((label, is_high_five(hand), is_fist(hand), (tip.x, tip.y, tip.z)))
+    return out
+
+
+FINGER_TIPS = [4, 8, 12, 16, 20]
+FINGER_PIPS = [3, 6, 10, 14, 18]
+
+
+def numpy_frame(results):
+    """The same checks over a NumPy copy of every landmark."""
+    points = np.array([[(p.x, p.y, p.z) for p in hand.landmark] for hand in results.multi_hand_landmarks],
+                      dtype=np.float32)
+    lift = points[:, FINGER_PIPS, 1] - points[:, FINGER_TIPS, 1]
+    return (lift > 0).sum(axis=1) >= 4, (lift[:, 1:] < 0).sum(axis=1) >= 3, points[:, 8]
+
+
+def handframe_frame(pose, results):
+    pose.fill(results.multi_hand_landmarks, results.multi_handedness)
+    return (pose.labels, *pose.gestures())
+
+
+def check_agreement(samples):
+    pose = HandFrame(max_hands=max(len(r.multi_hand_landmarks) for r in samples))
+    for results in samples:
+        old = legacy_frame(results)
+        labels, palm, fist, tips = handframe_frame(pose, results)
+        np_palm, np_fist, np_tips = numpy_frame(results)
+        assert list(np_palm) == palm and list(np_fist) == fist
+        assert np.allclose(np_tips, tips, atol=1e-6)
+        for i, (label, old_palm, old_fist, old_tip) in enumerate(old):
+            assert label == labels[i] and old_palm == palm[i] and old_fist == fist[i]
+            assert all(abs(a - b) < 1e-6 for a, b in zip(old_tip, tips[i]))
+
+
+def timed(func, samples, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        func(samples[i % len(samples)])
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--hands', type=int, default=2)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    samples = [fake_results(args.hands, rng) for _ in range(256)]
+    check_agreement(samples)
+
+    pose = HandFrame(max_hands=args.hands)
+    legacy_us = timed(legacy_frame, samples, args.frames)
+    handframe_us = timed(lambda r: handframe_frame(pose, r), samples, args.frames)
+    fill_us = timed(lambda r: pose.fill(r.multi_hand_landmarks, r.multi_handedness), samples, args.frames)
+    numpy_us = timed(numpy_frame, samples, args.frames)
+
+    print(f"{args.hands} hands, {args.frames} frames (results agree)")
+    print(f"{'per-attribute walk':>22}: {legacy_us:7.1f} us/frame")
+    print(f"{'HandFrame':>22}: {handframe_us:7.1f} us/frame "
+          f"({fill_us:.1f} fill, {handframe_us - fill_us:.1f} for the checks)")
+    print(f"{'NumPy copy + checks':>22}: {numpy_us:7.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
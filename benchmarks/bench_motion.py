@@ -0,0 +1,183 @@
+"""
+Motion benchmark: how early flicks are detected, and what the estimator costs.
+
+Simulates a fingertip at the camera's frame rate with MediaPipe-like
+jitter: still, then an upward flick whose speed ramps up over a few
+frames. Three detectors see the same samples:
+
+- old:   endpoint difference over the last 4 samples, fire when the
+         upward speed passes the threshold (gptScript1's compute_velocity)
+- new:   motion.MotionHistory's least-squares velocity, same rule
+         (the default in gptScript1)
+- early: MotionHistory.crosses(early=True), which may also fire on the
+         rising edge when the next frame will cross (FLICK_EARLY=1)
+
+Reports the mean detection delay after the true threshold crossing, in
+frames (negative = fired before it), how often a motion that peaks just
+below the threshold fires anyway, false triggers per minute on a hand
+wandering at 60% of the threshold speed, and the per-sample cost.
+
+    python benchmarks/bench_motion.py --trials 2000 --fps 30 --noise 0.003
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motion import MotionHistory
+
+THRESHOLD = 0.5  # gptScript1 VELOCITY_THRESHOLD, normalised units/s
+
+
+def old_velocity(positions, times):
+    """gptScript1's compute_velocity before the ring buffer."""
+    if len(positions) < 2:
+        return np.zeros(3)
+    recent_positions = list(positions)[-4:]
+    recent_times = list(times)[-4:]
+    dt = recent_times[-1] - recent_times[0]
+    if dt <= 0:
+        return np.zeros(3)
+    return (recent_positions[-1] - recent_positions[0]) / dt
+
+
+class OldDetector:
+    def __init__(self):
+        self.positions, self.times = deque(maxlen=8), deque(maxlen=8)
+
+    def step(self, t, pos):
+        self.positions.append(pos)
+        self.times.append(t)
+        return -old_velocity(self.positions, self.times)[1] > THRESHOLD
+
+
+class NewDetector:
+    def __init__(self, fps, early=False):
+        self.motion = MotionHistory()
+        self.lookahead = 1.0 / fps
+        self.early = early
+
+    def step(self, t, pos):
+        self.motion.push(t, pos)
+        return self.motion.crosses(1, THRESHOLD, -1, self.early, self.lookahead)
+
+
+def flick_speed(t, start, ramp, peak):
+    """Upward speed: 0 until start, smooth ramp to peak over `ramp` seconds."""
+    if t <= start:
+        return 0.0
+    u = min((t - start) / ramp, 1.0)
+    return peak * u * u * (3 - 2 * u)
+
+
+def flick_trial(detector, rng, fps, noise, peak=None):
+    """
+    Detection delay in frames relative to the true threshold crossing.
+
+    Negative when the detector fired early on a flick that did go on to
+    cross; None if it never fired. With a peak below the threshold this
+    is a near miss and any firing is a false trigger.
+    """
+    dt = 1.0 / fps
+    start = rng.uniform(0.3, 0.5)
+    ramp = rng.uniform(0.08, 0.2)
+    peak = rng.uniform(1.0, 3.0) if peak is None else peak
+    crosses = peak > THRESHOLD
+    y, t, crossed_at = 0.7, 0.0, None
+    phase = rng.random() * dt  # camera frames aren't aligned to the motion
+    while t < start + ramp + 0.3:
+        # integrate position finely between frames
+        steps = 10
+        for _ in range(steps):
+            y -= flick_speed(t, start, ramp, peak) * dt / steps
+            t += dt / steps
+        if crossed_at is None and flick_speed(t, start, ramp, peak) > THRESHOLD:
+            # exact crossing time by bisection on the smooth profile
+            lo, hi = t - dt, t
+            for _ in range(30):
+                mid = (lo + hi) / 2
+                lo, hi = (mid, hi) if flick_speed(mid, start, ramp, peak) <= THRESHOLD else (lo, mid)
+            crossed_at = hi
+        pos = np.array([0.5 + rng.gauss(0, noise), y + rng.gauss(0, noise), rng.gauss(0, noise)])
+        if detector.step(t + phase, pos):
+            if crossed_at is None:
+                if not crosses:
+                    return 0.0
+                # fired early: find when the speed does cross
+                future = t
+                while flick_speed(future, start, ramp, peak) <= THRESHOLD:
+                    future += dt / 100
+                return (t - future) / dt
+            return (t - crossed_at) / dt
+    return None
+
+
+def wander_trial(detector, rng, fps, noise, seconds=10.0):
+    """False triggers on a hand drifting at up to 60% of the threshold."""
+    dt = 1.0 / fps
+    freq = rng.uniform(0.3, 1.0)
+    amp = 0.6 * THRESHOLD / (2 * math.pi * freq)
+    triggers, t = 0, 0.0
+    while t < seconds:
+        t += dt
+        y = 0.5 + amp * math.sin(2 * math.pi * freq * t)
+        pos = np.array([0.5 + rng.gauss(0, noise), y + rng.gauss(0, noise), rng.gauss(0, noise)])
+        if detector.step(t, pos):
+            triggers += 1
+    return triggers
+
+
+def cost_us(detector_factory, samples):
+    detector = detector_factory()
+    start = time.perf_counter()
+    for t, pos in samples:
+        detector.step(t, pos)
+    return (time.perf_counter() - start) / len(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trials', type=int, default=2000)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--noise', type=float, default=0.003, help="landmark jitter (normalised units)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    detectors = {'old': OldDetector, 'new': lambda: NewDetector(args.fps),
+                 'early': lambda: NewDetector(args.fps, early=True)}
+    print(f"{args.trials} flicks at {args.fps:.0f} fps, jitter {args.noise}")
+    print(f"{'detector':>9} {'delay frames':>13} {'p90':>6} {'missed':>7} {'near-miss fires':>16} "
+          f"{'false/min':>10} {'us/sample':>10}")
+    rng_samples = random.Random(args.seed)
+    samples = [(i / args.fps, np.array([rng_samples.random() for _ in range(3)])) for i in range(5000)]
+    results = {}
+    for name, factory in detectors.items():
+        rng = random.Random(args.seed)
+        delays = [flick_trial(factory(), rng, args.fps, args.noise) for _ in range(args.trials)]
+        hits = sorted(d for d in delays if d is not None)
+        near_rng = random.Random(args.seed + 2)
+        near = [flick_trial(factory(), near_rng, args.fps, args.noise,
+                            peak=near_rng.uniform(0.6, 0.95) * THRESHOLD) for _ in range(args.trials)]
+        near_fired = sum(d is not None for d in near) / len(near)
+        wander_rng = random.Random(args.seed + 1)
+        wander_trials = max(1, args.trials // 20)
+        false = sum(wander_trial(factory(), wander_rng, args.fps, args.noise) for _ in range(wander_trials))
+        per_minute = false / (wander_trials * 10.0 / 60)
+        mean = sum(hits) / len(hits) if hits else float('nan')
+        p90 = hits[int(len(hits) * 0.9)] if hits else float('nan')
+        results[name] = mean
+        print(f"{name:>9} {mean:>13.2f} {p90:>6.2f} {len(delays) - len(hits):>7} {near_fired:>16.1%} "
+              f"{per_minute:>10.2f} {cost_us(factory, samples):>10.1f}")
+    for name in ('new', 'early'):
+        print(f"{name} fires {results['old'] - results[name]:.2f} frames earlier than old on average")
+
+
+if __name__ == "__main__":
+    main()
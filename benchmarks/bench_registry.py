@@ -0,0 +1,88 @@
+"""
+Registry benchmark: joins, leaves and lookups with thousands of sessions.
+
+Several threads churn through their own slice of sessions, joining
+two-player rooms, sending lookups and leaving again, the way Socket.IO
+handler threads hit the registry during a busy tournament. Then times
+one sweep of the session heap when only a few sessions have expired.
+
+    python benchmarks/bench_registry.py --sessions 5000 --threads 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import Registry
+
+
+def churn(registry, sids, rounds):
+    ops = 0
+    for r in range(rounds):
+        for i, sid in enumerate(sids):
+            registry.join(sid, f'room-{r}-{i // 2}', 'boxing')
+            registry.room_of(sid)
+            registry.touch(sid)
+            ops += 3
+        for sid in sids:
+            registry.leave(sid)
+            ops += 1
+    return ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    registry = Registry()
+    sids = [f'sid-{i}' for i in range(args.sessions)]
+    for sid in sids:
+        registry.add_player(sid, {})
+
+    per_thread = [sids[i::args.threads] for i in range(args.threads)]
+    results = [0] * args.threads
+
+    def worker(i):
+        results[i] = churn(registry, per_thread[i], args.rounds)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ops = sum(results)
+    print(f"{args.sessions} sessions, {args.threads} threads: "
+          f"{ops / elapsed / 1e3:.0f}k ops/s, {elapsed / ops * 1e6:.2f} us/op")
+    print(f"rooms left after churn: {registry.room_count} (empty rooms are reaped)")
+
+    # Sweep cost: a sweep should scale with the expired sessions, not all of them.
+    # 1% of sessions switch to heartbeats (15 s timeout) and then go quiet; the
+    # sweep runs 30 s later, when only those are past their deadline.
+    sweeper = Registry(idle_timeout=60, heartbeat_timeout=15)
+    for sid in sids:
+        sweeper.add_player(sid, {})
+    for sid in sids[:max(1, args.sessions // 100)]:
+        sweeper.heartbeat(sid)
+    now = time.monotonic() + 30
+    start = time.perf_counter()
+    scanned = [sid for sid in sids if sweeper.get(sid).last_seen
+               + (sweeper.heartbeat_timeout if sweeper.get(sid).heartbeats else sweeper.idle_timeout) < now]
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    evicted = sweeper.reap_stale(now=now)
+    sweep = time.perf_counter() - start
+    print(f"sweep: {len(evicted)} of {args.sessions} sessions expired -> heap {sweep * 1e3:.3f} ms "
+          f"(full scan would take {scan * 1e3:.3f} ms to find {len(scanned)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Room routing benchmark: cost of a controller's POST /hands at 100 rooms x 2 players.
+
+Connects in-process Socket.IO test clients, puts them in two-player
+rooms and binds one controller per room. It then times POST /hands from
+bound controllers (delivered to their room) against an unbound one
+(delivered to every socket, the old broadcast behaviour).
+
+    python benchmarks/bench_room_routing.py --rooms 100 --posts 500
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault('FLICK_ASYNC_MODE', 'threading')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as server
+
+HANDS = {"left": {"x": 0.3, "y": 0.5}, "right": {"x": 0.7, "y": 0.5}}
+
+
+def delivered(clients):
+    """Count and clear the messages each test client has queued."""
+    return sum(len(c.get_received()) for c in clients)
+
+
+def time_posts(http, clients, controllers, posts):
+    delivered(clients)
+    start = time.perf_counter()
+    for i in range(posts):
+        http.post('/hands', json=HANDS,
+                  headers={'X-Controller-Id': controllers[i % len(controllers)]})
+    elapsed = time.perf_counter() - start
+    return elapsed / posts * 1e6, delivered(clients) / posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--posts', type=int, default=500)
+    args = parser.parse_args()
+
+    # Keep per-request prints out of the timings
+    sys.stdout, real_stdout = open(os.devnull, 'w'), sys.stdout
+    clients, controllers = [], []
+    for r in range(args.rooms):
+        for p in range(args.players):
+            client = server.socketio.test_client(server.app)
+            client.emit('join_room', {'room': f'bench-{r}', 'game': 'boxing'})
+            if p == 0:
+                client.emit('bind_controller', {'controller': f'cam-{r}'})
+            clients.append(client)
+        controllers.append(f'cam-{r}')
+    http = server.app.test_client()
+
+    bound = time_posts(http, clients, controllers, args.posts)
+    unbound = time_posts(http, clients, ['unbound'], args.posts)
+    sys.stdout = real_stdout
+
+    print(f"{args.rooms} rooms x {args.players} players ({len(clients)} sockets)")
+    print(f"{'routing':>10} {'us/post':>10} {'msgs/post':>10}")
+    print(f"{'room':>10} {bound[0]:>10.0f} {bound[1]:>10.1f}")
+    print(f"{'broadcast':>10} {unbound[0]:>10.0f} {unbound[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Video fan-out benchmark: server CPU vs. number of /video_feed viewers.
+
+Publishes frames at camera rate and attaches 1..50 viewer threads that
+drain the stream the way a WSGI worker would. Compares the encode-once
+FrameBroadcaster against the old per-viewer loop that re-encoded the
+latest frame every 16 ms.
+
+    python benchmarks/bench_video_fanout.py
+    python benchmarks/bench_video_fanout.py --viewers 1 10 50 --seconds 3
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from video_stream import FrameBroadcaster, encode_jpeg, multipart_chunk
+
+
+def make_frames(count=30):
+    """A handful of noisy 400x300 frames so JPEG sizes are realistic."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (300, 400, 3), dtype=np.uint8)
+    return [np.roll(base, i * 7, axis=1) for i in range(count)]
+
+
+def run_broadcaster(viewers, seconds, fps, images):
+    broadcaster = FrameBroadcaster()
+    stop = threading.Event()
+    sent = [0] * viewers
+
+    def viewer(i):
+        for chunk in broadcaster.stream(timeout=0.1):
+            sent[i] += len(chunk)
+            if stop.is_set():
+                return
+
+    def publisher():
+        n = 0
+        while not stop.is_set():
+            broadcaster.publish(images[n % len(images)])
+            n += 1
+            time.sleep(1.0 / fps)
+
+    return measure(viewer, publisher, viewers, seconds, stop, sent)
+
+
+def run_legacy(viewers, seconds, fps, images):
+    """The pre-broadcaster loop: every viewer encodes latest_frame itself."""
+    latest = {'frame': images[0]}
+    stop = threading.Event()
+    sent = [0] * viewers
+
+    def viewer(i):
+        while not stop.is_set():
+            sent[i] += len(multipart_chunk(encode_jpeg(latest['frame'])))
+            time.sleep(0.016)
+
+    def publisher():
+        n = 0
+        while not stop.is_set():
+            latest['frame'] = images[n % len(images)]
+            n += 1
+            time.sleep(1.0 / fps)
+
+    return measure(viewer, publisher, viewers, seconds, stop, sent)
+
+
+def measure(viewer, publisher, viewers, seconds, stop, sent):
+    threads = [threading.Thread(target=viewer, args=(i,), daemon=True)
+               for i in range(viewers)]
+    threads.append(threading.Thread(target=publisher, daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(0.2)  # let everyone settle before measuring
+    cpu0, wall0, bytes0 = time.process_time(), time.perf_counter(), sum(sent)
+    time.sleep(seconds)
+    cpu1, wall1, bytes1 = time.process_time(), time.perf_counter(), sum(sent)
+    stop.set()
+    for t in threads:
+        t.join(timeout=1.0)
+    wall = wall1 - wall0
+    return (cpu1 - cpu0) / wall * 100, (bytes1 - bytes0) / wall / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help="only measure the broadcaster")
+    args = parser.parse_args()
+
+    images = make_frames()
+    print(f"{'viewers':>8} {'mode':>12} {'cpu %':>8} {'MB/s out':>10}")
+    for n in args.viewers:
+        modes = [('broadcaster', run_broadcaster)]
+        if not args.skip_legacy:
+            modes.append(('per-viewer', run_legacy))
+        for name, run in modes:
+            cpu, mbps = run(n, args.seconds, args.fps, images)
+            print(f"{n:>8} {name:>12} {cpu:>8.1f} {mbps:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Cluster benchmark: relay throughput vs. number of worker processes.
+
+Starts cluster.py with 1, 2, 4... workers and drives it from several
+client processes. Each client posts hand updates as its own controller
+(X-Controller-Id), so the front end spreads them over the workers the
+way real controllers would be spread. Half the clients keep their
+connection open (like a camera's sender), half open a new one per
+request (like browsers after Connection: close), so both the routing
+and the data path are exercised.
+
+Besides requests per second it reports the CPU time the front end and
+the workers used per 1000 requests (from /proc, Linux only): the front
+end only routes new connections, so its share should stay small and
+throughput should follow the worker count up to the number of cores.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --clients 8
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HANDS = {"left": {"x": 0.3, "y": 0.5}, "right": {"x": 0.7, "y": 0.5}}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/hands?controller=warmup', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("cluster did not come up")
+
+
+def client(port, controller, seconds, keep_alive, results):
+    session = requests.Session()
+    url = f'http://127.0.0.1:{port}/hands'
+    # Without the header the worker closes the connection after each response
+    headers = {'X-Controller-Id': controller} if keep_alive else {}
+    if not keep_alive:
+        url += f'?controller={controller}'
+    count, end = 0, time.time() + seconds
+    while time.time() < end:
+        try:
+            if session.post(url, json=HANDS, headers=headers, timeout=2).status_code == 200:
+                count += 1
+        except requests.RequestException:
+            pass
+    results.put(count)
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process so far, or None off Linux."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def run(workers, clients, seconds):
+    """(requests/s, front end CPU s per 1000 requests, workers' CPU s per 1000 requests)."""
+    port, broker = free_port(), free_port()
+    env = dict(os.environ, FLICK_PORT=str(port))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'cluster.py'),
+                             '--workers', str(workers), '--host', '127.0.0.1',
+                             '--broker-port', str(broker)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        time.sleep(1.0)  # let every worker finish booting
+        worker_pids = children(proc.pid)
+        front_before = cpu_seconds(proc.pid)
+        workers_before = [cpu_seconds(pid) for pid in worker_pids]
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client,
+                                         args=(port, f'bench-{i}', seconds, i % 2 == 0, results))
+                 for i in range(clients)]
+        for p in procs:
+            p.start()
+        total = sum(results.get() for _ in procs)
+        for p in procs:
+            p.join()
+        front = worker_cpu = None
+        if front_before is not None and total:
+            front = (cpu_seconds(proc.pid) - front_before) / total * 1000
+            after = [cpu_seconds(pid) for pid in worker_pids]
+            worker_cpu = sum(a - b for a, b in zip(after, workers_before)
+                             if a is not None and b is not None) / total * 1000
+        return total / seconds, front, worker_cpu
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8, help="client processes")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes "
+          f"(half keep-alive, half a new connection per request)")
+    print(f"{'workers':>8} {'req/s':>10} {'front end CPU s/1k req':>23} {'workers CPU s/1k req':>21}")
+    for n in args.workers:
+        rate, front, workers = run(n, args.clients, args.seconds)
+        cpu = (f"{front:>23.3f} {workers:>21.3f}" if front is not None
+               else f"{'n/a':>23} {'n/a':>21}")
+        print(f"{n:>8} {rate:>10.0f} {cpu}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Backend load test: connection capacity and relay latency per async mode.
+
+For each backend this starts app.py on a spare port, parks a number of
+long-lived /video_feed streams on it, then ramps up Socket.IO clients in
+pairs sharing a room. One client of each pair sends score updates stamped
+with the send time, the other measures how long the relay took.
+
+    python benchmarks/load_backends.py
+    python benchmarks/load_backends.py --modes eventlet threading --clients 400
+
+Needs the Socket.IO client extras: pip install "python-socketio[client]"
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import ASYNC_MODES
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port):
+    env = dict(os.environ, FLICK_ASYNC_MODE=mode, FLICK_PORT=str(port),
+               FLICK_HOST='127.0.0.1', FLICK_DEBUG='0')
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server did not start in {mode} mode")
+
+
+def open_video_streams(port, count):
+    """Long-lived MJPEG viewers; each one pins a thread in threading mode."""
+    streams = []
+    for _ in range(count):
+        try:
+            s = socket.create_connection(('127.0.0.1', port), timeout=2)
+            s.sendall(b'GET /video_feed HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            streams.append(s)
+        except OSError:
+            break
+    return streams
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(mode, args):
+    port = free_port()
+    proc = start_server(mode, port)
+    url = f'http://127.0.0.1:{port}'
+    streams = open_video_streams(port, args.streams)
+    clients, latencies = [], []
+    lock = threading.Lock()
+
+    def on_score(data):
+        with lock:
+            latencies.append((time.perf_counter() - data['score']) * 1000)
+
+    try:
+        for i in range(args.clients):
+            client = socketio.Client(reconnection=False)
+            if i % 2:
+                client.on('score_update', on_score)
+            try:
+                client.connect(url, transports=['websocket'], wait_timeout=args.connect_timeout)
+                client.emit('join_room', {'room': f'load-{i // 2}', 'game': 'boxing'})
+            except Exception:
+                break
+            clients.append(client)
+
+        time.sleep(0.5)  # let joins land before timing relays
+        senders = clients[0::2]
+        end = time.time() + args.seconds
+        while time.time() < end:
+            for client in senders:
+                client.emit('update_score', {'score': time.perf_counter()})
+            time.sleep(1.0 / args.rate)
+        time.sleep(0.5)
+        with lock:
+            samples = list(latencies)
+        return len(clients), len(streams), samples
+    finally:
+        for client in clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        for s in streams:
+            s.close()
+        proc.terminate()
+        proc.wait(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=list(ASYNC_MODES), choices=ASYNC_MODES)
+    parser.add_argument('--clients', type=int, default=200, help="Socket.IO clients to ramp up to")
+    parser.add_argument('--streams', type=int, default=20, help="idle /video_feed viewers held open")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rate', type=float, default=20.0, help="updates/s per sending client")
+    parser.add_argument('--connect-timeout', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'backend':>10} {'clients':>8} {'streams':>8} {'events':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes:
+        if mode != 'threading' and importlib.util.find_spec(mode) is None:
+            print(f"{mode:>10}  not installed, skipped")
+            continue
+        connected, streams, samples = run_mode(mode, args)
+        print(f"{mode:>10} {connected:>8} {streams:>8} {len(samples):>8} "
+              f"{percentile(samples, 50):>8.2f} {percentile(samples, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
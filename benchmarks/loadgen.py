@@ -0,0 +1,302 @@
+"""
+Synthetic load generator: N gesture controllers and M game pages on localhost.
+
+Each controller behaves like gptScript1.py at camera rate: every tick
+it posts one /controller_update carrying hands, aim and the preview
+frame, with a flick or punch riding along every few seconds, and it is
+bound to a room. Each browser joins one of those rooms
+over Socket.IO, subscribes to a controller's gestures, polls /game_state
+and sends update_hands/ball_update like the game pages do.
+
+    python benchmarks/loadgen.py                          # starts app.py itself
+    python benchmarks/loadgen.py --controllers 8 --browsers 32 --seconds 20
+    python benchmarks/loadgen.py --url http://127.0.0.1:5001   # existing server
+
+Reports sustained HTTP requests/s and p50/p99, events received by the
+browsers per second (fan-out), gestures sent vs. delivered (dropped) and
+gesture push latency. Needs: pip install requests "python-socketio[client]"
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from controller_protocol import ControllerUpdate, MEDIA_TYPE  # noqa: E402
+
+# Not a decodable image: the server only stores and forwards the bytes
+FAKE_JPEG = b'\xff\xd8' + os.urandom(24 * 1024) + b'\xff\xd9'
+RELAYED_EVENTS = ('opponent_flick', 'opponent_punch', 'opponent_hands', 'room_snapshot',
+                  'opponent_ball', 'game_state_change', 'gesture_event')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    env = dict(os.environ, FLICK_PORT=str(port), FLICK_HOST='127.0.0.1', FLICK_DEBUG='0')
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("app.py did not start")
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Stats:
+    """Counters shared by every simulated client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.http_ok = 0
+        self.http_errors = 0
+        self.http_ms = []
+        self.emits = 0
+        self.received = 0
+        self.gestures_sent = {}      # {controller id: count}
+        self.gestures_received = 0
+        self.gesture_ms = []
+
+    def http(self, ms, ok):
+        with self.lock:
+            if ok:
+                self.http_ok += 1
+                self.http_ms.append(ms)
+            else:
+                self.http_errors += 1
+
+
+def room_name(i, rooms):
+    return f'load-{i % rooms}'
+
+
+def controller_id(i):
+    return f'load-controller-{i}'
+
+
+def run_controller(i, url, args, stats, stop):
+    """One camera: a /controller_update every tick, a gesture every --gesture-every seconds."""
+    cid = controller_id(i)
+    session = requests.Session()
+    session.headers['X-Controller-Id'] = cid
+    session.post(f'{url}/bind', json={'room': room_name(i, args.rooms)}, timeout=5)
+    sender = random.getrandbits(32) or 1  # fresh per run, so the server doesn't dedup a rerun
+    seq = 0
+
+    def post(update):
+        start = time.perf_counter()
+        try:
+            ok = session.post(f'{url}/controller_update', data=update.encode(), timeout=args.timeout,
+                              headers={'Content-Type': MEDIA_TYPE}).status_code == 200
+        except requests.RequestException:
+            ok = False
+        stats.http((time.perf_counter() - start) * 1000, ok)
+        return ok
+
+    period = 1.0 / args.fps
+    next_tick = time.perf_counter()
+    next_gesture = time.time() + args.gesture_every * (1 + i / max(1, args.controllers))
+    frame = 0
+    while not stop.is_set():
+        x = 0.5 + 0.3 * ((frame % 60) / 60 - 0.5)
+        now = time.time()
+        update = ControllerUpdate(now, sender)
+        update.hands = {"left": {"x": x, "y": 0.5}, "right": {"x": 1 - x, "y": 0.5}}
+        update.aim = {"x": x, "y": 0.5}
+        gesture = time.time() >= next_gesture
+        if gesture:
+            next_gesture += args.gesture_every
+            seq += 1
+            stamps = {"timestamp": now, "t_capture": now, "seq": seq}
+            if frame % 2:
+                update.flicks.append({"vx": 0.1, "vy": 1.5, "magnitude": 1.5, "hand": "Right", **stamps})
+            else:
+                update.punches.append({"hand": "Left", "power": 1.2, "velocity_z": 1.0, **stamps})
+        elif not args.no_video:
+            # Like ControllerSender: the frame only rides along when no event is waiting
+            update.jpeg = FAKE_JPEG
+        if post(update) and gesture:
+            with stats.lock:
+                stats.gestures_sent[cid] = stats.gestures_sent.get(cid, 0) + 1
+        frame += 1
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.perf_counter()  # fell behind; don't burst to catch up
+
+
+def connect_browser(j, url, args, stats):
+    """One game page: joined to a room and subscribed to one controller's gestures."""
+    client = socketio.Client(reconnection=False)
+
+    def on_relayed(*_):
+        with stats.lock:
+            stats.received += 1
+
+    def on_gesture(event):
+        ms = (time.time() - event['data'].get('timestamp', time.time())) * 1000
+        with stats.lock:
+            stats.received += 1
+            stats.gestures_received += 1
+            stats.gesture_ms.append(ms)
+
+    for name in RELAYED_EVENTS:
+        if name != 'gesture_event':
+            client.on(name, on_relayed)
+    client.on('gesture_event', on_gesture)
+    client.connect(f'{url}?room={room_name(j, args.rooms)}', transports=['websocket'],
+                   wait_timeout=args.timeout * 10)
+    client.emit('join_room', {'room': room_name(j, args.rooms), 'game': 'boxing'})
+    client.emit('subscribe_gestures', {'controller': controller_id(j % args.controllers),
+                                       'types': ['flick', 'punch']})
+    return client
+
+
+def run_browser(j, client, url, args, stats, stop):
+    session = requests.Session()
+    period = 1.0 / args.browser_rate
+    tick = 0
+    while not stop.is_set():
+        client.emit('update_hands', {"left": {"x": 0.3, "y": 0.5}, "right": {"x": 0.7, "y": 0.5}})
+        client.emit('ball_update', {'position': {'x': tick * 0.01, 'y': 0.2, 'z': 0},
+                                    'velocity': {'x': 0.1, 'y': 0, 'z': 0}})
+        with stats.lock:
+            stats.emits += 2
+        if tick % max(1, int(args.browser_rate)) == 0:
+            # The pages still poll a few endpoints about once a second
+            start = time.perf_counter()
+            try:
+                ok = session.get(f'{url}/game_state?controller={controller_id(j % args.controllers)}',
+                                 timeout=args.timeout).ok
+            except requests.RequestException:
+                ok = False
+            stats.http((time.perf_counter() - start) * 1000, ok)
+        tick += 1
+        time.sleep(period)
+
+
+def subscribers_per_controller(args):
+    counts = {}
+    for j in range(args.browsers):
+        cid = controller_id(j % args.controllers)
+        counts[cid] = counts.get(cid, 0) + 1
+    return counts
+
+
+def report(stats, args, elapsed, connected):
+    with stats.lock:
+        expected = sum(sent * subscribers_per_controller(args).get(cid, 0)
+                       for cid, sent in stats.gestures_sent.items())
+        result = {
+            'controllers': args.controllers,
+            'browsers_connected': connected,
+            'seconds': round(elapsed, 2),
+            'http_req_per_s': round(stats.http_ok / elapsed, 1),
+            'http_errors': stats.http_errors,
+            'http_p50_ms': round(percentile(stats.http_ms, 50), 2),
+            'http_p99_ms': round(percentile(stats.http_ms, 99), 2),
+            'socket_emits_per_s': round(stats.emits / elapsed, 1),
+            'fanout_events_per_s': round(stats.received / elapsed, 1),
+            'gestures_sent': sum(stats.gestures_sent.values()),
+            'gesture_deliveries_expected': expected,
+            'gesture_deliveries_dropped': max(0, expected - stats.gestures_received),
+            'gesture_p50_ms': round(percentile(stats.gesture_ms, 50), 2),
+            'gesture_p99_ms': round(percentile(stats.gesture_ms, 99), 2),
+        }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key:>30}  {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="target an already running server instead of starting app.py")
+    parser.add_argument('--controllers', type=int, default=4)
+    parser.add_argument('--browsers', type=int, default=16)
+    parser.add_argument('--rooms', type=int, default=4)
+    parser.add_argument('--fps', type=float, default=30.0, help="controller camera rate")
+    parser.add_argument('--browser-rate', type=float, default=30.0, help="socket updates/s per page")
+    parser.add_argument('--gesture-every', type=float, default=2.0, help="seconds between gestures")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--timeout', type=float, default=1.0, help="per-request timeout")
+    parser.add_argument('--no-video', action='store_true', help="send no preview frames")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+    args.controllers = max(1, args.controllers)
+    args.rooms = max(1, args.rooms)
+
+    proc = None
+    url = args.url
+    if not url:
+        port = free_port()
+        proc = start_server(port)
+        url = f'http://127.0.0.1:{port}'
+
+    stats, stop = Stats(), threading.Event()
+    clients, threads = [], []
+    try:
+        for j in range(args.browsers):
+            try:
+                clients.append(connect_browser(j, url, args, stats))
+            except Exception as exc:
+                print(f"browser {j} failed to connect: {exc}")
+                break
+        time.sleep(0.5)  # let joins and subscriptions land
+        for i in range(args.controllers):
+            threads.append(threading.Thread(target=run_controller, args=(i, url, args, stats, stop),
+                                            daemon=True))
+        for j, client in enumerate(clients):
+            threads.append(threading.Thread(target=run_browser, args=(j, client, url, args, stats, stop),
+                                            daemon=True))
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        elapsed = time.perf_counter() - start
+        for thread in threads:
+            thread.join(timeout=5)
+        time.sleep(0.5)  # in-flight pushes
+        report(stats, args, elapsed, len(clients))
+    finally:
+        for client in clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Startup budget check: time and memory to import app.py, per profile.
+
+Each profile is imported in a fresh interpreter (as a server start or
+cluster worker would), and the check fails when:
+
+- the import takes longer than --max-seconds
+- peak RSS exceeds --max-rss-mb
+- OpenCV or NumPy got loaded (neither profile needs them to start)
+
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --max-seconds 1.0 --max-rss-mb 90 --runs 5
+
+Exits with status 1 on a budget overrun, so it can gate CI or a deploy.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = {'no-video': {'FLICK_VIDEO': '0'}, 'video': {'FLICK_VIDEO': '1'}}
+HEAVY_MODULES = ('cv2', 'numpy', 'mediapipe')
+
+# Runs in the child: import the server module and report what it cost
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': seconds, 'rss_mb': rss_kb / 1024,
+                  'heavy': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def probe(profile_env, journal):
+    env = dict(os.environ, FLICK_DEBUG='0', FLICK_JOURNAL=journal, **profile_env)
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=PROFILES)
+    parser.add_argument('--max-seconds', type=float, default=1.5, help="import time budget")
+    parser.add_argument('--max-rss-mb', type=float, default=100.0, help="peak RSS budget")
+    parser.add_argument('--runs', type=int, default=3, help="best of N (first run warms the disk cache)")
+    args = parser.parse_args()
+
+    journal = os.path.join(ROOT, '.startup-budget-journal.log')
+    failed = False
+    print(f"{'profile':>10} {'seconds':>8} {'rss MB':>8}  heavy modules")
+    try:
+        for name in args.profiles:
+            results = [probe(PROFILES[name], journal) for _ in range(max(1, args.runs))]
+            seconds = min(r['seconds'] for r in results)
+            rss = min(r['rss_mb'] for r in results)
+            heavy = sorted({m for r in results for m in r['heavy']})
+            problems = []
+            if seconds > args.max_seconds:
+                problems.append(f"import {seconds:.2f}s > {args.max_seconds:.2f}s")
+            if rss > args.max_rss_mb:
+                problems.append(f"RSS {rss:.0f} MB > {args.max_rss_mb:.0f} MB")
+            if heavy:
+                problems.append(f"loaded {', '.join(heavy)} at startup")
+            failed = failed or bool(problems)
+            status = "over budget: " + "; ".join(problems) if problems else "ok"
+            print(f"{name:>10} {seconds:>8.3f} {rss:>8.1f}  {', '.join(heavy) or '-'}  {status}")
+    finally:
+        for suffix in ('', '.1', '.2', '.3'):
+            if os.path.exists(journal + suffix):
+                os.remove(journal + suffix)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Run several app.py worker processes behind one port.
+
+    python cluster.py                 # one worker per core on :5001
+    python cluster.py --workers 4
+
+The supervisor starts the in-repo backplane broker (unless
+FLICK_MESSAGE_QUEUE already points at Redis or another broker), spawns
+the workers and runs a small sticky front end on the public port. The
+front end only routes: it peeks at the first request head of each new
+connection, picks a worker and hands the connection itself to that
+worker over a Unix socket (SCM_RIGHTS). From then on client and worker
+talk directly, so no request or response byte, MJPEG streams included,
+passes through the front end and it can't become the cluster's GIL.
+
+- controller-keyed requests are pinned to the worker that owns the
+  controller: the endpoints in CONTROLLER_PATHS (by the X-Controller-Id
+  header or ?controller=, 'default' without either) and Socket.IO
+  connections with ?controller= in their connect query (the games'
+  gesture sockets). A controller's state, gesture log and subscribers
+  all live in that one process, wherever the camera and the browsers are
+- other Socket.IO connections with ?room=<code> are pinned to the worker
+  that owns that room, so a room's players, ticker and simulation live
+  in one process
+- /video_feed and /video_frame always go to worker 0, which holds the
+  camera frames
+- everything else (static files) goes by client IP
+
+Routing happens once per connection, so a connection must never carry
+requests with different keys. Only a controller's own sessions (the ones
+sending X-Controller-Id) and upgraded WebSocket connections are kept
+open; every other response carries Connection: close (see
+close_unkeyed), and browsers reconnect for the next request.
+
+Socket.IO emits still reach every worker through the backplane. A game
+page binds its controller with POST /bind?controller=<id> (routed to the
+controller's worker) naming its room and player id; a 'bind_controller'
+socket message only takes effect on the room's worker.
+"""
+import argparse
+import os
+import select
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from backplane import Broker
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAX_HEAD = 64 * 1024
+
+
+# Endpoints whose state belongs to one controller (see app.controller_id)
+CONTROLLER_PATHS = frozenset(('/aim', '/bind', '/controller_update', '/flick', '/game',
+                              '/game_state', '/hands', '/joystick', '/punch'))
+DEFAULT_CONTROLLER = 'default'
+
+
+def parse_head(head):
+    """(path, query, headers with lower-case names) of a request head, or None."""
+    lines = head.split(b'\r\n')
+    try:
+        target = lines[0].split(b' ')[1].decode('latin-1')
+    except IndexError:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(b':')
+        if sep:
+            headers[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+    url = urlsplit(target)
+    return url.path, parse_qs(url.query), headers
+
+
+def route(head, peer_ip, workers):
+    """Index of the worker that should serve a connection, from its first request."""
+    parsed = parse_head(head)
+    if parsed is None:
+        return 0
+    path, query, headers = parsed
+    if path.startswith('/video_'):
+        return 0
+    controller = headers.get('x-controller-id') or (query.get('controller') or [None])[0]
+    room = (query.get('room') or [None])[0]
+    if path in CONTROLLER_PATHS or (controller and path.startswith('/socket.io')):
+        key = 'controller:' + (controller or DEFAULT_CONTROLLER)
+    elif room:
+        key = 'room:' + room
+    else:
+        key = peer_ip
+    return zlib.crc32(key.encode('utf-8')) % workers
+
+
+def keeps_connection(environ):
+    """Whether a worker may keep this request's connection open for more requests."""
+    return 'HTTP_UPGRADE' in environ or 'HTTP_X_CONTROLLER_ID' in environ
+
+
+def close_unkeyed(wsgi_app):
+    """WSGI middleware for workers: Connection: close unless keeps_connection()."""
+    def app(environ, start_response):
+        if keeps_connection(environ):
+            return wsgi_app(environ, start_response)
+
+        def start_and_close(status, headers, exc_info=None):
+            headers = [h for h in headers if h[0].lower() != 'connection']
+            return start_response(status, headers + [('Connection', 'close')], exc_info)
+        return wsgi_app(environ, start_and_close)
+    return app
+
+
+class FrontEnd:
+    """
+    Accepts on the public port and passes each connection to its worker.
+
+    The request head is read with MSG_PEEK, so it stays in the socket for
+    the worker to parse. A head that hasn't fully arrived is looked at
+    again every RETRY_DELAY seconds, for up to HEAD_TIMEOUT.
+    """
+    HEAD_TIMEOUT = 10.0
+    RETRY_DELAY = 0.005
+
+    def __init__(self, listener, channels):
+        self.listener = listener
+        self.channels = channels
+        self.selector = selectors.DefaultSelector()
+        self.deadlines = {}  # connection -> give up on its head at
+        self.parked = []     # connections with a partial head, peeked again soon
+
+    def serve_forever(self):
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        while True:
+            parked, self.parked = self.parked, []
+            for key, _ in self.selector.select(self.RETRY_DELAY if parked else 1.0):
+                if key.fileobj is self.listener:
+                    self._accept()
+                else:
+                    self._peek(key.fileobj)
+            for conn in parked:
+                self._peek(conn)
+            now = time.monotonic()
+            for conn, deadline in list(self.deadlines.items()):
+                if deadline < now:
+                    self._drop(conn)
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return  # e.g. out of descriptors; the rest stay in the backlog
+            conn.setblocking(False)
+            self.deadlines[conn] = time.monotonic() + self.HEAD_TIMEOUT
+            self.selector.register(conn, selectors.EVENT_READ)
+
+    def _peek(self, conn):
+        try:
+            head = conn.recv(MAX_HEAD, socket.MSG_PEEK)
+        except (BlockingIOError, InterruptedError):
+            self._watch(conn)
+            return
+        except OSError:
+            self._drop(conn)
+            return
+        end = head.find(b'\r\n\r\n')
+        if end < 0:
+            if not head or len(head) >= MAX_HEAD:
+                self._drop(conn)  # closed, or a head too big to route
+            else:
+                # The data stays readable, so wait a moment instead of spinning
+                self._unwatch(conn)
+                self.parked.append(conn)
+            return
+        try:
+            peer_ip, peer_port = conn.getpeername()[:2]
+            # Options live on the socket, so the worker gets them too
+            conn.setblocking(True)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            index = route(head[:end + 4], peer_ip, len(self.channels))
+            socket.send_fds(self.channels[index], [f'{peer_ip} {peer_port}'.encode()], [conn.fileno()])
+        except OSError:
+            pass  # the client left, or its worker is stuck: the client retries
+        self._drop(conn)
+
+    def _watch(self, conn):
+        try:
+            self.selector.register(conn, selectors.EVENT_READ)
+        except KeyError:
+            pass  # already watched
+
+    def _unwatch(self, conn):
+        try:
+            self.selector.unregister(conn)
+        except KeyError:
+            pass
+
+    def _drop(self, conn):
+        """Forget our copy of a connection (a handed-off one lives on in the worker)."""
+        self._unwatch(conn)
+        self.deadlines.pop(conn, None)
+        if conn in self.parked:
+            self.parked.remove(conn)
+        conn.close()
+
+
+class HandoffListener:
+    """
+    Listening-socket stand-in for a worker: accepting a connection means
+    receiving one the front end routed here. Plugs into eventlet.wsgi,
+    gevent.pywsgi and the Werkzeug server alike.
+    """
+    family, type, proto = socket.AF_INET, socket.SOCK_STREAM, 0
+
+    def __init__(self, fd, address):
+        self.channel = socket.socket(fileno=fd)
+        self.address = address
+        self.timeout = self.channel.gettimeout()
+
+    def fileno(self):
+        return self.channel.fileno()
+
+    def getsockname(self):
+        return self.address
+
+    def setblocking(self, flag):
+        self.channel.setblocking(flag)
+        self.timeout = self.channel.gettimeout()
+
+    def _accept(self):
+        """(descriptor, peer address) of the next handed-off connection."""
+        peer, fds, _, _ = socket.recv_fds(self.channel, 256, 1)
+        if not fds:
+            raise OSError("front end closed the handoff channel")
+        ip, _, port = peer.decode().rpartition(' ')
+        return fds[0], (ip, int(port))
+
+    def accept(self):
+        while True:
+            try:
+                fd, address = self._accept()
+                return socket.socket(fileno=fd), address
+            except BlockingIOError:
+                # Green sockets don't wait in recvmsg; select is green under eventlet
+                select.select([self.channel], [], [])
+
+    def close(self):
+        self.channel.close()
+
+
+def serve_worker(app, async_mode, fd, address):
+    """Serve app on connections handed over by the front end (see FrontEnd)."""
+    app.wsgi_app = close_unkeyed(app.wsgi_app)
+    listener = HandoffListener(fd, address)
+    if async_mode == 'eventlet':
+        import eventlet.wsgi
+        eventlet.wsgi.server(listener, app, log_output=False)
+    elif async_mode == 'gevent':
+        from gevent import pywsgi
+        try:
+            from geventwebsocket.handler import WebSocketHandler
+            handler = {'handler_class': WebSocketHandler}
+        except ImportError:
+            handler = {}  # WebSockets come from simple-websocket instead
+        listener.setblocking(False)
+        pywsgi.WSGIServer(listener, app, log=None, **handler).serve_forever()
+    else:
+        from werkzeug.serving import ThreadedWSGIServer
+        # Werkzeug always opens a socket of its own: bind it anywhere, then swap
+        server = ThreadedWSGIServer('127.0.0.1', 0, app)
+        server.socket.close()
+        server.socket = listener
+        server.serve_forever()
+
+
+def worker_journal(i):
+    """Each worker rotates its own journal file; they can't share one."""
+    root, ext = os.path.splitext(config.JOURNAL_PATH)
+    return f"{root}.{i}{ext}"
+
+
+def spawn_workers(count, port, queue_url):
+    """Start the workers; returns them and the front end's end of each handoff channel."""
+    procs, channels = [], []
+    for i in range(count):
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # A worker that stops taking connections must not stall the others' routing
+        ours.settimeout(1.0)
+        env = dict(os.environ,
+                   FLICK_JOURNAL=worker_journal(i),
+                   FLICK_PORT=str(port),
+                   FLICK_HANDOFF_FD=str(theirs.fileno()),
+                   FLICK_DEBUG='0',
+                   FLICK_MESSAGE_QUEUE=queue_url,
+                   FLICK_WORKER_INDEX=str(i),
+                   # Only worker 0 gets video traffic; the rest run the no-video profile
+                   FLICK_VIDEO='1' if i == 0 and config.VIDEO else '0',
+                   FLICK_WORKERS=str(count))
+        procs.append(subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], env=env,
+                                      pass_fds=(theirs.fileno(),)))
+        theirs.close()
+        channels.append(ours)
+    return procs, channels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=config.WORKERS)
+    parser.add_argument('--host', default=config.HOST)
+    parser.add_argument('--port', type=int, default=config.PORT)
+    parser.add_argument('--broker-port', type=int, default=6390)
+    args = parser.parse_args()
+
+    queue_url = config.MESSAGE_QUEUE
+    if not queue_url:
+        Broker('127.0.0.1', args.broker_port).start()
+        queue_url = f'flick://127.0.0.1:{args.broker_port}'
+
+    listener = socket.create_server((args.host, args.port), backlog=1024)
+    procs, channels = spawn_workers(args.workers, args.port, queue_url)
+    print(f"🎮 Flick Games cluster: {args.workers} workers on :{args.port} (backplane {queue_url})")
+
+    def shutdown(*_):
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=5)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        FrontEnd(listener, channels).serve_forever()
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
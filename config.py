@@ -0,0 +1,102 @@
+"""
+Server settings, overridable through FLICK_* environment variables.
+
+    FLICK_ASYNC_MODE=gevent python app.py
+"""
+import importlib.util
+import os
+
+# Socket.IO / WSGI backends Flask-SocketIO can run on. Flask is WSGI, so
+# there is no asyncio option; eventlet and gevent give the same
+# cooperative single-thread model.
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+
+
+def _detect_async_mode():
+    """First installed cooperative backend, falling back to threads."""
+    for mode in ('eventlet', 'gevent'):
+        if importlib.util.find_spec(mode) is not None:
+            return mode
+    return 'threading'
+
+
+def _async_mode():
+    mode = os.environ.get('FLICK_ASYNC_MODE', 'auto').strip().lower()
+    if mode == 'auto':
+        return _detect_async_mode()
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"FLICK_ASYNC_MODE must be 'auto' or one of {', '.join(ASYNC_MODES)}, got {mode!r}")
+    return mode
+
+
+ASYNC_MODE = _async_mode()
+HOST = os.environ.get('FLICK_HOST', '0.0.0.0')
+PORT = int(os.environ.get('FLICK_PORT', '5001'))
+DEBUG = os.environ.get('FLICK_DEBUG', '1') == '1'
+
+# Sessions idle this long are dropped if their socket is gone
+SESSION_IDLE_TIMEOUT = float(os.environ.get('FLICK_SESSION_IDLE_TIMEOUT', '60'))
+# Game pages send 'heartbeat' this often; one silent for HEARTBEAT_TIMEOUT
+# is evicted even if its transport still looks connected
+HEARTBEAT_INTERVAL = float(os.environ.get('FLICK_HEARTBEAT_INTERVAL', '5'))
+HEARTBEAT_TIMEOUT = float(os.environ.get('FLICK_HEARTBEAT_TIMEOUT', '15'))
+# The sweeper only touches due sessions, so it can run often
+REAP_INTERVAL = float(os.environ.get('FLICK_REAP_INTERVAL', '2'))
+
+# Hands/ball relay rate per room in Hz; 0 relays every message immediately
+TICK_RATE = float(os.environ.get('FLICK_TICK_RATE', '30'))
+
+# Server-authoritative minigolf/boxing rooms (off by default: plain relay)
+SIMULATION = os.environ.get('FLICK_SIMULATION', '0') == '1'
+SIM_TICK_RATE = float(os.environ.get('FLICK_SIM_TICK_RATE', '30'))
+
+# Multi-process mode (see cluster.py): pub/sub backplane shared by workers,
+# either redis://host:port or the in-repo broker at flick://host:port
+MESSAGE_QUEUE = os.environ.get('FLICK_MESSAGE_QUEUE') or None
+WORKERS = int(os.environ.get('FLICK_WORKERS', str(os.cpu_count() or 1)))
+WORKER_INDEX = int(os.environ.get('FLICK_WORKER_INDEX', '0'))
+# Set by cluster.py: the worker takes its connections from this descriptor
+# (handed over by the front end) instead of listening on PORT
+HANDOFF_FD = int(os.environ['FLICK_HANDOFF_FD']) if os.environ.get('FLICK_HANDOFF_FD') else None
+
+# 0 = no-video profile: /video_feed and /video_frame are not served
+VIDEO = os.environ.get('FLICK_VIDEO', '1') == '1'
+
+# /video_feed quality ladder: a viewer whose link backs up steps down
+# towards these bounds (smaller, lower quality, fewer frames per second)
+VIDEO_MAX_FPS = float(os.environ.get('FLICK_VIDEO_MAX_FPS', '30'))
+VIDEO_MIN_FPS = float(os.environ.get('FLICK_VIDEO_MIN_FPS', '5'))
+VIDEO_MIN_QUALITY = int(os.environ.get('FLICK_VIDEO_MIN_QUALITY', '35'))
+VIDEO_MIN_SCALE = float(os.environ.get('FLICK_VIDEO_MIN_SCALE', '0.5'))
+VIDEO_QUALITY_STEPS = int(os.environ.get('FLICK_VIDEO_QUALITY_STEPS', '3'))
+
+# Static games tree served by app.py (see static_assets.py)
+STATIC_ROOT = os.environ.get('FLICK_STATIC_ROOT', 'public')
+
+# Longest a GET /hands|/aim|/game_state|/game?since=<version> long-poll waits
+LONG_POLL_TIMEOUT = float(os.environ.get('FLICK_LONG_POLL_TIMEOUT', '20'))
+
+# Upper bound on tracked controllers; the least recently used is evicted
+MAX_CONTROLLERS = int(os.environ.get('FLICK_MAX_CONTROLLERS', '256'))
+
+# Event journal (see journal.py): JSON lines in a rotating file, written
+# by a background thread. FLICK_JOURNAL_SAMPLE keeps a fraction of some
+# event types, e.g. "connect=0.1,flick=0.5"; unlisted types are all kept.
+# FLICK_JOURNAL_CONSOLE=1 also prints each event, handy in development.
+JOURNAL_PATH = os.environ.get('FLICK_JOURNAL', 'flick-journal.log')
+JOURNAL_LEVEL = os.environ.get('FLICK_JOURNAL_LEVEL', 'INFO').upper()
+JOURNAL_MAX_BYTES = int(os.environ.get('FLICK_JOURNAL_MAX_BYTES', str(5 * 1024 * 1024)))
+JOURNAL_BACKUPS = int(os.environ.get('FLICK_JOURNAL_BACKUPS', '3'))
+JOURNAL_QUEUE = int(os.environ.get('FLICK_JOURNAL_QUEUE', '10000'))
+JOURNAL_CONSOLE = os.environ.get('FLICK_JOURNAL_CONSOLE', '0') == '1'
+
+
+def _sample_rates(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+JOURNAL_SAMPLE = _sample_rates(os.environ.get('FLICK_JOURNAL_SAMPLE', ''))
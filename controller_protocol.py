@@ -0,0 +1,204 @@
+"""
+Compact binary encoding of one camera frame's worth of controller input.
+
+gptScript1.py used to send aim, hands, frame and gestures as separate
+JSON requests. A ControllerUpdate carries all of them in one body that
+the server decodes once (POST /controller_update or the Socket.IO
+'controller_update' event):
+
+    header   <B version> <B flags> <d capture time> <I sender>
+    AIM      <f x> <f y>
+    HANDS    <f left x> <f left y> <f right x> <f right y>
+    FLICKS   <B count> then count x <f vx> <f vy> <f magnitude> <B hand> <d detected> <d captured> <I seq>
+    PUNCHES  <B count> then count x <f power> <f velocity_z> <B hand> <d detected> <d captured> <I seq>
+    STATE    <B len> status utf-8, <H len> message utf-8
+    FRAME    <I len> JPEG bytes
+
+Sections are present only when their flag is set, in the order above.
+All integers and floats are little-endian.
+
+A sender retries events whose request failed or timed out, and the
+server may already have applied them. So every flick and punch carries
+a seq that increases per sender, and the header names the sender (a
+random id chosen at its start). The server applies each (sender, seq)
+at most once.
+
+Events batched into one update were captured on different frames, so
+each carries its own capture time; the header's is the newest frame's.
+Version 2 bodies (no per-event capture time: events get the header's)
+and version 1 bodies (no sender or seqs either, so not deduplicated)
+are still accepted.
+"""
+import struct
+
+MEDIA_TYPE = 'application/x-flick-update'
+VERSION = 3
+
+AIM, HANDS, FLICKS, PUNCHES, STATE, FRAME = (1 << i for i in range(6))
+
+HEADER = struct.Struct('<BBdI')
+POINT = struct.Struct('<ff')
+HAND_PAIR = struct.Struct('<ffff')
+COUNT = struct.Struct('<B')
+FLICK = struct.Struct('<fffBddI')
+PUNCH = struct.Struct('<ffBddI')
+# Version 1 and 2 layouts, decode only
+FLICK_V2 = struct.Struct('<fffBdI')
+PUNCH_V2 = struct.Struct('<ffBdI')
+HEADER_V1 = struct.Struct('<BBd')
+FLICK_V1 = struct.Struct('<fffBd')
+PUNCH_V1 = struct.Struct('<ffBd')
+TEXT8 = struct.Struct('<B')
+TEXT16 = struct.Struct('<H')
+FRAME_LEN = struct.Struct('<I')
+
+HAND_NAMES = ('Left', 'Right')
+MAX_EVENTS = 255
+
+
+class ProtocolError(ValueError):
+    """The body is not a valid controller update."""
+
+
+def _hand_code(name):
+    return 1 if name == 'Right' else 0
+
+
+def _text(value, limit):
+    return str(value or '').encode('utf-8')[:limit]
+
+
+def _stamps(rest, t_capture):
+    """t_capture and seq from an event's trailing fields, whichever its version has."""
+    if len(rest) == 2:
+        return {"t_capture": rest[0], "seq": rest[1]}
+    return {"t_capture": t_capture, "seq": rest[0] if rest else 0}
+
+
+class ControllerUpdate:
+    """
+    Everything a controller has to say about one frame.
+
+    Fields use the same dict shapes as the JSON endpoints, so the server
+    applies them with the existing setters.
+    """
+    __slots__ = ('t_capture', 'sender', 'aim', 'hands', 'flicks', 'punches', 'game_state', 'jpeg')
+
+    def __init__(self, t_capture=0.0, sender=0):
+        self.t_capture = t_capture
+        self.sender = sender    # random id of the sending process; 0 = no dedup
+        self.aim = None         # {"x", "y"}
+        self.hands = None       # {"left": {"x", "y"}, "right": {"x", "y"}}
+        self.flicks = []        # [{"vx", "vy", "magnitude", "hand", "timestamp", "t_capture", "seq"}]
+        self.punches = []       # [{"power", "velocity_z", "hand", "timestamp", "t_capture", "seq"}]
+        self.game_state = None  # {"status", "message"}
+        self.jpeg = None
+
+    def __bool__(self):
+        return bool(self.aim or self.hands or self.flicks or self.punches
+                    or self.game_state or self.jpeg)
+
+    def absorb(self, older):
+        """Fold in an older update that was never sent: its events are kept, newer state wins."""
+        self.flicks[:0] = older.flicks
+        self.punches[:0] = older.punches
+        self.aim = self.aim or older.aim
+        self.hands = self.hands or older.hands
+        self.game_state = self.game_state or older.game_state
+        self.jpeg = self.jpeg or older.jpeg
+        return self
+
+    def encode(self):
+        flags = ((AIM if self.aim else 0) | (HANDS if self.hands else 0)
+                 | (FLICKS if self.flicks else 0) | (PUNCHES if self.punches else 0)
+                 | (STATE if self.game_state else 0) | (FRAME if self.jpeg else 0))
+        parts = [HEADER.pack(VERSION, flags, self.t_capture, self.sender)]
+        if self.aim:
+            parts.append(POINT.pack(self.aim['x'], self.aim['y']))
+        if self.hands:
+            left, right = self.hands['left'], self.hands['right']
+            parts.append(HAND_PAIR.pack(left['x'], left['y'], right['x'], right['y']))
+        if self.flicks:
+            flicks = self.flicks[:MAX_EVENTS]
+            parts.append(COUNT.pack(len(flicks)))
+            parts += [FLICK.pack(f['vx'], f['vy'], f.get('magnitude', 0.0),
+                                 _hand_code(f.get('hand')), f.get('timestamp', 0.0),
+                                 f.get('t_capture') or self.t_capture, f.get('seq', 0))
+                      for f in flicks]
+        if self.punches:
+            punches = self.punches[:MAX_EVENTS]
+            parts.append(COUNT.pack(len(punches)))
+            parts += [PUNCH.pack(p['power'], p.get('velocity_z', 0.0),
+                                 _hand_code(p.get('hand')), p.get('timestamp', 0.0),
+                                 p.get('t_capture') or self.t_capture, p.get('seq', 0))
+                      for p in punches]
+        if self.game_state:
+            status = _text(self.game_state.get('status'), 0xFF)
+            message = _text(self.game_state.get('message'), 0xFFFF)
+            parts += [TEXT8.pack(len(status)), status, TEXT16.pack(len(message)), message]
+        if self.jpeg:
+            parts += [FRAME_LEN.pack(len(self.jpeg)), bytes(self.jpeg)]
+        return b''.join(parts)
+
+    @classmethod
+    def decode(cls, data):
+        view = memoryview(data)
+        offset = 0
+
+        def take(layout):
+            nonlocal offset
+            if offset + layout.size > len(view):
+                raise ProtocolError("controller update is truncated")
+            values = layout.unpack_from(view, offset)
+            offset += layout.size
+            return values
+
+        def take_bytes(size):
+            nonlocal offset
+            if offset + size > len(view):
+                raise ProtocolError("controller update is truncated")
+            chunk = view[offset:offset + size]
+            offset += size
+            return chunk
+
+        if not len(view):
+            raise ProtocolError("controller update is truncated")
+        version = view[0]
+        if version == VERSION:
+            _, flags, t_capture, sender = take(HEADER)
+            flick_layout, punch_layout = FLICK, PUNCH
+        elif version == 2:
+            _, flags, t_capture, sender = take(HEADER)
+            flick_layout, punch_layout = FLICK_V2, PUNCH_V2
+        elif version == 1:
+            _, flags, t_capture = take(HEADER_V1)
+            sender = 0
+            flick_layout, punch_layout = FLICK_V1, PUNCH_V1
+        else:
+            raise ProtocolError(f"unsupported controller update version {version}")
+        update = cls(t_capture, sender)
+        if flags & AIM:
+            x, y = take(POINT)
+            update.aim = {"x": x, "y": y}
+        if flags & HANDS:
+            lx, ly, rx, ry = take(HAND_PAIR)
+            update.hands = {"left": {"x": lx, "y": ly}, "right": {"x": rx, "y": ry}}
+        if flags & FLICKS:
+            for _ in range(take(COUNT)[0]):
+                vx, vy, magnitude, hand, detected, *rest = take(flick_layout)
+                update.flicks.append({"vx": vx, "vy": vy, "magnitude": magnitude,
+                                      "hand": HAND_NAMES[hand & 1], "timestamp": detected,
+                                      **_stamps(rest, t_capture)})
+        if flags & PUNCHES:
+            for _ in range(take(COUNT)[0]):
+                power, velocity_z, hand, detected, *rest = take(punch_layout)
+                update.punches.append({"power": power, "velocity_z": velocity_z,
+                                       "hand": HAND_NAMES[hand & 1], "timestamp": detected,
+                                       **_stamps(rest, t_capture)})
+        if flags & STATE:
+            status = bytes(take_bytes(take(TEXT8)[0])).decode('utf-8', 'replace')
+            message = bytes(take_bytes(take(TEXT16)[0])).decode('utf-8', 'replace')
+            update.game_state = {"status": status, "message": message}
+        if flags & FRAME:
+            update.jpeg = bytes(take_bytes(take(FRAME_LEN)[0]))
+        return update
@@ -0,0 +1,245 @@
+"""
+Background sender for the camera controller's /controller_update messages.
+
+Everything the inference stage produces goes through one thread that
+owns a keep-alive HTTP session, so no send ever blocks the camera loop.
+Messages are sorted into three lanes, highest priority first:
+
+- events (flicks, punches, game state changes): kept in order, retried
+  with exponential backoff, and only dropped when the lane overflows or
+  every retry failed. A request that timed out may still have been
+  applied, so flicks and punches carry a per-sender seq and the server
+  ignores the copies a retry delivers again
+- positions (aim, hands): coalesced, only the newest value is sent
+- frames (preview image): coalesced, and only encoded once nothing of
+  higher priority is waiting
+
+Every send carries the pending events plus the newest positions; a frame
+rides along only when no events are queued, so gestures never wait for
+JPEG encoding. If the server replies that it serves no video (a cluster
+worker other than the video one), frames go as raw JPEG to frame_url on
+a connection of their own instead. Counters are available from stats().
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from controller_protocol import ControllerUpdate, MEDIA_TYPE
+
+LANES = ('events', 'positions', 'frames')
+
+
+class ControllerSender:
+    """Prioritised, coalescing, retrying sender on a persistent session."""
+
+    def __init__(self, url, headers=None, timeout=0.1, retries=3, backoff=0.05,
+                 max_backoff=0.5, max_events=256, encode_frame=None, on_reply=None,
+                 frame_url=None):
+        self.url = url
+        self.frame_url = frame_url
+        self.frames_separate = False  # set once the server says it has no video
+        self.headers = {**(headers or {}), "Content-Type": MEDIA_TYPE}
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_events = max_events
+        self.encode_frame = encode_frame or bytes
+        self.on_reply = on_reply
+
+        self.session = requests.Session()
+        # One pooled connection, reused for every send; retries are ours
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+        # Frames sent apart get their own connection, routed on its own by cluster.py
+        self.frame_session = requests.Session()
+        self.frame_headers = {**(headers or {}), "Content-Type": "image/jpeg"}
+
+        self.counters = {f"{lane}_{what}": 0 for lane in LANES
+                         for what in ('queued', 'sent', 'coalesced', 'dropped', 'failed')}
+        self.counters['retries'] = 0
+        # Names this process in every update; with the per-event seq it lets
+        # the server drop events a retry delivers twice
+        self.sender_id = random.getrandbits(32) or 1
+        self._event_seq = 0
+        self._cond = threading.Condition()
+        self._events = ControllerUpdate()
+        self._event_attempts = 0
+        self._retry_at = 0.0
+        self._aim = self._hands = None
+        self._frame = None
+        self._t_capture = 0.0
+        self._running = False
+        self._thread = None
+
+    # ---- called from the inference stage ----
+
+    def event(self, kind, data):
+        """Queue a flick, punch or game_state change."""
+        with self._cond:
+            if kind == 'game_state':
+                if self._events.game_state is not None:
+                    self.counters['events_coalesced'] += 1
+                self._events.game_state = data
+            else:
+                self._event_seq += 1
+                events = self._events.flicks if kind == 'flick' else self._events.punches
+                events.append({**data, 'seq': self._event_seq})
+                if len(self._events.flicks) + len(self._events.punches) > self.max_events:
+                    events.pop(0)
+                    self.counters['events_dropped'] += 1
+            self.counters['events_queued'] += 1
+            self._cond.notify()
+
+    def position(self, kind, data, t_capture=0.0):
+        """Set the newest aim or hands; an unsent older value is replaced."""
+        with self._cond:
+            if (self._aim if kind == 'aim' else self._hands) is not None:
+                self.counters['positions_coalesced'] += 1
+            if kind == 'aim':
+                self._aim = data
+            else:
+                self._hands = data
+            self._t_capture = t_capture or self._t_capture
+            self.counters['positions_queued'] += 1
+            self._cond.notify()
+
+    def frame(self, image, t_capture=0.0):
+        """Offer a preview frame; it is encoded on the sender thread, if still newest."""
+        with self._cond:
+            if self._frame is not None:
+                self.counters['frames_coalesced'] += 1
+            self._frame = image
+            self._t_capture = t_capture or self._t_capture
+            self.counters['frames_queued'] += 1
+            self._cond.notify()
+
+    # ---- sender thread ----
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='sender', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """Send what is queued (within timeout), then stop the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.session.close()
+        self.frame_session.close()
+
+    def _has_events(self):
+        return bool(self._events.flicks or self._events.punches or self._events.game_state)
+
+    def _ready(self):
+        events_due = self._has_events() and time.monotonic() >= self._retry_at
+        return events_due or self._aim is not None or self._hands is not None or self._frame is not None
+
+    def _take(self):
+        """Build the next update from the lanes (called with the lock held)."""
+        update = ControllerUpdate(self._t_capture, self.sender_id)
+        if self._has_events() and time.monotonic() >= self._retry_at:
+            update.absorb(self._events)
+            self._events = ControllerUpdate()
+            # Each event keeps its own capture time; the header is the newest
+            captured = [e.get('t_capture') for e in update.flicks + update.punches]
+            captured = [t for t in captured if isinstance(t, (int, float))]
+            update.t_capture = max(captured + [update.t_capture])
+        update.aim, update.hands = self._aim, self._hands
+        self._aim = self._hands = None
+        frame = None
+        if not (update.flicks or update.punches or update.game_state):
+            frame, self._frame = self._frame, None
+        return update, frame
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready():
+                    wait = self._retry_at - time.monotonic() if self._has_events() else None
+                    self._cond.wait(wait if wait is None or wait > 0 else 0.001)
+                if not self._running and not self._ready():
+                    return
+                update, frame = self._take()
+            jpeg = None
+            if frame is not None:
+                jpeg = self.encode_frame(frame)
+                if jpeg is None:
+                    self.counters['frames_dropped'] += 1
+            if jpeg is not None and self.frames_separate:
+                self._send(update, False)
+                self._send_frame(jpeg)
+            else:
+                update.jpeg = jpeg
+                self._send(update, jpeg is not None)
+
+    def _send(self, update, has_frame):
+        counts = {'events': len(update.flicks) + len(update.punches) + bool(update.game_state),
+                  'positions': bool(update.aim) + bool(update.hands), 'frames': int(has_frame)}
+        if not update:
+            return
+        try:
+            resp = self.session.post(self.url, data=update.encode(), headers=self.headers,
+                                     timeout=self.timeout)
+            ok = resp.status_code == 200
+            reply = resp.json() if ok else {}
+            if reply.get('video') is False and self.frame_url:
+                if counts['frames']:
+                    self.counters['frames_dropped'] += 1  # the server discarded it
+                    counts['frames'] = 0
+                self.frames_separate = True
+            if ok and self.on_reply:
+                self.on_reply(reply)
+        except (requests.RequestException, ValueError):
+            ok = False
+
+        with self._cond:
+            for lane, count in counts.items():
+                self.counters[f"{lane}_{'sent' if ok else 'failed'}"] += count
+        if ok:
+            self._event_attempts = 0
+        elif counts['events']:
+            self._retry_events(update)
+
+    def _send_frame(self, jpeg):
+        try:
+            ok = self.frame_session.post(self.frame_url, data=jpeg, headers=self.frame_headers,
+                                         timeout=self.timeout).status_code == 200
+        except requests.RequestException:
+            ok = False
+        with self._cond:
+            self.counters[f"frames_{'sent' if ok else 'failed'}"] += 1
+
+    def _retry_events(self, update):
+        """Put failed events back at the front of their lane, or give up on them."""
+        self._event_attempts += 1
+        if self._event_attempts > self.retries:
+            with self._cond:
+                self.counters['events_dropped'] += (len(update.flicks) + len(update.punches)
+                                                    + bool(update.game_state))
+            self._event_attempts = 0
+            return
+        failed = ControllerUpdate(update.t_capture)
+        failed.flicks, failed.punches, failed.game_state = update.flicks, update.punches, update.game_state
+        delay = min(self.backoff * 2 ** (self._event_attempts - 1), self.max_backoff)
+        with self._cond:
+            self._events = self._events.absorb(failed)
+            self._retry_at = time.monotonic() + delay
+            self.counters['retries'] += 1
+
+    def stats(self):
+        """
+        Message counters per lane: queued, sent, coalesced, dropped, failed.
+
+        A failed event is retried, so it can count as failed several times
+        before it is finally sent or dropped; retries counts the re-queues.
+        """
+        with self._cond:
+            return dict(self.counters)
@@ -0,0 +1,113 @@
+"""
+Local cache of the server-side state the camera controller reacts to.
+
+The controller needs to know which game is active (it picks the gesture
+set) on every hand of every frame, but that value changes about once a
+session. Instead of asking the server each time, gptScript1.py keeps a
+StateCache that is fed from two places:
+
+- every /controller_update reply piggybacks the active game, the game
+  state and their versions (see ControllerSender's on_reply)
+- StateWatcher threads long-poll GET /game and /game_state?since=<version>,
+  so a change made by a game page arrives even while nothing is sent
+
+Reads are a dict lookup. A value nobody has confirmed for max_age seconds
+(server unreachable) is treated as unknown rather than trusted forever.
+"""
+import threading
+import time
+
+import requests
+
+
+class StateCache:
+    """Newest known value, version and confirmation time per field."""
+
+    def __init__(self, max_age=30.0):
+        self.max_age = max_age
+        self._entries = {}  # {field: (value, version, confirmed at)}
+        self._lock = threading.Lock()
+
+    def update(self, field, value, version=None):
+        """Store a value; one older than the version already held is ignored."""
+        with self._lock:
+            held = self._entries.get(field)
+            if held and version is not None and held[1] is not None and version < held[1]:
+                return
+            self._entries[field] = (value, version, time.monotonic())
+
+    def confirm(self, field, version):
+        """The server says field is still at version: refresh its age."""
+        with self._lock:
+            held = self._entries.get(field)
+            if held and held[1] == version:
+                self._entries[field] = (held[0], version, time.monotonic())
+
+    def get(self, field, default=None):
+        """Cached value, or default if it was never seen or has gone stale."""
+        held = self._entries.get(field)
+        if held is None or time.monotonic() - held[2] > self.max_age:
+            return default
+        return held[0]
+
+    def version(self, field):
+        held = self._entries.get(field)
+        return held[1] if held else None
+
+    def apply_reply(self, reply):
+        """Take the state piggybacked on a /controller_update reply."""
+        versions = reply.get('versions') or {}
+        if 'game' in reply:
+            self.update('active_game', reply['game'], versions.get('active_game'))
+        if 'game_state' in reply:
+            self.update('game_state', reply['game_state'], versions.get('game_state'))
+
+
+class StateWatcher(threading.Thread):
+    """Long-polls one versioned GET endpoint and feeds changes into a StateCache."""
+
+    def __init__(self, url, field, cache, headers=None, parse=None, poll_timeout=20.0,
+                 retry_delay=1.0, max_retry_delay=10.0):
+        super().__init__(name=f'watch-{field}', daemon=True)
+        self.url = url
+        self.field = field
+        self.cache = cache
+        self.headers = headers or {}
+        self.parse = parse or (lambda body: body)
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.session = requests.Session()
+        self._halt = threading.Event()
+
+    def poll_once(self):
+        """One long-poll round trip; returns False on a network or server error."""
+        since = self.cache.version(self.field)
+        params = {} if since is None else {'since': since, 'timeout': self.poll_timeout}
+        try:
+            resp = self.session.get(self.url, params=params, headers=self.headers,
+                                    timeout=self.poll_timeout + 5)
+        except requests.RequestException:
+            return False
+        version = resp.headers.get('X-State-Version')
+        version = int(version) if version and version.isdigit() else None
+        if resp.status_code == 304:
+            self.cache.confirm(self.field, version)
+        elif resp.status_code == 200:
+            self.cache.update(self.field, self.parse(resp.json()), version)
+        else:
+            return False
+        return True
+
+    def run(self):
+        delay = self.retry_delay
+        while not self._halt.is_set():
+            if self.poll_once():
+                delay = self.retry_delay
+            else:
+                self._halt.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def stop(self):
+        self._halt.set()
+        self.session.close()
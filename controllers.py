@@ -0,0 +1,217 @@
+"""Per-controller input state, so one server can host many cameras."""
+import threading
+import time
+from collections import OrderedDict
+
+from gesture_events import GestureEventLog
+
+DEFAULT_CONTROLLER = 'default'
+# Gesture events kept per controller for reconnecting consumers
+CONTROLLER_EVENT_HISTORY = 64
+# Bounds on a payload kept from a client (see compact)
+MAX_EVENT_FIELDS = 16  # keys per object, items per list
+MAX_TEXT = 64          # characters per key and per string
+MAX_NESTING = 2        # objects/lists inside the top-level payload
+MAX_EVENT_BYTES = 1024 # roughly the JSON size of the whole kept payload
+
+# Versions start at the boot time in ms, so a client's ?since= from before
+# a server restart can't match a new version by accident
+VERSION_BASE = int(time.time() * 1000)
+# State that GET endpoints can long-poll on
+VERSIONED_FIELDS = ('hands', 'aim', 'game_state', 'active_game')
+
+DEFAULT_HANDS = {"left": {"x": 0.3, "y": 0.5}, "right": {"x": 0.7, "y": 0.5}}
+DEFAULT_GAME_STATE = {"status": "waiting", "message": "Show high-five to start"}
+
+
+def point(data, default):
+    """{x, y} with float coordinates, falling back to default."""
+    if not isinstance(data, dict):
+        return dict(default)
+    try:
+        return {"x": float(data.get("x", default["x"])), "y": float(data.get("y", default["y"]))}
+    except (TypeError, ValueError):
+        return dict(default)
+
+
+_DROPPED = object()
+# Rough JSON cost of a number, boolean or null
+_SCALAR_BYTES = 8
+
+
+def _compact_value(value, depth, budget):
+    """
+    Bounded copy of one JSON value, or _DROPPED if it can't be kept.
+
+    budget is a one-item list holding the bytes left for the payload;
+    whatever is kept is charged to it.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        cost = _SCALAR_BYTES
+    elif isinstance(value, str):
+        value = value[:MAX_TEXT]
+        cost = len(value) + 2
+    elif depth <= 0:
+        return _DROPPED
+    elif isinstance(value, dict):
+        return _compact_object(value, depth - 1, budget)
+    elif isinstance(value, (list, tuple)):
+        if budget[0] < 2:
+            return _DROPPED
+        budget[0] -= 2
+        items = []
+        for item in value[:MAX_EVENT_FIELDS]:
+            item = _compact_value(item, depth - 1, budget)
+            if item is not _DROPPED:
+                items.append(item)
+        return items
+    else:
+        return _DROPPED
+    if cost > budget[0]:
+        return _DROPPED
+    budget[0] -= cost
+    return value
+
+
+def _compact_object(data, depth, budget):
+    out = {}
+    if budget[0] < 2:
+        return _DROPPED
+    budget[0] -= 2
+    for key, value in data.items():
+        if len(out) >= MAX_EVENT_FIELDS or budget[0] <= 0:
+            break
+        key = str(key)[:MAX_TEXT]
+        key_cost = len(key) + 3
+        if key_cost >= budget[0]:
+            continue
+        budget[0] -= key_cost
+        value = _compact_value(value, depth, budget)
+        if value is _DROPPED:
+            budget[0] += key_cost
+        else:
+            out[key] = value
+    return out
+
+
+def compact(data, depth=MAX_NESTING):
+    """
+    Copy of a payload reduced to bounded size, so stored events stay small.
+
+    Kept: numbers, booleans, null, strings (cut to MAX_TEXT characters)
+    and objects/lists nested up to MAX_NESTING levels below the payload,
+    in payload order until about MAX_EVENT_BYTES of JSON are used.
+    Dropped: keys after the first MAX_EVENT_FIELDS, list items after
+    the first MAX_EVENT_FIELDS, anything nested deeper than MAX_NESTING,
+    anything past the size budget, and values of other types. Gesture
+    events, game state and the joystick all pass through here.
+    """
+    if not isinstance(data, dict):
+        return {}
+    return _compact_object(data, depth, [MAX_EVENT_BYTES])
+
+
+class Controller:
+    """Everything one camera/controller has told the server, in fixed-size fields."""
+    __slots__ = ('id', 'joystick', 'aim', 'hands', 'game_state', 'active_game',
+                 'gestures', 'legacy_cursors', 'binding', 'last_seen', 'versions', 'changed',
+                 'event_sender', 'event_seq')
+
+    def __init__(self, cid):
+        self.id = cid
+        self.joystick = {"x": 0, "y": 0, "sw": 0}
+        self.aim = {"x": 0.5, "y": 0.5}
+        self.hands = {"left": dict(DEFAULT_HANDS["left"]), "right": dict(DEFAULT_HANDS["right"])}
+        self.game_state = dict(DEFAULT_GAME_STATE)
+        self.active_game = None
+        self.gestures = GestureEventLog(CONTROLLER_EVENT_HISTORY)
+        self.legacy_cursors = {"flick": 0, "punch": 0}  # read position of the old consume-once GETs
+        self.binding = None  # ('player', sid) | ('player', sid, room_code) | ('room', room_code)
+        self.last_seen = time.monotonic()
+        self.versions = dict.fromkeys(VERSIONED_FIELDS, VERSION_BASE)
+        self.changed = threading.Condition()
+        self.event_sender = 0  # controller_update sender whose events were applied last
+        self.event_seq = 0     # and the newest of its event seqs applied
+
+    def _update(self, field, value):
+        """Store a versioned field; only a real change bumps the version and wakes waiters."""
+        if getattr(self, field) == value:
+            return
+        with self.changed:
+            setattr(self, field, value)
+            self.versions[field] += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, field, since, timeout):
+        """Block until field's version differs from since (or timeout); return the version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.versions[field] != since, timeout)
+            return self.versions[field]
+
+    def fresh_event(self, sender, seq):
+        """
+        Whether a controller_update event is new, marking it as applied.
+
+        Senders retry events the server may already have applied, so each
+        (sender, seq) is accepted once; seqs only grow within a sender. A
+        new sender id (the controller restarted) starts over, and sender 0
+        (version 1 clients) is never deduplicated.
+        """
+        if not sender:
+            return True
+        with self.changed:
+            if sender != self.event_sender:
+                self.event_sender, self.event_seq = sender, 0
+            if seq <= self.event_seq:
+                return False
+            self.event_seq = seq
+            return True
+
+    def set_joystick(self, data):
+        data = compact(data)
+        self.joystick = {k: data.get(k, 0) for k in ("x", "y", "sw")}
+
+    def set_aim(self, data):
+        self._update('aim', point(data, self.aim))
+
+    def set_hands(self, data):
+        data = data if isinstance(data, dict) else {}
+        self._update('hands', {side: point(data.get(side), self.hands[side]) for side in ("left", "right")})
+
+    def set_game_state(self, data):
+        data = compact(data)
+        self._update('game_state', {"status": data.get("status", "waiting"),
+                                    "message": data.get("message", "")})
+
+    def set_active_game(self, game):
+        self._update('active_game', str(game)[:MAX_TEXT] if game else None)
+
+
+class ControllerTable:
+    """
+    Controllers by id, created on first use.
+
+    The table holds at most max_controllers entries; the least recently
+    used one is evicted to make room, so memory stays bounded no matter
+    how many ids clients make up.
+    """
+
+    def __init__(self, max_controllers):
+        self._controllers = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_controllers = max_controllers
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def get(self, cid):
+        with self._lock:
+            controller = self._controllers.get(cid)
+            if controller is None:
+                while len(self._controllers) >= self.max_controllers:
+                    self._controllers.popitem(last=False)
+                controller = self._controllers[cid] = Controller(cid)
+            else:
+                self._controllers.move_to_end(cid)
+            controller.last_seen = time.monotonic()
+            return controller
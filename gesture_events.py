@@ -0,0 +1,54 @@
+"""Sequenced gesture event log shared by the HTTP and Socket.IO endpoints."""
+import threading
+from collections import deque
+from itertools import islice
+
+# How many events are kept for late or reconnecting consumers
+EVENT_HISTORY = 256
+
+
+class GestureEventLog:
+    """
+    Append-only ring of gesture events tagged with increasing sequence numbers.
+
+    Consumers never remove anything: each one remembers the last seq it saw
+    and asks for everything after it, so two tabs can't steal each other's
+    flicks and a burst of events between polls is not lost.
+    """
+
+    def __init__(self, maxlen=EVENT_HISTORY):
+        self._events = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    @property
+    def seq(self):
+        """Sequence number of the newest event (0 = nothing yet)."""
+        return self._seq
+
+    def append(self, kind, data):
+        """Record a new event and return it as {seq, type, data}."""
+        with self._lock:
+            self._seq += 1
+            event = {'seq': self._seq, 'type': kind, 'data': data}
+            self._events.append(event)
+        return event
+
+    def since(self, seq, kinds=None):
+        """All retained events with a sequence number greater than seq."""
+        with self._lock:
+            if not self._events:
+                return []
+            # Sequence numbers are contiguous, so the offset is arithmetic
+            first = self._events[0]['seq']
+            start = max(0, seq - first + 1)
+            events = list(islice(self._events, start, None))
+        if kinds:
+            events = [e for e in events if e['type'] in kinds]
+        return events
+
+    def next_after(self, seq, kind):
+        """Oldest event of the given type after seq, or None."""
+        for event in self.since(seq, (kind,)):
+            return event
+        return None
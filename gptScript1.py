@@ -1,23 +1,41 @@
 import mediapipe as mp
 import cv2
+import os
 import time
 import numpy as np
-import requests
-import base64
-from collections import deque
+
+from controller_sender import ControllerSender
+from controller_state import StateCache, StateWatcher
+from hand_pose import HandFrame
+from motion import MotionHistory
+from pipeline import CaptureThread, LatestSlot
+from recording import Recorder
 
 mp_hands = mp.solutions.hands
 mp_draw = mp.solutions.drawing_utils
 
 # ========== CONFIGURATION ==========
-FLASK_URL = "http://localhost:5001/flick"
-PUNCH_URL = "http://localhost:5001/punch"
-AIM_URL = "http://localhost:5001/aim"
-HANDS_URL = "http://localhost:5001/hands"
-FRAME_URL = "http://localhost:5001/video_frame"
 GAME_URL = "http://localhost:5001/game"
+GAME_STATE_URL = "http://localhost:5001/game_state"
+# One binary message per frame carries aim, hands, gestures, game state and
+# the JPEG (see controller_protocol.py); the reply says which game is active
+UPDATE_URL = "http://localhost:5001/controller_update"
+# Where frames go instead when the update's server has no video (cluster workers)
+VIDEO_FRAME_URL = "http://localhost:5001/video_frame"
 CAMERA_INDEX = 0
 
+# Identifies this camera to the server; game pages bind to it with ?controller=<id>
+CONTROLLER_ID = os.environ.get("FLICK_CONTROLLER_ID", "default")
+HEADERS = {"X-Controller-Id": CONTROLLER_ID}
+
+# FLICK_RECORD=<path> also appends every message sent to a replayable
+# recording (see recording.py)
+RECORDER = Recorder(os.environ["FLICK_RECORD"]) if os.environ.get("FLICK_RECORD") else None
+
+def record(kind, payload):
+    if RECORDER:
+        RECORDER.record(kind, payload)
+
 # Game-specific gesture mapping
 # Which gestures are enabled for each game
 GAME_GESTURES = {
@@ -27,15 +45,15 @@ GAME_GESTURES = {
     None: []  # No game active = no gestures
 }
 
+# Active game and game state as last heard from the server: piggybacked on
+# every /controller_update reply and long-polled by the watchers below.
+# Unconfirmed for STATE_MAX_AGE seconds = unknown (no gestures).
+STATE_MAX_AGE = 30.0
+server_state = StateCache(STATE_MAX_AGE)
+
 def get_active_game():
-    """Check which game is currently active."""
-    try:
-        resp = requests.get(GAME_URL, timeout=0.1)
-        if resp.status_code == 200:
-            return resp.json().get('game')
-    except:
-        pass
-    return None
+    """Check which game is currently active (cached, never blocks)."""
+    return server_state.get('active_game')
 
 # Flick detection parameters (basketball/minigolf)
 VELOCITY_THRESHOLD = 0.5   # Slightly more sensitive (was 0.6)
@@ -46,6 +64,13 @@ PUNCH_Z_THRESHOLD = 0.2   # Lower = more sensitive (was 0.35)
 PUNCH_COOLDOWN = 0.2      # Faster punching (was 0.3)
 
 HISTORY_SIZE = 8
+# FLICK_EARLY=1 lets gestures fire on the frame where the speed is still
+# rising and will pass the threshold within GESTURE_LOOKAHEAD, about half
+# a frame sooner on average. Off by default: on jittery landmarks it also
+# fires on hand movements that never reach the threshold (see
+# benchmarks/bench_motion.py). Reported speeds are always the measured ones.
+GESTURE_EARLY = os.environ.get("FLICK_EARLY", "0") == "1"
+GESTURE_LOOKAHEAD = 1 / 30
 
 # ========== GAME STATE ==========
 class GameState:
@@ -66,101 +91,25 @@ HANDS_TIMEOUT = 10.0  # 10 seconds without hands = force 5s countdown
 # Track both left and right hands
 hand_data = {
     'Left': {
-        'position_history': deque(maxlen=HISTORY_SIZE), 
-        'time_history': deque(maxlen=HISTORY_SIZE), 
+        'motion': MotionHistory(HISTORY_SIZE),
         'last_flick_time': 0, 
         'last_punch_time': 0,
         'prev_velocity': np.zeros(3)
     },
     'Right': {
-        'position_history': deque(maxlen=HISTORY_SIZE), 
-        'time_history': deque(maxlen=HISTORY_SIZE), 
+        'motion': MotionHistory(HISTORY_SIZE),
         'last_flick_time': 0, 
         'last_punch_time': 0,
         'prev_velocity': np.zeros(3)
     }
 }
 
-def is_high_five(hand_landmarks):
-    """
-    Detect high-five gesture: all fingers extended (open palm).
-    Check if all fingertips are above their corresponding knuckles.
-    """
-    tips = [
-        mp_hands.HandLandmark.THUMB_TIP,
-        mp_hands.HandLandmark.INDEX_FINGER_TIP,
-        mp_hands.HandLandmark.MIDDLE_FINGER_TIP,
-        mp_hands.HandLandmark.RING_FINGER_TIP,
-        mp_hands.HandLandmark.PINKY_TIP
-    ]
-    
-    pips = [
-        mp_hands.HandLandmark.THUMB_IP,  # For thumb, use IP joint
-        mp_hands.HandLandmark.INDEX_FINGER_PIP,
-        mp_hands.HandLandmark.MIDDLE_FINGER_PIP,
-        mp_hands.HandLandmark.RING_FINGER_PIP,
-        mp_hands.HandLandmark.PINKY_PIP
-    ]
-    
-    fingers_extended = 0
-    for tip, pip in zip(tips, pips):
-        if hand_landmarks.landmark[tip].y < hand_landmarks.landmark[pip].y:
-            fingers_extended += 1
-    
-    # All 5 fingers extended = high five
-    return fingers_extended >= 4  # Allow for some tolerance
-
-def is_fist(hand_landmarks):
-    """
-    Detect fist gesture: all fingers curled (closed hand).
-    Check if all fingertips are BELOW their corresponding knuckles.
-    """
-    tips = [
-        mp_hands.HandLandmark.INDEX_FINGER_TIP,
-        mp_hands.HandLandmark.MIDDLE_FINGER_TIP,
-        mp_hands.HandLandmark.RING_FINGER_TIP,
-        mp_hands.HandLandmark.PINKY_TIP
-    ]
-    
-    pips = [
-        mp_hands.HandLandmark.INDEX_FINGER_PIP,
-        mp_hands.HandLandmark.MIDDLE_FINGER_PIP,
-        mp_hands.HandLandmark.RING_FINGER_PIP,
-        mp_hands.HandLandmark.PINKY_PIP
-    ]
-    
-    fingers_curled = 0
-    for tip, pip in zip(tips, pips):
-        # Tip is below (higher Y) the PIP joint = finger curled
-        if hand_landmarks.landmark[tip].y > hand_landmarks.landmark[pip].y:
-            fingers_curled += 1
-    
-    # At least 3 of 4 fingers curled = fist (excluding thumb)
-    return fingers_curled >= 3
-
 # Shoot mode state: False = aim mode (open hand), True = shoot mode (fist)
 shoot_mode = False
 # Stored aim position: captured when entering shoot mode
 stored_aim = {"x": 0.5, "y": 0.5}  # Center by default
 
-def compute_velocity(positions, times):
-    if len(positions) < 2:
-        return np.zeros(3)
-    
-    recent_positions = list(positions)[-4:]
-    recent_times = list(times)[-4:]
-    
-    if len(recent_positions) < 2:
-        return np.zeros(3)
-    
-    dt = recent_times[-1] - recent_times[0]
-    if dt <= 0:
-        return np.zeros(3)
-    
-    vel = (recent_positions[-1] - recent_positions[0]) / dt
-    return vel
-
-def detect_flick(velocity, hand_label):
+def detect_flick(motion, hand_label):
     global hand_data
     
     curr_time = time.time()
@@ -169,12 +118,13 @@ def detect_flick(velocity, hand_label):
     if curr_time - data['last_flick_time'] < FLICK_COOLDOWN:
         return None
     
-    upward_speed = -velocity[1]
-    horizontal_speed = velocity[0]
+    # Upward = negative y
+    upward_speed = -motion.velocity[1]
+    horizontal_speed = motion.velocity[0]
     
-    if upward_speed > VELOCITY_THRESHOLD:
+    if motion.crosses(1, VELOCITY_THRESHOLD, -1, GESTURE_EARLY, GESTURE_LOOKAHEAD):
         hand_data[hand_label]['last_flick_time'] = curr_time
-        magnitude = np.sqrt(velocity[0]**2 + velocity[1]**2)
+        magnitude = np.hypot(horizontal_speed, upward_speed)
         
         return {
             "vx": float(horizontal_speed),
@@ -187,13 +137,15 @@ def detect_flick(velocity, hand_label):
 
 def send_flick(flick_data):
     try:
-        requests.post(FLASK_URL, json=flick_data, timeout=0.1)
+        flick_data = {**flick_data, "t_capture": capture_time}
+        record('flick', flick_data)
+        sender.event('flick', flick_data)
         print(f"🏀 FLICK ({flick_data['hand']})! vx={flick_data['vx']:.2f}, vy={flick_data['vy']:.2f}")
         return True
     except:
         return False
 
-def detect_punch(velocity, hand_label):
+def detect_punch(motion, hand_label):
     """Detect forward punch motion (positive Z velocity = forward)."""
     global hand_data
     
@@ -206,9 +158,10 @@ def detect_punch(velocity, hand_label):
     # Z velocity: positive = moving toward camera (punching forward)
     # In MediaPipe, Z is depth - closer = smaller value
     # So we detect sudden decrease in Z (moving toward camera)
-    forward_speed = -velocity[2]  # Negative Z = forward punch
+    # Negative Z = forward punch
+    forward_speed = -motion.velocity[2]
     
-    if forward_speed > PUNCH_Z_THRESHOLD:
+    if motion.crosses(2, PUNCH_Z_THRESHOLD, -1, GESTURE_EARLY, GESTURE_LOOKAHEAD):
         hand_data[hand_label]['last_punch_time'] = curr_time
         power = min(forward_speed / PUNCH_Z_THRESHOLD, 3.0)  # Cap power at 3x
         
@@ -222,7 +175,9 @@ def detect_punch(velocity, hand_label):
 
 def send_punch(punch_data):
     try:
-        requests.post(PUNCH_URL, json=punch_data, timeout=0.1)
+        punch_data = {**punch_data, "t_capture": capture_time}
+        record('punch', punch_data)
+        sender.event('punch', punch_data)
         print(f"🥊 PUNCH ({punch_data['hand']})! power={punch_data['power']:.2f}")
         return True
     except:
@@ -231,7 +186,9 @@ def send_punch(punch_data):
 def send_aim(x, y):
     """Send left hand position for trajectory aiming."""
     try:
-        requests.post(AIM_URL, json={"x": float(x), "y": float(y)}, timeout=0.02)
+        data = {"x": float(x), "y": float(y)}
+        record('aim', data)
+        sender.position('aim', data, capture_time)
     except:
         pass
 
@@ -242,7 +199,8 @@ def send_hands(left_x, left_y, right_x, right_y):
             "left": {"x": float(left_x), "y": float(left_y)},
             "right": {"x": float(right_x), "y": float(right_y)}
         }
-        requests.post(HANDS_URL, json=data, timeout=0.02)
+        record('hands', data)
+        sender.position('hands', data, capture_time)
     except:
         pass
 
@@ -250,22 +208,39 @@ def send_game_state(status, message=""):
     """Send game state to trigger auto-start/pause in games."""
     try:
         data = {"status": status, "message": message}
-        requests.post(FLASK_URL + "/game_state", json=data, timeout=0.05)
-        print(f"📡 Sent game state: {status} - {message}")
+        record('game_state', data)
+        sender.event('game_state', data)
+        print(f"📡 Queued game state: {status} - {message}")
     except:
         pass
 
 def send_frame(frame):
-    """Send frame to Flask for browser display - optimized for speed."""
+    """Offer frame for browser display; the sender encodes it only if it is still newest."""
+    sender.frame(frame, capture_time)
+
+def encode_frame(frame):
+    """Preview JPEG - optimized for speed (runs on the sender thread)."""
     try:
         # Smaller resize for faster transfer
         small = cv2.resize(frame, (400, 300))
         _, buffer = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 70])
-        b64 = base64.b64encode(buffer).decode('utf-8')
-        # Use a very short timeout to avoid blocking
-        requests.post(FRAME_URL, json={"frame": b64}, timeout=0.02)
+        # Raw JPEG bytes: the server stores and streams them as-is
+        jpeg = buffer.tobytes()
+        record('frame', jpeg)
+        return jpeg
     except:
-        pass  # Don't block on frame send failures
+        return None  # Don't block on frame send failures
+
+# ========== PIPELINE ==========
+# capture thread -> frames_in -> inference (main thread) -> sender thread
+# frames_in is latest-wins, so inference always starts from the newest
+# frame. The sender (controller_sender.py) keeps one keep-alive connection
+# and sends gestures ahead of positions and positions ahead of the preview.
+frames_in = LatestSlot()
+sender = ControllerSender(UPDATE_URL, HEADERS, encode_frame=encode_frame,
+                          on_reply=server_state.apply_reply, frame_url=VIDEO_FRAME_URL)
+watchers = [StateWatcher(GAME_URL, 'active_game', server_state, HEADERS, parse=lambda b: b.get('game')),
+            StateWatcher(GAME_STATE_URL, 'game_state', server_state, HEADERS)]
 
 # ========== MAIN LOOP ==========
 print("🎮 Hand Gesture Controller (Two-Hand Mode)")
@@ -282,264 +257,295 @@ if not cap.isOpened():
     exit(1)
 
 frame_count = 0
-
-with mp_hands.Hands(
-    max_num_hands=2,  # Track BOTH hands
-    min_detection_confidence=0.6,
-    min_tracking_confidence=0.6
-) as hands:
-
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            continue
-
-        frame = cv2.flip(frame, 1)
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
-        results = hands.process(image)
-        image.flags.writeable = True
-
-        curr_t = time.time()
+hand_frame = HandFrame(max_hands=2)
+capture_time = 0.0  # Wall clock of the frame being processed, sent as t_capture
+
+capture = CaptureThread(cap, frames_in)
+capture.start()
+sender.start()
+for watcher in watchers:
+    watcher.start()
+
+try:
+    with mp_hands.Hands(
+        max_num_hands=2,  # Track BOTH hands
+        min_detection_confidence=0.6,
+        min_tracking_confidence=0.6
+    ) as hands:
+
+        while True:
+            item = frames_in.get(timeout=1.0)
+            if item is None:
+                if frames_in.closed:
+                    break
+                continue
+            frame, capture_time = item
+
+            frame = cv2.flip(frame, 1)
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            results = hands.process(image)
+            image.flags.writeable = True
+
+            # Landmarks copied into arrays once; the gesture checks cover all hands at once
+            pose = hand_frame.fill(results.multi_hand_landmarks, results.multi_handedness)
+            open_palm, fist, tips = pose.gestures()
+
+            curr_t = time.time()
         
-        # ========== STATE MACHINE ==========
-        if game_state == GameState.WAITING_FOR_HIGHFIVE:
-            # Display "Show high-five to start"
-            cv2.putText(frame, "Show HIGH-FIVE to start!", (50, 80), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
-            cv2.putText(frame, "(Open palm)", (120, 120), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
+            # ========== STATE MACHINE ==========
+            if game_state == GameState.WAITING_FOR_HIGHFIVE:
+                # Display "Show high-five to start"
+                cv2.putText(frame, "Show HIGH-FIVE to start!", (50, 80), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
+                cv2.putText(frame, "(Open palm)", (120, 120), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
             
-            # Check for high-five gesture
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                # Check for high-five gesture
+                if results.multi_hand_landmarks:
+                    for i, hand_landmarks in enumerate(results.multi_hand_landmarks):
+                        mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
                     
-                    if is_high_five(hand_landmarks):
-                        print("✋ High-five detected! Starting countdown...")
-                        game_state = GameState.COUNTDOWN
-                        countdown_start = curr_t
-                        break
+                        if i < pose.count and open_palm[i]:
+                            print("✋ High-five detected! Starting countdown...")
+                            game_state = GameState.COUNTDOWN
+                            countdown_start = curr_t
+                            break
         
-        elif game_state == GameState.COUNTDOWN:
-            # Countdown requires hands to be visible continuously
-            if results.multi_hand_landmarks:
-                elapsed = curr_t - countdown_start
-                remaining = COUNTDOWN_DURATION - elapsed
+            elif game_state == GameState.COUNTDOWN:
+                # Countdown requires hands to be visible continuously
+                if results.multi_hand_landmarks:
+                    elapsed = curr_t - countdown_start
+                    remaining = COUNTDOWN_DURATION - elapsed
                 
-                if remaining <= 0:
-                    print("🎮 GO! Start flicking!")
-                    game_state = GameState.PLAYING
-                    hands_visible = True  # Start with hands visible
-                    hands_gone_time = 0
-                    send_game_state("playing", "Game started - flick away!")
-                else:
-                    # Display countdown
-                    cv2.putText(frame, f"Keep hands visible!", (80, 80), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 3)
-                    cv2.putText(frame, f"{int(remaining) + 1}", (280, 200), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 255, 0), 8)
+                    if remaining <= 0:
+                        print("🎮 GO! Start flicking!")
+                        game_state = GameState.PLAYING
+                        hands_visible = True  # Start with hands visible
+                        hands_gone_time = 0
+                        send_game_state("playing", "Game started - flick away!")
+                    else:
+                        # Display countdown
+                        cv2.putText(frame, f"Keep hands visible!", (80, 80), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 3)
+                        cv2.putText(frame, f"{int(remaining) + 1}", (280, 200), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 255, 0), 8)
                     
-                    # Draw hands during countdown
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            else:
-                # Hands not visible - reset countdown
-                countdown_start = curr_t  # Reset the countdown
-                cv2.putText(frame, "Show hands to continue!", (60, 80), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 165, 255), 3)
-                cv2.putText(frame, "5", (280, 200), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 165, 255), 8)
+                        # Draw hands during countdown
+                        for hand_landmarks in results.multi_hand_landmarks:
+                            mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                else:
+                    # Hands not visible - reset countdown
+                    countdown_start = curr_t  # Reset the countdown
+                    cv2.putText(frame, "Show hands to continue!", (60, 80), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 165, 255), 3)
+                    cv2.putText(frame, "5", (280, 200), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 165, 255), 8)
         
-        elif game_state == GameState.PLAYING:
-            # Normal gameplay - track both hands
-            if results.multi_hand_landmarks and results.multi_handedness:
-                # Hands are visible - reset the gone timer
-                if not hands_visible:
-                    hands_visible = True
-                    hands_gone_time = 0  # Reset timeout
-                    print("✋ Hands back!")
-                for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                    # Get hand label (Left or Right)
-                    hand_label = handedness.classification[0].label
+            elif game_state == GameState.PLAYING:
+                # Normal gameplay - track both hands
+                if results.multi_hand_landmarks and results.multi_handedness:
+                    # Hands are visible - reset the gone timer
+                    if not hands_visible:
+                        hands_visible = True
+                        hands_gone_time = 0  # Reset timeout
+                        print("✋ Hands back!")
+                    labels = pose.labels
+                    for i, hand_landmarks in enumerate(results.multi_hand_landmarks[:pose.count]):
+                        # Get hand label (Left or Right)
+                        hand_label = labels[i]
                     
-                    # Draw hand landmarks
-                    color = (0, 255, 0) if hand_label == "Right" else (255, 100, 100)
-                    mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS,
-                                          mp_draw.DrawingSpec(color=color, thickness=2, circle_radius=2),
-                                          mp_draw.DrawingSpec(color=color, thickness=2))
+                        # Draw hand landmarks
+                        color = (0, 255, 0) if hand_label == "Right" else (255, 100, 100)
+                        mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS,
+                                              mp_draw.DrawingSpec(color=color, thickness=2, circle_radius=2),
+                                              mp_draw.DrawingSpec(color=color, thickness=2))
                     
-                    # Get index finger tip
-                    tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                    curr_pos = np.array([tip.x, tip.y, tip.z])
+                        # Get index finger tip
+                        curr_pos = tips[i]
+                        tip_x, tip_y, _ = curr_pos
                     
-                    # LEFT HAND: Only used for boxing cursors, not aiming in flick games
-                    # (Right hand handles both aim + shoot in flick games)
+                        # LEFT HAND: Only used for boxing cursors, not aiming in flick games
+                        # (Right hand handles both aim + shoot in flick games)
                     
-                    # Update history for this hand
-                    data = hand_data[hand_label]
-                    data['position_history'].append(curr_pos)
-                    data['time_history'].append(curr_t)
+                        # Update history for this hand
+                        # (stamped with the capture time, so inference jitter doesn't skew the velocity)
+                        data = hand_data[hand_label]
+                        motion = data['motion']
+                        motion.push(capture_time, curr_pos)
                     
-                    # Store hand position for boxing cursors
-                    if hand_label == 'Left':
-                        hand_data['Left']['current_pos'] = (tip.x, tip.y)
-                    else:
-                        hand_data['Right']['current_pos'] = (tip.x, tip.y)
+                        # Store hand position for boxing cursors
+                        if hand_label == 'Left':
+                            hand_data['Left']['current_pos'] = (tip_x, tip_y)
+                        else:
+                            hand_data['Right']['current_pos'] = (tip_x, tip_y)
                     
-                    # Compute velocity
-                    velocity = compute_velocity(data['position_history'], data['time_history'])
+                        # Velocity estimate, refreshed by the push above
+                        velocity = motion.velocity
                     
-                    # Check active game to filter gestures
-                    active_game = get_active_game()
-                    allowed_gestures = GAME_GESTURES.get(active_game, [])
+                        # Check active game to filter gestures
+                        active_game = get_active_game()
+                        allowed_gestures = GAME_GESTURES.get(active_game, [])
                     
-                    # === CONTROL LOGIC BASED ON GAME ===
+                        # === CONTROL LOGIC BASED ON GAME ===
                     
-                    if active_game == 'minigolf':
-                        # MINIGOLF: Single-Hand Two-Phase Control (Right Hand)
-                        if hand_label == 'Right' and 'flick' in allowed_gestures:
-                            right_hand_fist = is_fist(hand_landmarks)
-                            right_hand_open = is_high_five(hand_landmarks)
+                        if active_game == 'minigolf':
+                            # MINIGOLF: Single-Hand Two-Phase Control (Right Hand)
+                            if hand_label == 'Right' and 'flick' in allowed_gestures:
+                                right_hand_fist = fist[i]
+                                right_hand_open = open_palm[i]
                             
-                            # Update shoot mode based on hand gesture
-                            if right_hand_fist and not shoot_mode:
-                                shoot_mode = True
-                                # LOCK IN AIM: Store current aim position when entering shoot mode
-                                stored_aim["x"] = tip.x
-                                stored_aim["y"] = tip.y
-                                print(f"✊ SHOOT MODE - Aim locked at ({tip.x:.2f}, {tip.y:.2f})")
-                            elif right_hand_open and shoot_mode:
-                                shoot_mode = False
-                                print("✋ AIM MODE - Move to aim")
+                                # Update shoot mode based on hand gesture
+                                if right_hand_fist and not shoot_mode:
+                                    shoot_mode = True
+                                    # LOCK IN AIM: Store current aim position when entering shoot mode
+                                    stored_aim["x"] = tip_x
+                                    stored_aim["y"] = tip_y
+                                    print(f"✊ SHOOT MODE - Aim locked at ({tip_x:.2f}, {tip_y:.2f})")
+                                elif right_hand_open and shoot_mode:
+                                    shoot_mode = False
+                                    print("✋ AIM MODE - Move to aim")
                             
-                            # Show mode indicator
-                            cx = int(tip.x * frame.shape[1])
-                            cy = int(tip.y * frame.shape[0])
-                            if shoot_mode:
-                                # SHOOT MODE: Red indicator, waiting for flick
-                                cv2.circle(frame, (cx, cy), 35, (0, 0, 255), -1)
-                                cv2.putText(frame, "SHOOT", (cx - 35, cy - 45), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                                # Show mode indicator
+                                cx = int(tip_x * frame.shape[1])
+                                cy = int(tip_y * frame.shape[0])
+                                if shoot_mode:
+                                    # SHOOT MODE: Red indicator, waiting for flick
+                                    cv2.circle(frame, (cx, cy), 35, (0, 0, 255), -1)
+                                    cv2.putText(frame, "SHOOT", (cx - 35, cy - 45), 
+                                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
                                 
-                                # Only detect flick in shoot mode
-                                flick = detect_flick(velocity, hand_label)
-                                if flick:
-                                    # USE STORED AIM for direction instead of raw velocity
-                                    # Convert aim position (0-1) to direction (-1 to 1)
-                                    aim_vx = (0.5 - stored_aim["x"]) * 2
+                                    # Only detect flick in shoot mode
+                                    flick = detect_flick(motion, hand_label)
+                                    if flick:
+                                        # USE STORED AIM for direction instead of raw velocity
+                                        # Convert aim position (0-1) to direction (-1 to 1)
+                                        aim_vx = (0.5 - stored_aim["x"]) * 2
                                     
-                                    directional_flick = {
-                                        "vx": aim_vx, 
-                                        "vy": flick["vy"], 
-                                        "magnitude": flick["magnitude"]
-                                    }
-                                    send_flick(directional_flick)
+                                        directional_flick = {
+                                            "vx": aim_vx, 
+                                            "vy": flick["vy"], 
+                                            "magnitude": flick["magnitude"],
+                                            "hand": flick["hand"],
+                                            "timestamp": flick["timestamp"]
+                                        }
+                                        send_flick(directional_flick)
                                     
-                                    cv2.circle(frame, (cx, cy), 50, (0, 255, 0), 5)
-                                    cv2.putText(frame, "FLICK!", (cx - 40, cy - 60), 
-                                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-                                    # Reset to aim mode after flick
-                                    shoot_mode = False
-                            else:
-                                # AIM MODE: Yellow indicator, send position for aiming
-                                send_aim(tip.x, tip.y)
-                                cv2.circle(frame, (cx, cy), 25, (0, 255, 255), 3)
-                                cv2.putText(frame, "AIM", (cx - 20, cy - 30), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+                                        cv2.circle(frame, (cx, cy), 50, (0, 255, 0), 5)
+                                        cv2.putText(frame, "FLICK!", (cx - 40, cy - 60), 
+                                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+                                        # Reset to aim mode after flick
+                                        shoot_mode = False
+                                else:
+                                    # AIM MODE: Yellow indicator, send position for aiming
+                                    send_aim(tip_x, tip_y)
+                                    cv2.circle(frame, (cx, cy), 25, (0, 255, 255), 3)
+                                    cv2.putText(frame, "AIM", (cx - 20, cy - 30), 
+                                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
                                            
-                    elif active_game == 'basketball':
-                        # BASKETBALL: Two-Hand Control (Left=Aim, Right=Flick)
-                        if hand_label == 'Left':
-                             send_aim(tip.x, tip.y)
-                             cx = int(tip.x * frame.shape[1])
-                             cy = int(tip.y * frame.shape[0])
-                             cv2.circle(frame, (cx, cy), 25, (255, 255, 0), 3) # Cyan for Aim
-                             cv2.putText(frame, "AIM", (cx - 20, cy - 30), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                        elif active_game == 'basketball':
+                            # BASKETBALL: Two-Hand Control (Left=Aim, Right=Flick)
+                            if hand_label == 'Left':
+                                 send_aim(tip_x, tip_y)
+                                 cx = int(tip_x * frame.shape[1])
+                                 cy = int(tip_y * frame.shape[0])
+                                 cv2.circle(frame, (cx, cy), 25, (255, 255, 0), 3) # Cyan for Aim
+                                 cv2.putText(frame, "AIM", (cx - 20, cy - 30), 
+                                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
                         
-                        elif hand_label == 'Right':
-                             # Standard flick detection (always active, no mode switching)
-                             flick = detect_flick(velocity, hand_label)
-                             if flick:
-                                 send_flick(flick)
-                                 cx = int(tip.x * frame.shape[1])
-                                 cy = int(tip.y * frame.shape[0])
-                                 cv2.circle(frame, (cx, cy), 50, (0, 255, 0), 5)
-                                 cv2.putText(frame, "FLICK!", (cx - 40, cy - 60), 
-                                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
+                            elif hand_label == 'Right':
+                                 # Standard flick detection (always active, no mode switching)
+                                 flick = detect_flick(motion, hand_label)
+                                 if flick:
+                                     send_flick(flick)
+                                     cx = int(tip_x * frame.shape[1])
+                                     cy = int(tip_y * frame.shape[0])
+                                     cv2.circle(frame, (cx, cy), 50, (0, 255, 0), 5)
+                                     cv2.putText(frame, "FLICK!", (cx - 40, cy - 60), 
+                                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
                     
-                    elif active_game == 'boxing':
-                        # BOXING: Both hands for cursor tracking + punch detection
-                        cx = int(tip.x * frame.shape[1])
-                        cy = int(tip.y * frame.shape[0])
-                        cursor_color = (255, 100, 100) if hand_label == 'Left' else (100, 100, 255)
-                        cv2.circle(frame, (cx, cy), 30, cursor_color, 3)
-                        cv2.putText(frame, hand_label[0], (cx - 10, cy - 35), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, cursor_color, 2)
+                        elif active_game == 'boxing':
+                            # BOXING: Both hands for cursor tracking + punch detection
+                            cx = int(tip_x * frame.shape[1])
+                            cy = int(tip_y * frame.shape[0])
+                            cursor_color = (255, 100, 100) if hand_label == 'Left' else (100, 100, 255)
+                            cv2.circle(frame, (cx, cy), 30, cursor_color, 3)
+                            cv2.putText(frame, hand_label[0], (cx - 10, cy - 35), 
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, cursor_color, 2)
                     
-                    # Detect punch (boxing only)
-                    if 'punch' in allowed_gestures:
-                        punch = detect_punch(velocity, hand_label)
-                        if punch:
-                            send_punch(punch)
-                            cx = int(tip.x * frame.shape[1])
-                            cy = int(tip.y * frame.shape[0])
-                            punch_color = (255, 100, 100) if hand_label == 'Left' else (100, 100, 255)
-                            cv2.circle(frame, (cx, cy), 60, punch_color, -1)
-                            cv2.putText(frame, "PUNCH!", (cx - 50, cy - 70), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 1, punch_color, 3)
+                        # Detect punch (boxing only)
+                        if 'punch' in allowed_gestures:
+                            punch = detect_punch(motion, hand_label)
+                            if punch:
+                                send_punch(punch)
+                                cx = int(tip_x * frame.shape[1])
+                                cy = int(tip_y * frame.shape[0])
+                                punch_color = (255, 100, 100) if hand_label == 'Left' else (100, 100, 255)
+                                cv2.circle(frame, (cx, cy), 60, punch_color, -1)
+                                cv2.putText(frame, "PUNCH!", (cx - 50, cy - 70), 
+                                           cv2.FONT_HERSHEY_SIMPLEX, 1, punch_color, 3)
                     
-                    data['prev_velocity'] = velocity
+                        data['prev_velocity'] = velocity
                 
-                # Send both hand positions (always useful for debugging)
-                left_pos = hand_data['Left'].get('current_pos', (0.3, 0.5))
-                right_pos = hand_data['Right'].get('current_pos', (0.7, 0.5))
-                send_hands(left_pos[0], left_pos[1], right_pos[0], right_pos[1])
+                    # Send both hand positions (always useful for debugging)
+                    left_pos = hand_data['Left'].get('current_pos', (0.3, 0.5))
+                    right_pos = hand_data['Right'].get('current_pos', (0.7, 0.5))
+                    send_hands(left_pos[0], left_pos[1], right_pos[0], right_pos[1])
                 
-                # Show velocity bars
-                for i, (label, data) in enumerate(hand_data.items()):
-                    if len(data['position_history']) > 0:
-                        vel = compute_velocity(data['position_history'], data['time_history'])
-                        vy_display = min(-vel[1] * 2, 1.0)
-                        bar_width = int(max(0, vy_display) * 100)
-                        y_pos = 30 + i * 40
-                        color = (0, 255, 0) if -vel[1] > VELOCITY_THRESHOLD else (100, 100, 100)
-                        cv2.rectangle(frame, (10, y_pos), (10 + bar_width, y_pos + 25), color, -1)
-                        cv2.rectangle(frame, (10, y_pos), (110, y_pos + 25), (255, 255, 255), 2)
-                        cv2.putText(frame, f"{label[0]}", (115, y_pos + 20), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            else:
-                # No hands detected - start or continue timeout
-                if hands_visible:
-                    # Hands just disappeared - start timer
-                    hands_visible = False
-                    hands_gone_time = curr_t
-                    print("👋 Hands gone - 10s timeout started...")
+                    # Show velocity bars
+                    for i, (label, data) in enumerate(hand_data.items()):
+                        if len(data['motion']) > 0:
+                            vel = data['motion'].velocity
+                            vy_display = min(-vel[1] * 2, 1.0)
+                            bar_width = int(max(0, vy_display) * 100)
+                            y_pos = 30 + i * 40
+                            color = (0, 255, 0) if -vel[1] > VELOCITY_THRESHOLD else (100, 100, 100)
+                            cv2.rectangle(frame, (10, y_pos), (10 + bar_width, y_pos + 25), color, -1)
+                            cv2.rectangle(frame, (10, y_pos), (110, y_pos + 25), (255, 255, 255), 2)
+                            cv2.putText(frame, f"{label[0]}", (115, y_pos + 20), 
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                else:
+                    # No hands detected - start or continue timeout
+                    if hands_visible:
+                        # Hands just disappeared - start timer
+                        hands_visible = False
+                        hands_gone_time = curr_t
+                        print("👋 Hands gone - 10s timeout started...")
                 
-                if hands_gone_time > 0:
-                    time_gone = curr_t - hands_gone_time
-                    if time_gone > HANDS_TIMEOUT:
-                        print("⚠️ 10s timeout - forcing 5 second countdown...")
-                        game_state = GameState.COUNTDOWN
-                        countdown_start = curr_t
-                        hands_gone_time = 0
-                        send_game_state("paused", "Hands lost - show hands to resume")
-                        # Clear hand histories
-                        for label in hand_data:
-                            hand_data[label]['position_history'].clear()
-                            hand_data[label]['time_history'].clear()
-                    else:
-                        timeout_remaining = HANDS_TIMEOUT - time_gone
-                        cv2.putText(frame, f"Show hands! ({int(timeout_remaining)+1}s)", (10, 40), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
-
-        # Send EVERY frame to browser for smooth preview
-        send_frame(frame)
-
-        cv2.imshow("Flick Hoops - Two Hands", frame)
-        if cv2.waitKey(1) & 0xFF == 27:
-            break
-
+                    if hands_gone_time > 0:
+                        time_gone = curr_t - hands_gone_time
+                        if time_gone > HANDS_TIMEOUT:
+                            print("⚠️ 10s timeout - forcing 5 second countdown...")
+                            game_state = GameState.COUNTDOWN
+                            countdown_start = curr_t
+                            hands_gone_time = 0
+                            send_game_state("paused", "Hands lost - show hands to resume")
+                            # Clear hand histories
+                            for label in hand_data:
+                                hand_data[label]['motion'].clear()
+                        else:
+                            timeout_remaining = HANDS_TIMEOUT - time_gone
+                            cv2.putText(frame, f"Show hands! ({int(timeout_remaining)+1}s)", (10, 40), 
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+
+            # Offer EVERY frame to the browser preview
+            send_frame(frame)
+
+            # The preview window stays on the main thread (GUI toolkits require it)
+            cv2.imshow("Flick Hoops - Two Hands", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+finally:
+    # Stop the sender before closing the recorder: it records the frames it encodes
+    capture.stop()
+    capture.join(timeout=1.0)
+    sender.stop()
+    for watcher in watchers:
+        watcher.stop()
+    if RECORDER:
+        RECORDER.close()
+
+print(f"📊 {capture.frames} frames captured, {frames_in.dropped} skipped by inference")
+print("📊 sender: " + ", ".join(f"{k}={v}" for k, v in sender.stats().items() if v))
 cap.release()
 cv2.destroyAllWindows()
@@ -0,0 +1,58 @@
+"""
+Hand-pose predicates for the camera controller.
+
+MediaPipe hands back one protobuf message per landmark. The per-frame
+checks (open palm, fist, where the index tip is) only need 11 of a
+hand's 21 landmarks, so HandFrame.gestures() reads exactly those, once
+each, and compares plain floats. That beats the old attribute walk
+(HandLandmark enum lookups, twice per finger), and also a NumPy copy of
+the landmarks: filling the array from the protobufs costs more than the
+whole check on two hands (see benchmarks/bench_gestures.py).
+"""
+# MediaPipe hand landmark indices
+INDEX_TIP = 8
+# (pip, tip) pairs for thumb, index, middle, ring, pinky; the thumb has
+# no PIP, its IP joint stands in
+_PIP_TIP = (3, 4, 6, 8, 10, 12, 14, 16, 18, 20)
+
+OPEN_PALM_MIN_EXTENDED = 4  # of 5 fingers, allows some tolerance
+FIST_MIN_CURLED = 3         # of the 4 fingers, thumb excluded
+
+
+class HandFrame:
+    """One frame's hands, reused from frame to frame."""
+    __slots__ = ('max_hands', '_landmarks', 'labels', 'count')
+
+    def __init__(self, max_hands=2):
+        self.max_hands = max_hands
+        self._landmarks = []
+        self.labels = []
+        self.count = 0
+
+    def fill(self, multi_hand_landmarks, multi_handedness=None):
+        """Take MediaPipe results; hands beyond max_hands are ignored. Nothing is copied."""
+        landmarks = multi_hand_landmarks or ()
+        handedness = multi_handedness or ()
+        n = min(len(landmarks), self.max_hands)
+        self._landmarks = [hand.landmark for hand in landmarks[:n]]
+        self.labels = ['Right' if i < len(handedness) and handedness[i].classification[0].label == 'Right'
+                       else 'Left' for i in range(n)]
+        self.count = n
+        return self
+
+    def gestures(self):
+        """
+        (open palm, fist, index tips) per hand: two lists of bools and a
+        list of (x, y, z) tuples. A finger is extended when its tip is
+        above its PIP joint (image y grows down) and curled when below.
+        """
+        open_palm, fist, tips = [], [], []
+        for hand in self._landmarks:
+            y = [hand[i].y for i in _PIP_TIP]
+            curled = (y[3] > y[2]) + (y[5] > y[4]) + (y[7] > y[6]) + (y[9] > y[8])
+            extended = (y[1] < y[0]) + (y[3] < y[2]) + (y[5] < y[4]) + (y[7] < y[6]) + (y[9] < y[8])
+            open_palm.append(extended >= OPEN_PALM_MIN_EXTENDED)
+            fist.append(curled >= FIST_MIN_CURLED)
+            tip = hand[INDEX_TIP]
+            tips.append((tip.x, tip.y, tip.z))
+        return open_palm, fist, tips
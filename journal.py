@@ -0,0 +1,206 @@
+"""
+Structured event journal that never blocks a request handler.
+
+Handlers call journal.event('flick', vx=..., vy=...). The call checks
+the level and the per-type sample rate, then drops the record on a
+bounded in-memory buffer; a background writer thread formats it and
+writes it to a rotating JSON-lines file (and, optionally, a short human
+line to the console). When the buffer is full the event is counted as
+dropped instead of waiting.
+
+Under eventlet or gevent, threading, time and the stdlib queue are
+monkey-patched, so an ordinary thread would be a green thread and its
+blocking file and console writes would stall the hub and every socket
+with it. The writer is therefore started with the unpatched
+_thread.start_new_thread, as a real OS thread. The green side only appends to a deque, which
+needs no lock, and the writer polls it with the unpatched sleep.
+"""
+import collections
+import importlib
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+# How long the writer sleeps when it finds nothing to write
+WRITER_POLL_INTERVAL = 0.05
+
+
+def _original(module, name):
+    """
+    module.name as the stdlib defines it, even after monkey-patching.
+
+    Only a backend that is already imported can have patched anything,
+    so neither is imported here.
+    """
+    eventlet = sys.modules.get('eventlet.patcher')
+    if eventlet is not None and eventlet.is_monkey_patched({'_thread': 'thread'}.get(module, module)):
+        return getattr(eventlet.original(module), name)
+    gevent = sys.modules.get('gevent.monkey')
+    if gevent is not None and gevent.is_module_patched(module):
+        return gevent.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event and the event's fields."""
+
+    def format(self, record):
+        line = {'ts': round(record.created, 3), 'level': record.levelname,
+                'event': getattr(record, 'event', record.getMessage())}
+        line.update(getattr(record, 'fields', {}))
+        return json.dumps(line, separators=(',', ':'), default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Short line for the terminal: time, event and key=value fields."""
+
+    def format(self, record):
+        fields = ' '.join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                          for k, v in getattr(record, 'fields', {}).items())
+        stamp = time.strftime('%H:%M:%S', time.localtime(record.created))
+        return f"{stamp} {getattr(record, 'event', record.getMessage())} {fields}".rstrip()
+
+
+class RecordBuffer:
+    """
+    Bounded FIFO of log records shared by green and native threads.
+
+    deque.append and popleft are atomic in CPython, so neither side takes
+    a lock that a patched or an unpatched thread could block on.
+    """
+
+    def __init__(self, maxsize):
+        self._records = collections.deque()
+        self.maxsize = maxsize
+
+    def __len__(self):
+        return len(self._records)
+
+    def put_nowait(self, record):
+        if len(self._records) >= self.maxsize:
+            raise queue.Full
+        self._records.append(record)
+
+    def get_nowait(self):
+        try:
+            return self._records.popleft()
+        except IndexError:
+            raise queue.Empty from None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that counts and discards records when the queue is full."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record  # formatting happens on the listener thread
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Journal:
+    """Sampled, levelled event log written off the request path."""
+
+    def __init__(self, path, level='INFO', max_bytes=5 * 1024 * 1024, backups=3,
+                 queue_size=10000, console=True, sample=None):
+        self.logger = logging.getLogger('flick.journal')
+        self.logger.setLevel(level)
+        self.logger.propagate = False
+        self.sample = dict(sample or {})
+        self._seen = {}  # {event type: count}, for every-Nth sampling
+        self._lock = threading.Lock()
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(ConsoleFormatter())
+            handlers.append(console_handler)
+
+        # Only the writer thread uses these handlers; give them native locks
+        native_rlock = _original('_thread', 'RLock')
+        for handler in handlers:
+            handler.lock = native_rlock()
+        self._writers = handlers
+
+        self._handler = DroppingQueueHandler(RecordBuffer(queue_size))
+        self.logger.handlers = [self._handler]
+        self._running = None  # native lock held by the writer thread while it runs
+        self._stopping = False
+
+    @property
+    def dropped(self):
+        return self._handler.dropped
+
+    def start(self):
+        """Start the writer on a real OS thread, whatever the async backend."""
+        if self._running is None:
+            self._stopping = False
+            self._running = _original('_thread', 'allocate_lock')()
+            self._running.acquire()
+            _original('_thread', 'start_new_thread')(self._run, (self._running,))
+        return self
+
+    def stop(self):
+        """Flush what is queued and stop the writer thread (safe to call twice)."""
+        if self._running is not None:
+            self._stopping = True
+            self._running.acquire()  # released when the writer loop exits
+            self._running = None
+        self._drain()
+        for handler in self._writers:
+            handler.flush()
+
+    def _drain(self):
+        """Write every buffered record; returns how many there were."""
+        records = self._handler.queue
+        count = 0
+        while True:
+            try:
+                record = records.get_nowait()
+            except queue.Empty:
+                return count
+            for handler in self._writers:
+                handler.handle(record)
+            count += 1
+
+    def _run(self, running):
+        sleep = _original('time', 'sleep')
+        try:
+            while not self._stopping:
+                if not self._drain():
+                    sleep(WRITER_POLL_INTERVAL)
+        finally:
+            running.release()
+
+    def _sampled(self, event):
+        rate = self.sample.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        # Deterministic every-Nth: keeps the rate exact without a RNG call
+        every = round(1.0 / rate)
+        with self._lock:
+            n = self._seen.get(event, 0)
+            self._seen[event] = n + 1
+        return n % every == 0
+
+    def event(self, event, level=logging.INFO, **fields):
+        """Record one event; cheap enough to call from any handler."""
+        if not self.logger.isEnabledFor(level) or not self._sampled(event):
+            return
+        self.logger.log(level, event, extra={'event': event, 'fields': fields})
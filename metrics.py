@@ -0,0 +1,168 @@
+"""
+In-process metrics: latency histograms, request counters and gauges.
+
+Rendered as Prometheus text at /metrics and as a JSON summary at
+/metrics.json. Everything is kept in fixed-size structures so recording
+a sample is a lock and a few additions.
+"""
+import bisect
+import threading
+import time
+
+# Latency bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500, 1000, 2500)
+RATE_WINDOW = 60  # seconds covered by the recent request rate
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS_MS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if value < 0:
+            return  # clock skew between machines; not a real sample
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within the matching bucket)."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank, seen, lower = q * total, 0, 0.0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = self.buckets[i] if i < len(self.buckets) else lower
+        return lower
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        running = 0
+        for bound, n in zip(self.buckets + ('+Inf',), self.counts):
+            running += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {running}')
+        lines.append(f"{self.name}_sum {self.sum:.3f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+    def summary(self):
+        out = {'count': self.count, 'mean': round(self.sum / self.count, 3) if self.count else None}
+        for label, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            value = self.quantile(q)
+            out[label] = round(value, 3) if value is not None else None
+        return out
+
+
+class RequestCounter:
+    """Per-endpoint request totals plus a sliding one-minute rate."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.totals = {}   # {(endpoint, method): count}
+        self._slots = {}   # {(endpoint, method): [count per second, RATE_WINDOW long]}
+        self._stamps = {}  # {(endpoint, method): [second each slot belongs to]}
+        self._lock = threading.Lock()
+
+    def inc(self, endpoint, method):
+        key = (endpoint, method)
+        now = int(time.monotonic())
+        i = now % RATE_WINDOW
+        with self._lock:
+            self.totals[key] = self.totals.get(key, 0) + 1
+            slots = self._slots.get(key)
+            if slots is None:
+                slots = self._slots[key] = [0] * RATE_WINDOW
+                self._stamps[key] = [0] * RATE_WINDOW
+            stamps = self._stamps[key]
+            if stamps[i] != now:
+                stamps[i], slots[i] = now, 0
+            slots[i] += 1
+
+    def rate(self, key):
+        now = int(time.monotonic())
+        with self._lock:
+            slots, stamps = self._slots[key], self._stamps[key]
+            recent = sum(n for n, t in zip(slots, stamps) if now - t < RATE_WINDOW)
+        return recent / RATE_WINDOW
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            totals = sorted(self.totals.items())
+        for (endpoint, method), n in totals:
+            lines.append(f'{self.name}{{endpoint="{endpoint}",method="{method}"}} {n}')
+        return lines
+
+    def summary(self):
+        with self._lock:
+            keys = sorted(self.totals)
+        return {f"{method} {endpoint}": {'total': self.totals[(endpoint, method)],
+                                         'per_sec_1m': round(self.rate((endpoint, method)), 3)}
+                for endpoint, method in keys}
+
+
+class Metrics:
+    """All of the server's metrics, keyed by name."""
+
+    def __init__(self, prefix='flick'):
+        self.prefix = prefix
+        self.histograms = {}
+        self.gauges = {}  # {name: (help, callable, label, type)}
+        self.requests = RequestCounter(f'{prefix}_http_requests_total', 'HTTP requests by endpoint')
+        self.started = time.time()
+
+    def histogram(self, name, help_text):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram(f'{self.prefix}_{name}', help_text)
+        return hist
+
+    def observe_ms(self, name, seconds):
+        """Record a latency given in seconds into a registered histogram."""
+        self.histograms[name].observe(seconds * 1000.0)
+
+    def gauge(self, name, help_text, func, label=None, kind='gauge'):
+        """
+        Register a value read at scrape time; with a label, func returns
+        {label value: number}. kind='counter' for totals kept elsewhere.
+        """
+        self.gauges[name] = (help_text, func, label, kind)
+
+    def render_prometheus(self):
+        lines = []
+        for hist in self.histograms.values():
+            lines += hist.render()
+        lines += self.requests.render()
+        for name, (help_text, func, label, kind) in self.gauges.items():
+            lines += [f"# HELP {self.prefix}_{name} {help_text}",
+                      f"# TYPE {self.prefix}_{name} {kind}"]
+            if label is None:
+                lines.append(f"{self.prefix}_{name} {func()}")
+            else:
+                lines += [f'{self.prefix}_{name}{{{label}="{key}"}} {value}'
+                          for key, value in func().items()]
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'latency_ms': {name: hist.summary() for name, hist in self.histograms.items()},
+            'requests': self.requests.summary(),
+            'gauges': {name: entry[1]() for name, entry in self.gauges.items()},
+        }
@@ -0,0 +1,152 @@
+"""
+Per-hand motion history and velocity/acceleration estimates.
+
+Each hand keeps a fixed-size NumPy ring buffer of (t, x, y, z) samples,
+stored twice over so the newest samples are always one contiguous
+slice. Estimates are least-squares fits over the newest few samples:
+
+- velocity: a straight-line fit, refreshed on every push. It is the
+  measured speed that gestures report, as steady as the old endpoint
+  difference but using every sample in the window
+- lead velocity and acceleration: a quadratic fit centred on the newest
+  sample, whose slope is the velocity *now* (not half a window ago) and
+  whose curvature is the acceleration. Only early firing needs it, so it
+  is fitted on first use after a push and cached
+
+MotionHistory.crosses() decides whether a gesture fires. By default
+that is once the measured speed passes the threshold; with early=True
+it may also fire a frame ahead, on the rising edge, when the speed is
+still climbing hard and will pass the threshold within `lookahead`.
+Early firing trades false triggers on jittery landmarks for that frame,
+so callers opt in.
+"""
+import numpy as np
+
+DEFAULT_SIZE = 8
+VELOCITY_WINDOW = 4  # samples in the straight-line fit
+CURVE_WINDOW = 5     # samples in the quadratic fit
+# A frame at 30 fps: how far ahead the lead velocity is extrapolated
+DEFAULT_LOOKAHEAD = 1 / 30
+# Early firing needs the measured speed already at this share of the
+# threshold and a real push behind it: an acceleration of at least
+# MIN_ACCEL_RATIO thresholds per second. Below that, landmark jitter and
+# ordinary hand movement could extrapolate past the threshold. Raising
+# MIN_ACCEL_RATIO to 20 or more matches the plain threshold's false
+# triggers, but then hardly anything fires early (bench_motion.py).
+ARM_FRACTION = 0.5
+MIN_ACCEL_RATIO = 12.0
+
+
+def _slope_weights(times):
+    """Weights that turn samples at times into their least-squares slope, or None."""
+    mean = sum(times) / len(times)
+    centred = [t - mean for t in times]
+    spread = sum(c * c for c in centred)
+    return [c / spread for c in centred] if spread > 0 else None
+
+
+def _curve_weights(dt):
+    """
+    Weights that turn samples at dt (seconds relative to the newest) into
+    the slope and second derivative of their least-squares quadratic at
+    dt=0, or None if the times don't pin a quadratic down.
+    """
+    s0 = len(dt)
+    s1 = sum(dt)
+    s2 = sum(d * d for d in dt)
+    s3 = sum(d ** 3 for d in dt)
+    s4 = sum(d ** 4 for d in dt)
+    # Rows 1 and 2 of the inverse normal matrix [[s0 s1 s2] [s1 s2 s3] [s2 s3 s4]], by cofactors
+    c01, c11, c21 = s2 * s3 - s1 * s4, s0 * s4 - s2 * s2, s1 * s2 - s0 * s3
+    c02, c22 = s1 * s3 - s2 * s2, s0 * s2 - s1 * s1
+    det = s0 * (s2 * s4 - s3 * s3) + s1 * c01 + s2 * c02
+    if det <= 1e-9 * s0 * s2 * s4:
+        return None
+    slope = [(c01 + c11 * d + c21 * d * d) / det for d in dt]
+    curvature = [2 * (c02 + c21 * d + c22 * d * d) / det for d in dt]
+    return [slope, curvature]
+
+
+class MotionHistory:
+    """Ring buffer of (t, x, y, z) with cached velocity, lead velocity and acceleration."""
+    __slots__ = ('size', '_samples', '_next', 'count', 'velocity', '_lead_velocity', '_acceleration')
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = max(size, CURVE_WINDOW)
+        # Row i and row i + size hold the same sample
+        self._samples = np.zeros((2 * self.size, 4))
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+        self.velocity = np.zeros(3)
+        self._lead_velocity = self._acceleration = np.zeros(3)
+
+    def push(self, t, position):
+        """Add a sample and refresh the velocity."""
+        i = self._next
+        row = self._samples[i]
+        row[0] = t
+        row[1:] = position
+        self._samples[i + self.size] = row
+        self._next = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self._lead_velocity = None  # the quadratic fit is redone on demand
+        # The fit's weights only depend on the timestamps: work them out on
+        # plain floats, then it is a single product with the positions
+        window = self.recent(VELOCITY_WINDOW)
+        # (no time spread, e.g. repeated timestamps, means no velocity)
+        weights = _slope_weights(window[:, 0].tolist()) if len(window) > 1 else None
+        self.velocity = np.zeros(3) if weights is None else np.dot(weights, window[:, 1:])
+
+    def recent(self, n=None):
+        """The newest n samples (all by default), oldest first, as an (n, 4) view."""
+        n = self.count if n is None else min(n, self.count)
+        end = self._next + self.size
+        return self._samples[end - n:end]
+
+    def _fit_curve(self):
+        samples = self.recent(CURVE_WINDOW)
+        times = samples[:, 0].tolist()
+        weights = _curve_weights([t - times[-1] for t in times]) if len(times) >= 3 else None
+        if weights is None:
+            # too few samples or repeated timestamps: no curvature to speak of
+            self._lead_velocity, self._acceleration = self.velocity, np.zeros(3)
+        else:
+            self._lead_velocity, self._acceleration = np.dot(weights, samples[:, 1:])
+
+    @property
+    def lead_velocity(self):
+        """Velocity at the newest sample, from the quadratic fit."""
+        if self._lead_velocity is None:
+            self._fit_curve()
+        return self._lead_velocity
+
+    @property
+    def acceleration(self):
+        if self._lead_velocity is None:
+            self._fit_curve()
+        return self._acceleration
+
+    def crosses(self, axis, threshold, direction=1, early=False, lookahead=DEFAULT_LOOKAHEAD,
+                arm=ARM_FRACTION, min_accel_ratio=MIN_ACCEL_RATIO):
+        """
+        Whether a gesture along one axis (direction -1 for negative) fires now.
+
+        Fires once the measured speed passes the threshold. With early,
+        also when it is past `arm` of it, accelerating by at least
+        min_accel_ratio thresholds per second, and the lead speed
+        extrapolates past the threshold within lookahead.
+        """
+        speed = direction * self.velocity[axis]
+        if speed > threshold:
+            return True
+        if not early or speed <= threshold * arm:
+            return False
+        accel = direction * self.acceleration[axis]
+        return (accel > threshold * min_accel_ratio
+                and direction * self.lead_velocity[axis] + accel * lookahead > threshold)
@@ -0,0 +1,82 @@
+"""
+Latest-wins hand-off between the stages of the camera controller.
+
+gptScript1.py runs capture, inference and output on separate threads so
+a frame's latency is the slowest stage rather than the sum of all of
+them. Stages are linked by LatestSlot: a bounded buffer whose put never
+blocks. When it is full the oldest item is replaced (or merged into the
+new one, so events riding along with a stale frame are not lost), and a
+slow consumer simply picks up the newest item next.
+"""
+import threading
+import time
+
+
+class LatestSlot:
+    """Bounded, never-blocking buffer that keeps the newest items."""
+
+    def __init__(self, maxsize=1, merge=None):
+        self.maxsize = maxsize
+        self.merge = merge  # merge(older, newer) -> item, applied instead of dropping
+        self.dropped = 0
+        self.closed = False
+        self._items = []
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                older = self._items.pop(0)
+                self.dropped += 1
+                if self.merge is not None:
+                    item = self.merge(older, item)
+            self._items.append(item)
+            self._cond.notify()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def get(self, timeout=None):
+        """Oldest buffered item, waiting up to timeout; None on timeout or close."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            return self._items.pop(0) if self._items else None
+
+    def close(self):
+        """Wake every waiting consumer; later gets return what is left, then None."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads a cv2.VideoCapture as fast as the camera delivers.
+
+    Each frame goes into the output slot as (frame, capture wall clock),
+    so the inference stage always starts from the newest one instead of
+    working through the camera's internal buffer.
+    """
+
+    def __init__(self, cap, output):
+        super().__init__(name='capture', daemon=True)
+        self.cap = cap
+        self.output = output
+        self.frames = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set() and self.cap.isOpened():
+            success, frame = self.cap.read()
+            if not success:
+                time.sleep(0.005)
+                continue
+            self.frames += 1
+            self.output.put((frame, time.time()))
+        self.output.close()
+
+    def stop(self):
+        self._halt.set()
+
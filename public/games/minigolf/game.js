@@ -14,10 +14,14 @@ let gameState = {
 };
 
 // ========== HAND GESTURE CONFIGURATION ==========
+// Which camera controller drives this page (?controller=<id>)
+const CONTROLLER_ID = new URLSearchParams(window.location.search).get('controller') || 'default';
+const CONTROLLER_QUERY = '?controller=' + encodeURIComponent(CONTROLLER_ID);
 const GESTURE_CONFIG = {
-    flickEndpoint: 'http://localhost:5001/flick',
-    handsEndpoint: 'http://localhost:5001/hands',
-    gameEndpoint: 'http://localhost:5001/game',
+    serverUrl: 'http://localhost:5001',
+    flickEndpoint: 'http://localhost:5001/flick' + CONTROLLER_QUERY,
+    handsEndpoint: 'http://localhost:5001/hands' + CONTROLLER_QUERY,
+    gameEndpoint: 'http://localhost:5001/game' + CONTROLLER_QUERY,
     pollInterval: 50,
     enabled: true,
     powerMultiplier: 12,  // Convert flick velocity to putt power
@@ -282,6 +286,7 @@ function shootBall() {
     gameState.strokes[gameState.currentPlayer]++;
     gameState.hasSwitchedTurn = false; // Reset turn switch flag when shooting
     updateScoreDisplay();
+    broadcastShot();
 
     // Reset power indicator
     document.getElementById('power-bar').style.width = '0%';
@@ -295,21 +300,68 @@ function startGesturePolling() {
     gesturePollingActive = true;
     registerGame();  // Register minigolf as active
     console.log('⛳ Hand gesture control enabled for minigolf');
-    pollFlick();
+    subscribeFlicks();
     pollHands();
 }
 
+// Flicks are pushed over Socket.IO; poll only if it isn't available
+function subscribeFlicks() {
+    if (typeof io === 'undefined') {
+        pollFlick();
+        return;
+    }
+    let lastSeq = null;
+    // The controller in the connect query keeps us on its worker (cluster.py)
+    const gestureSocket = io(GESTURE_CONFIG.serverUrl, { query: { controller: CONTROLLER_ID, role: 'gestures' } });
+
+    function onFlickEvent(event) {
+        if (lastSeq !== null && event.seq <= lastSeq) return;
+        lastSeq = event.seq;
+        const data = event.data;
+        if (data && data.vy !== undefined && gameState.gameActive && !gameState.ballInHole) {
+            console.log('⛳ Flick received:', data);
+            shootBallWithGesture(data);
+        }
+    }
+
+    gestureSocket.on('connect', () => {
+        // On reconnect, ask for everything missed since the last flick
+        gestureSocket.emit('subscribe_gestures', { controller: CONTROLLER_ID, types: ['flick'], since: lastSeq });
+    });
+    gestureSocket.on('gesture_events', (batch) => {
+        batch.events.forEach(onFlickEvent);
+        lastSeq = Math.max(lastSeq || 0, batch.seq);
+    });
+    gestureSocket.on('gesture_event', (event) => {
+        onFlickEvent(event);
+        // Tell the server when the flick was handled, for its latency metrics
+        const data = event.data || {};
+        gestureSocket.emit('gesture_ack', { seq: event.seq, t_server: data.t_server, t_capture: data.t_capture, t_client: Date.now() / 1000 });
+    });
+}
+
+// Polling keeps its own read position (?since=<seq>), so another tab
+// polling the same controller can't take this page's flicks
+let flickSeq = null;
+
 function pollFlick() {
     if (!gesturePollingActive) return;
 
-    fetch(GESTURE_CONFIG.flickEndpoint)
+    fetch(GESTURE_CONFIG.flickEndpoint + '&since=' + (flickSeq === null ? 0 : flickSeq))
         .then(response => response.json())
-        .then(data => {
-            // Only trigger on flicks when game is active
-            if (data && data.vy !== undefined && gameState.gameActive && !gameState.ballInHole) {
-                console.log('⛳ Flick received:', data);
-                shootBallWithGesture(data);
+        .then(batch => {
+            // The first poll only learns the current seq; older flicks are stale
+            if (flickSeq !== null) {
+                batch.events.forEach(event => {
+                    const data = event.data;
+                    // Only trigger on flicks when game is active
+                    if (data && data.vy !== undefined && gameState.gameActive && !gameState.ballInHole) {
+                        console.log('⛳ Flick received:', data);
+                        shootBallWithGesture(data);
+                    }
+                });
             }
+            flickSeq = batch.seq;
         })
         .catch(() => { })
         .finally(() => {
@@ -317,11 +369,18 @@ function pollFlick() {
         });
 }
 
+// Long-poll: with ?since=<version> the server answers as soon as the hands move
+let handsVersion = null;
 function pollHands() {
     if (!gesturePollingActive) return;
 
-    fetch(GESTURE_CONFIG.handsEndpoint)
-        .then(response => response.json())
+    let failed = false;
+    const url = GESTURE_CONFIG.handsEndpoint + (handsVersion === null ? '' : '&since=' + handsVersion);
+    fetch(url)
+        .then(response => {
+            handsVersion = response.headers.get('X-State-Version') || handsVersion;
+            return response.status === 304 ? null : response.json();
+        })
         .then(data => {
             if (data) {
                 // LEFT HAND: X and Y position for 360 degree aim direction
@@ -345,9 +404,10 @@ function pollHands() {
                 updateAimArrow();
             }
         })
-        .catch(() => { })
+        .catch(() => { failed = true; })
         .finally(() => {
-            setTimeout(pollHands, GESTURE_CONFIG.pollInterval);
+            // Servers without versions get the old fixed-rate poll
+            setTimeout(pollHands, failed ? 500 : (handsVersion === null ? GESTURE_CONFIG.pollInterval : 0));
         });
 }
 
@@ -400,6 +460,7 @@ function shootBallWithGesture(flickData) {
     gameState.strokes[gameState.currentPlayer]++;
     gameState.hasSwitchedTurn = false;
     updateScoreDisplay();
+    broadcastShot();
 
     // Visual feedback
     document.getElementById('power-bar').style.width = (power / GESTURE_CONFIG.maxPower * 100) + '%';
@@ -1245,6 +1306,7 @@ function animate() {
             }
         }
         gameState.allBallsStopped = allBallsStopped;
+        syncBallInFlight();
 
         // If all balls stopped and it's multiplayer, switch turns
         if (allBallsStopped && !gameState.isDragging && !gameState.ballInHole && !gameState.hasSwitchedTurn) {
@@ -1343,16 +1405,30 @@ function initMinigolfMultiplayer() {
         return;
     }
 
-    mpSocket = io(MP_SERVER_URL);
+    // The room in the connect query keeps us on the room's worker (cluster.py)
+    mpSocket = io(MP_SERVER_URL, { query: { room: 'minigolf-default' } });
 
     mpSocket.on('connect', () => {
         console.log('⛳ Connected to multiplayer server');
         mpSocket.emit('join_room', { room: 'minigolf-default', game: 'minigolf' });
+        // Route this camera's gestures and game state to our room only. Sent
+        // over HTTP so cluster.py delivers it to the controller's worker
+        fetch(MP_SERVER_URL + '/bind' + CONTROLLER_QUERY, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ room: 'minigolf-default', player: mpSocket.id })
+        }).catch(() => { });
     });
 
+    // Heartbeats let the server drop this session soon after the tab goes away
+    let heartbeatTimer = null;
     mpSocket.on('player_id', (data) => {
         myPlayerNum = data.playerNum;
         console.log(`⛳ You are Player ${myPlayerNum}`);
+        clearInterval(heartbeatTimer);
+        if (data.heartbeat) {
+            heartbeatTimer = setInterval(() => mpSocket.emit('heartbeat'), data.heartbeat * 1000);
+        }
     });
 
     mpSocket.on('player_joined', (data) => {
@@ -1369,10 +1445,62 @@ function initMinigolfMultiplayer() {
         }
     });
 
+    // Coalesced per-tick state of everyone in the room
+    mpSocket.on('room_snapshot', (snapshot) => {
+        if (gameState.mode !== 'multiplayer') return;
+        for (const [id, state] of Object.entries(snapshot.players)) {
+            if (id !== mpSocket.id && state.ball && state.ball.position) {
+                updateOpponentBall(state.ball.position, state.ball.velocity);
+            }
+        }
+    });
+
     mpSocket.on('score_update', (data) => {
         // Show opponent's stroke count
         console.log(`Opponent strokes: ${data.score}`);
     });
+
+    // Server-authoritative rooms (FLICK_SIMULATION=1) stream ball snapshots
+    mpSocket.on('sim_snapshot', onSimSnapshot);
+    requestAnimationFrame(interpolateOpponentBall);
+}
+
+// ========== SNAPSHOT INTERPOLATION ==========
+// Render the opponent ball slightly in the past, between two server snapshots
+const SNAPSHOT_DELAY = 100; // ms
+let simSnapshots = [];
+let serverClockOffset = null;
+
+function onSimSnapshot(snapshot) {
+    if (!snapshot.b) return;
+    // Smallest observed (local - server) time approximates the clock offset
+    const offset = Date.now() - snapshot.t;
+    serverClockOffset = serverClockOffset === null ? offset : Math.min(serverClockOffset, offset);
+    simSnapshots.push(snapshot);
+    if (simSnapshots.length > 32) simSnapshots.shift();
+}
+
+function interpolateOpponentBall() {
+    requestAnimationFrame(interpolateOpponentBall);
+    if (simSnapshots.length === 0 || gameState.mode !== 'multiplayer') return;
+
+    const renderTime = Date.now() - serverClockOffset - SNAPSHOT_DELAY;
+    let i = simSnapshots.length - 1;
+    while (i > 0 && simSnapshots[i - 1].t > renderTime) i--;
+    const to = simSnapshots[i];
+    const from = simSnapshots[Math.max(0, i - 1)];
+    const span = to.t - from.t;
+    const alpha = span > 0 ? Math.min(1, Math.max(0, (renderTime - from.t) / span)) : 1;
+
+    for (const [id, b] of Object.entries(to.b)) {
+        if (id === mpSocket.id) continue;
+        const a = (from.b && from.b[id]) || b;
+        const lerp = (k) => a[k] + (b[k] - a[k]) * alpha;
+        updateOpponentBall(
+            { x: lerp(0), y: lerp(1), z: lerp(2) },
+            { x: lerp(3), y: lerp(4), z: lerp(5) }
+        );
+    }
 }
 
 function updateOpponentBall(position, velocity) {
@@ -1392,12 +1520,15 @@ function updateOpponentBall(position, velocity) {
     }
 }
 
-// Broadcast ball position after each shot
+// Broadcast ball position after each shot. The stroke number tells a
+// server-simulated room which updates start a new putt; the others are
+// in-flight position reports for the relay path.
 function broadcastBallPosition() {
     if (mpSocket && mpSocket.connected && gameState.mode === 'multiplayer') {
         const myBall = ballBodies[myPlayerNum - 1];
         if (myBall) {
             mpSocket.emit('ball_update', {
+                stroke: gameState.strokes[myPlayerNum],
                 position: { x: myBall.position.x, y: myBall.position.y, z: myBall.position.z },
                 velocity: { x: myBall.velocity.x, y: myBall.velocity.y, z: myBall.velocity.z }
             });
@@ -1405,6 +1536,24 @@ function broadcastBallPosition() {
     }
 }
 
+function broadcastShot() {
+    broadcastBallPosition();
+    broadcastStrokeCount();
+}
+
+// While our ball rolls, keep the opponents' copy in sync at a modest rate
+const BALL_SYNC_INTERVAL = 100; // ms
+let lastBallSync = 0;
+
+function syncBallInFlight() {
+    const myBall = ballBodies[myPlayerNum - 1];
+    if (!myBall || myBall.velocity.length() < 0.15) return;
+    const now = Date.now();
+    if (now - lastBallSync < BALL_SYNC_INTERVAL) return;
+    lastBallSync = now;
+    broadcastBallPosition();
+}
+
 // Broadcast stroke count after each shot
 function broadcastStrokeCount() {
     if (mpSocket && mpSocket.connected) {
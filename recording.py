@@ -0,0 +1,194 @@
+"""
+Binary recording and replay of the messages a controller sends.
+
+gptScript1.py appends every message it posts (aim, hands, flick, punch,
+game_state, camera frames) to a recording when FLICK_RECORD=<path> is
+set. The replayer memory-maps the file and posts the same messages to a
+server, at the original pace, sped up, or as fast as possible - a
+reproducible input stream with no camera or player.
+
+File layout: an 8-byte magic, then records of
+
+    <d time> <B kind> <I length> <payload>
+
+where the payload is compact JSON, or the raw JPEG bytes for frames.
+
+    python recording.py info session.flkrec
+    python recording.py replay session.flkrec --speed 2
+    python recording.py replay session.flkrec --speed 0   # max speed
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'FLKREC1\n'
+RECORD = struct.Struct('<dBI')
+
+# Message kinds -> server path; the numbering is part of the file format
+KINDS = {
+    1: ('aim', '/aim'),
+    2: ('hands', '/hands'),
+    3: ('flick', '/flick'),
+    4: ('punch', '/punch'),
+    5: ('game_state', '/game_state'),
+    6: ('frame', '/video_frame'),
+}
+KIND_IDS = {name: kind for kind, (name, _) in KINDS.items()}
+FRAME = KIND_IDS['frame']
+
+
+class Recorder:
+    """Append-only writer; safe to call from several sender threads."""
+
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._lock = threading.Lock()
+
+    def record(self, kind, payload, timestamp=None):
+        """Append one message: a dict (stored as JSON) or JPEG bytes for 'frame'."""
+        if kind == 'frame':
+            body = bytes(payload)
+        else:
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        header = RECORD.pack(time.time() if timestamp is None else timestamp,
+                             KIND_IDS[kind], len(body))
+        with self._lock:
+            self._file.write(header)
+            self._file.write(body)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Recording:
+    """Read-only view of a recording file, memory-mapped."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC):
+                raise ValueError(f"{path} is not a recording (too short)")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a recording (bad header)")
+
+    def __iter__(self):
+        """(time, kind name, payload) per record; frames are zero-copy memoryviews."""
+        view = memoryview(self._map)
+        offset, end = len(MAGIC), len(self._map)
+        try:
+            while offset + RECORD.size <= end:
+                timestamp, kind, length = RECORD.unpack_from(self._map, offset)
+                offset += RECORD.size
+                if offset + length > end:
+                    break  # truncated tail from a crash while recording
+                body = view[offset:offset + length]
+                offset += length
+                if kind not in KINDS:
+                    continue
+                name = KINDS[kind][0]
+                yield timestamp, name, body if kind == FRAME else json.loads(bytes(body))
+        finally:
+            view.release()
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the map goes with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(path, url, speed=1.0, controller=None, session=None):
+    """
+    Post every recorded message to the server at url, in order.
+
+    speed 1.0 keeps the original timing, 2.0 plays twice as fast and 0
+    sends back to back. Flick/punch stamps are shifted to the replay
+    clock so the server's latency histograms stay meaningful.
+    Returns {'messages', 'errors', 'seconds'}.
+    """
+    import requests
+    session = session or requests.Session()
+    headers = {'X-Controller-Id': controller} if controller else {}
+    sent = errors = 0
+    start = time.perf_counter()
+    first = None
+    with Recording(path) as recording:
+        for timestamp, kind, payload in recording:
+            if first is None:
+                first = timestamp
+            if speed > 0:
+                delay = (timestamp - first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            target = url + KINDS[KIND_IDS[kind]][1]
+            try:
+                if kind == 'frame':
+                    resp = session.post(target, data=bytes(payload), timeout=2,
+                                        headers={**headers, 'Content-Type': 'image/jpeg'})
+                else:
+                    if kind in ('flick', 'punch'):
+                        shift = time.time() - timestamp
+                        for stamp in ('timestamp', 't_capture'):
+                            if isinstance(payload.get(stamp), (int, float)):
+                                payload[stamp] += shift
+                    resp = session.post(target, json=payload, headers=headers, timeout=2)
+                errors += not resp.ok
+            except requests.RequestException:
+                errors += 1
+            sent += 1
+    return {'messages': sent, 'errors': errors, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def describe(path):
+    """Message counts per kind, byte totals and duration of a recording."""
+    counts, sizes = {}, {}
+    first = last = None
+    with Recording(path) as recording:
+        for timestamp, kind, payload in recording:
+            first = timestamp if first is None else first
+            last = timestamp
+            counts[kind] = counts.get(kind, 0) + 1
+            size = len(payload) if kind == 'frame' else len(json.dumps(payload))
+            sizes[kind] = sizes.get(kind, 0) + size
+    return {'duration_s': round((last - first) if first is not None else 0.0, 3),
+            'messages': counts, 'payload_bytes': sizes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help="summarise a recording")
+    info.add_argument('path')
+    play = sub.add_parser('replay', help="post a recording to a server")
+    play.add_argument('path')
+    play.add_argument('--url', default='http://localhost:5001')
+    play.add_argument('--speed', type=float, default=1.0, help="1 = original pace, 0 = max speed")
+    play.add_argument('--controller', help="controller id to replay as (X-Controller-Id)")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(describe(args.path), indent=2))
+    else:
+        result = replay(args.path, args.url.rstrip('/'), args.speed, args.controller)
+        rate = result['messages'] / result['seconds'] if result['seconds'] else 0.0
+        print(f"▶️  {result['messages']} messages in {result['seconds']}s "
+              f"({rate:.0f}/s, {result['errors']} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Thread-safe player and room registry for the Socket.IO relay."""
+import heapq
+import threading
+import time
+
+
+class Player:
+    """One connected Socket.IO session."""
+    __slots__ = ('id', 'name', 'room', 'score', 'hands', 'last_seen', 'heartbeats', 'due')
+
+    def __init__(self, sid, name, hands):
+        self.id = sid
+        self.name = name
+        self.room = None
+        self.score = 0
+        self.hands = hands
+        self.last_seen = time.monotonic()
+        self.heartbeats = False  # client sends 'heartbeat'; silence then means gone
+        self.due = None  # deadline of this player's live entry in the sweeper heap
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'room': self.room,
+                'score': self.score, 'hands': self.hands}
+
+
+class Room:
+    """A game room; members is a dict used as an insertion-ordered set."""
+    __slots__ = ('code', 'game', 'members', 'state')
+
+    def __init__(self, code, game):
+        self.code = code
+        self.game = game
+        self.members = {}
+        self.state = {'scores': {}, 'turn': 0}
+
+    def player_ids(self):
+        return list(self.members)
+
+
+class Registry:
+    """
+    Players and rooms behind one lock, with O(1) joins, leaves and lookups.
+
+    Every operation is a handful of dict operations, so the critical
+    sections stay tiny even with thousands of sessions. A room is deleted
+    as soon as its last member leaves.
+
+    Idle sessions are found through a heap of (deadline, sid). Touching a
+    player only updates last_seen; the sweeper pops due entries and
+    either evicts the player or pushes it back at its real deadline, so
+    a sweep costs O(due entries * log n) instead of a scan of everyone.
+    Sessions that send heartbeats get the shorter heartbeat_timeout.
+    """
+
+    def __init__(self, idle_timeout=60.0, heartbeat_timeout=15.0):
+        self._lock = threading.Lock()
+        self._players = {}
+        self._rooms = {}
+        self._deadlines = []  # heap of (deadline, sid); stale entries are skipped
+        self.idle_timeout = idle_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.evicted_total = 0
+
+    def __len__(self):
+        return len(self._players)
+
+    @property
+    def room_count(self):
+        return len(self._rooms)
+
+    @property
+    def pending_deadlines(self):
+        return len(self._deadlines)
+
+    def _timeout(self, player):
+        return self.heartbeat_timeout if player.heartbeats else self.idle_timeout
+
+    def _schedule_locked(self, player, deadline):
+        # Any older heap entry for the player no longer matches player.due and is skipped
+        player.due = deadline
+        heapq.heappush(self._deadlines, (deadline, player.id))
+
+    def add_player(self, sid, hands):
+        """Register a new session and return its Player record."""
+        with self._lock:
+            player = Player(sid, f'Player {len(self._players) + 1}', hands)
+            self._players[sid] = player
+            self._schedule_locked(player, player.last_seen + self.idle_timeout)
+            return player
+
+    def get(self, sid):
+        return self._players.get(sid)
+
+    def room_of(self, sid):
+        player = self._players.get(sid)
+        return player.room if player else None
+
+    def touch(self, sid):
+        """Mark a session as active (any message from it counts)."""
+        player = self._players.get(sid)
+        if player:
+            player.last_seen = time.monotonic()
+        return player
+
+    def heartbeat(self, sid):
+        """A client heartbeat: touch the session and switch it to the heartbeat timeout."""
+        player = self.touch(sid)
+        if player and not player.heartbeats:
+            with self._lock:
+                player.heartbeats = True
+                self._schedule_locked(player, player.last_seen + self.heartbeat_timeout)
+        return player
+
+    def get_room(self, code):
+        return self._rooms.get(code)
+
+    def join(self, sid, code, game):
+        """Put a player in a room, leaving any previous one. Returns the Room."""
+        with self._lock:
+            player = self._players.get(sid)
+            if player is None:
+                return None
+            if player.room is not None and player.room != code:
+                self._leave_locked(player)
+            room = self._rooms.get(code)
+            if room is None:
+                room = self._rooms[code] = Room(code, game)
+            room.members[sid] = None
+            player.room = code
+            player.last_seen = time.monotonic()
+            return room
+
+    def leave(self, sid):
+        """Take a player out of their room. Returns the room code left, if any."""
+        with self._lock:
+            player = self._players.get(sid)
+            return self._leave_locked(player) if player else None
+
+    def remove(self, sid):
+        """Forget a session entirely. Returns the room code it was in, if any."""
+        with self._lock:
+            player = self._players.pop(sid, None)
+            return self._leave_locked(player) if player else None
+
+    def _leave_locked(self, player):
+        code = player.room
+        player.room = None
+        room = self._rooms.get(code)
+        if room is not None:
+            room.members.pop(player.id, None)
+            if not room.members:
+                del self._rooms[code]
+        return code
+
+    def reap_stale(self, is_alive=None, now=None):
+        """
+        Evict sessions whose timeout has passed.
+
+        If is_alive(sid) is given, a session that never sent heartbeats is
+        kept while its connection is still up (old clients just stay
+        quiet); heartbeating sessions are evicted once they go silent.
+        Returns a list of (sid, room_code) for evicted sessions.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                entry_deadline, sid = heapq.heappop(self._deadlines)
+                player = self._players.get(sid)
+                if player is None or player.due != entry_deadline:
+                    continue  # left cleanly or rescheduled; a leftover entry
+                deadline = player.last_seen + self._timeout(player)
+                if deadline > now:
+                    self._schedule_locked(player, deadline)
+                else:
+                    player.due = None
+                    due.append(player)
+        evicted = []
+        for player in due:
+            if is_alive is not None and not player.heartbeats and is_alive(player.id):
+                self.touch(player.id)
+                with self._lock:
+                    self._schedule_locked(player, player.last_seen + self.idle_timeout)
+                continue
+            with self._lock:
+                if self._players.get(player.id) is player:
+                    del self._players[player.id]
+                    evicted.append((player.id, self._leave_locked(player)))
+        self.evicted_total += len(evicted)
+        return evicted
@@ -0,0 +1,323 @@
+"""
+Optional server-authoritative simulation for minigolf and boxing rooms.
+
+Instead of relaying every ball_update/punch_hit peer to peer, the server
+owns the ball state and the hit resolution, steps every room at a fixed
+tick, and emits compact timestamped snapshots that clients interpolate
+between.
+
+The golf world is the one public/games/minigolf/game.js builds in
+cannon.js: the same walls, obstacles and hole, ground friction that
+turns a sliding ball into a rolling one, the same damping and
+restitutions, and balls colliding with each other. Stepping is plain
+Python, so rooms are stepped one after another: threads would only take
+turns on the GIL (and are green threads under eventlet/gevent anyway).
+"""
+import math
+import threading
+import time
+
+# Minigolf course, matching public/games/minigolf/game.js
+GRAVITY = -9.82
+STEP = 1 / 60            # the client's world.step; longer ticks are split into these
+BALL_RADIUS = 0.2
+LINEAR_DAMPING = 0.4     # cannon.js linearDamping on the ball body
+ANGULAR_DAMPING = 0.4
+GROUND_FRICTION = 0.8    # ball-ground contact material
+GROUND_RESTITUTION = 0.1
+WALL_RESTITUTION = 0.7
+OBSTACLE_RESTITUTION = 0.5
+BALL_RESTITUTION = 0.6   # ball-ball contact material
+COURSE_HALF_WIDTH = 15.0 - 0.25   # inner face of the side walls
+COURSE_HALF_LENGTH = 20.0 - 0.25
+# (kind, x, z, size): upright cylinders and boxes are taller than the ball,
+# so they are circles/rectangles on the ground plane; spheres rest on it
+OBSTACLES = (
+    ('cylinder', -5.0, 0.0, 0.8),
+    ('cylinder', 5.0, 5.0, 0.6),
+    ('sphere', -3.0, 10.0, 0.6),
+    ('box', 4.0, -5.0, (0.75, 0.75)),   # half extents in x and z
+    ('cylinder', 0.0, 5.0, 0.5),
+    ('sphere', -2.0, -8.0, 0.5),
+)
+HOLE = (0.0, 0.1, 15.0)
+HOLE_RADIUS = 0.6
+SINK_SPEED = 0.5         # checkBallInHole: slower than this within HOLE_RADIUS
+REST_SPEED = 0.05        # below this a ball on the ground is considered stopped
+
+# Boxing
+PUNCH_COOLDOWN = 0.2     # seconds between hits counted for one attacker
+MAX_PUNCH_POWER = 3.0
+
+
+def _round(values):
+    return [round(v, 3) for v in values]
+
+
+def _bounce(vel, normal, restitution):
+    """Reflect the part of vel going into a surface with this outward normal."""
+    into = sum(v * n for v, n in zip(vel, normal))
+    if into < 0:
+        for i, n in enumerate(normal):
+            vel[i] -= (1 + restitution) * into * n
+
+
+class GolfBall:
+    """
+    Sphere on the course. spin is the ground speed its rotation alone
+    would give it (x, z): friction pulls velocity and spin together until
+    the ball rolls, as a solid sphere on cannon.js's ground does.
+    """
+    __slots__ = ('pos', 'vel', 'spin', 'sunk')
+
+    def __init__(self, position, velocity):
+        self.pos = list(position)
+        self.vel = list(velocity)
+        self.spin = [0.0, 0.0]
+        self.sunk = False
+
+    def step(self, dt):
+        """Advance dt seconds in STEP-sized substeps."""
+        steps = max(1, math.ceil(dt / STEP - 1e-9))
+        for _ in range(steps):
+            if self.sunk:
+                return
+            self._substep(dt / steps)
+
+    def _substep(self, dt):
+        pos, vel, spin = self.pos, self.vel, self.spin
+        vel[1] += GRAVITY * dt
+        damping = (1.0 - LINEAR_DAMPING) ** dt
+        spin_damping = (1.0 - ANGULAR_DAMPING) ** dt
+        for i in range(3):
+            vel[i] *= damping
+            pos[i] += vel[i] * dt
+        spin[0] *= spin_damping
+        spin[1] *= spin_damping
+
+        on_ground = pos[1] <= BALL_RADIUS
+        if on_ground:
+            pos[1] = BALL_RADIUS
+            vel[1] = -vel[1] * GROUND_RESTITUTION if vel[1] < -0.5 else 0.0
+            self._rub(dt)
+        for axis, limit in ((0, COURSE_HALF_WIDTH), (2, COURSE_HALF_LENGTH)):
+            if abs(pos[axis]) > limit - BALL_RADIUS:
+                pos[axis] = math.copysign(limit - BALL_RADIUS, pos[axis])
+                vel[axis] = -vel[axis] * WALL_RESTITUTION
+        for obstacle in OBSTACLES:
+            self._collide(*obstacle)
+
+        if math.dist(pos, HOLE) < HOLE_RADIUS and math.hypot(*vel) < SINK_SPEED:
+            self.sunk = True
+            self.vel = [0.0, 0.0, 0.0]
+            self.spin = [0.0, 0.0]
+            return
+        if on_ground and math.hypot(vel[0], vel[2]) < REST_SPEED:
+            vel[0] = vel[2] = 0.0
+            spin[0] = spin[1] = 0.0
+
+    def _rub(self, dt):
+        """Ground friction on a sliding ball, until it rolls without slipping."""
+        vel, spin = self.vel, self.spin
+        slip_x, slip_z = vel[0] - spin[0], vel[2] - spin[1]
+        slip = math.hypot(slip_x, slip_z)
+        if slip == 0.0:
+            return
+        # Friction impulse per unit mass, capped where slip reaches zero; a
+        # solid sphere's spin gains 5/2 of what its velocity loses
+        impulse = min(GROUND_FRICTION * -GRAVITY * dt, slip * 2 / 7) / slip
+        vel[0] -= impulse * slip_x
+        vel[2] -= impulse * slip_z
+        spin[0] += 2.5 * impulse * slip_x
+        spin[1] += 2.5 * impulse * slip_z
+
+    def _collide(self, kind, x, z, size):
+        pos = self.pos
+        if kind == 'sphere':
+            centre = (x, size, z)
+            reach = size
+        elif kind == 'cylinder':
+            centre = (x, pos[1], z)
+            reach = size
+        else:
+            # Closest point of the rectangle; a centre inside it is pushed
+            # out through the nearest side
+            half_x, half_z = size
+            dx, dz = pos[0] - x, pos[2] - z
+            if abs(dx) < half_x and abs(dz) < half_z:
+                if half_x - abs(dx) < half_z - abs(dz):
+                    dx = math.copysign(half_x, dx)
+                else:
+                    dz = math.copysign(half_z, dz)
+            centre = (x + max(-half_x, min(half_x, dx)), pos[1], z + max(-half_z, min(half_z, dz)))
+            reach = 0.0
+        offset = [p - c for p, c in zip(pos, centre)]
+        distance = math.hypot(*offset)
+        if distance >= reach + BALL_RADIUS or distance == 0.0:
+            return
+        normal = [o / distance for o in offset]
+        for i in range(3):
+            pos[i] = centre[i] + normal[i] * (reach + BALL_RADIUS)
+        _bounce(self.vel, normal, OBSTACLE_RESTITUTION)
+
+    def at_rest(self):
+        return self.sunk or not any(self.vel)
+
+    def pack(self):
+        return _round(self.pos + self.vel) + [int(self.sunk)]
+
+
+def collide_balls(a, b):
+    """Equal-mass collision between two balls, if they touch."""
+    if a.sunk or b.sunk:
+        return
+    offset = [p - q for p, q in zip(a.pos, b.pos)]
+    distance = math.hypot(*offset)
+    if distance >= 2 * BALL_RADIUS or distance == 0.0:
+        return
+    normal = [o / distance for o in offset]
+    push = (2 * BALL_RADIUS - distance) / 2
+    for i in range(3):
+        a.pos[i] += normal[i] * push
+        b.pos[i] -= normal[i] * push
+    closing = sum((va - vb) * n for va, vb, n in zip(a.vel, b.vel, normal))
+    if closing < 0:
+        impulse = -(1 + BALL_RESTITUTION) * closing / 2
+        for i in range(3):
+            a.vel[i] += impulse * normal[i]
+            b.vel[i] -= impulse * normal[i]
+
+
+class RoomSimulation:
+    """Authoritative state of one room, stepped by SimulationHost."""
+
+    def __init__(self, game):
+        self.game = game
+        self.balls = {}         # minigolf: {sid: GolfBall}
+        self.strokes = {}       # minigolf: {sid: number of the shot being simulated}
+        self.hits = {}          # boxing: {sid: hits landed}
+        self.last_hit = {}      # boxing: {sid: time of last counted hit}
+        self.events = []        # resolved events to emit with the next snapshot
+        self.lock = threading.Lock()
+        self.tick = 0
+        self._last_state = None
+
+    def shoot(self, sid, position, velocity, stroke=None):
+        """
+        A player's putt: the server takes over that ball from here.
+
+        Clients keep sending ball_update while their ball rolls; only an
+        update with a stroke number above the last one starts a new shot.
+        Without a stroke number a shot is only taken once the ball is at
+        rest. Returns whether the shot was taken.
+        """
+        with self.lock:
+            if stroke is not None:
+                if stroke <= self.strokes.get(sid, 0):
+                    return False
+                self.strokes[sid] = stroke
+            else:
+                ball = self.balls.get(sid)
+                if ball is not None and not ball.at_rest():
+                    return False
+            self.balls[sid] = GolfBall(position, velocity)
+            return True
+
+    def punch(self, sid, hand, power, now=None):
+        """Resolve a hit claim; returns the accepted event or None."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if now - self.last_hit.get(sid, -math.inf) < PUNCH_COOLDOWN:
+                return None
+            self.last_hit[sid] = now
+            self.hits[sid] = self.hits.get(sid, 0) + 1
+            event = {'by': sid, 'hand': hand,
+                     'power': max(0.0, min(float(power or 0), MAX_PUNCH_POWER))}
+            self.events.append(event)
+            return event
+
+    def remove(self, sid):
+        with self.lock:
+            self.balls.pop(sid, None)
+            self.strokes.pop(sid, None)
+            self.hits.pop(sid, None)
+            self.last_hit.pop(sid, None)
+
+    def step(self, dt):
+        with self.lock:
+            self.tick += 1
+            balls = list(self.balls.values())
+            for ball in balls:
+                ball.step(dt)
+            for i, ball in enumerate(balls):
+                for other in balls[i + 1:]:
+                    collide_balls(ball, other)
+
+    def snapshot(self):
+        """
+        Compact snapshot: balls as [x, y, z, vx, vy, vz, sunk], hits per player.
+
+        Returns (snapshot, events); snapshot is None when there is no
+        state yet or nothing changed since the last one, so idle rooms
+        cost no traffic.
+        """
+        with self.lock:
+            state = {}
+            if self.balls:
+                state['b'] = {sid: ball.pack() for sid, ball in self.balls.items()}
+            if self.hits:
+                state['h'] = dict(self.hits)
+            events, self.events = self.events, []
+            if not state or state == self._last_state:
+                return None, events
+            self._last_state = state
+            return dict(state, t=round(time.time() * 1000), k=self.tick), events
+
+
+class SimulationHost:
+    """
+    Fixed-tick driver for every simulated room.
+
+    Each tick steps all rooms, then hands each room's snapshot (and any
+    resolved hits) to emit(room, snapshot, events). Cost per tick grows
+    linearly with the number of rooms.
+    """
+
+    GAMES = ('minigolf', 'boxing')
+
+    def __init__(self, emit, rate):
+        self._emit = emit
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.interval = 1.0 / rate
+
+    def room(self, code, game=None):
+        """Simulation for a room, created on demand for simulated games."""
+        sim = self._rooms.get(code)
+        if sim is None and game in self.GAMES:
+            with self._lock:
+                sim = self._rooms.setdefault(code, RoomSimulation(game))
+        return sim
+
+    def drop(self, code):
+        with self._lock:
+            self._rooms.pop(code, None)
+
+    def step_all(self, dt):
+        with self._lock:
+            rooms = list(self._rooms.items())
+        for code, sim in rooms:
+            sim.step(dt)
+            snap, events = sim.snapshot()
+            if snap is not None or events:
+                self._emit(code, snap, events)
+        return len(rooms)
+
+    def run(self, sleep):
+        """Tick loop for a background task; sleep is the backend's sleep()."""
+        last = time.monotonic()
+        while True:
+            now = time.monotonic()
+            self.step_all(now - last)
+            last = now
+            sleep(max(0.0, self.interval - (time.monotonic() - now)))
@@ -0,0 +1,48 @@
+"""Fixed-tick coalescing of high-rate per-player room state."""
+import threading
+import time
+
+
+class RoomTicker:
+    """
+    Latest-wins buffer of per-player state, flushed once per tick per room.
+
+    Handlers call update() as often as clients send; only the newest value
+    of each (player, key) survives until the next tick, when every room
+    with changes gets one 'room_snapshot'. Outbound traffic is therefore
+    bounded by the tick rate, not by how fast clients send.
+    """
+
+    def __init__(self, emit, rate):
+        self._emit = emit  # emit(room, snapshot)
+        self._pending = {}  # {room: {sid: {key: value}}}
+        self._lock = threading.Lock()
+        self.interval = 1.0 / rate
+
+    def update(self, room, sid, key, value):
+        with self._lock:
+            self._pending.setdefault(room, {}).setdefault(sid, {})[key] = value
+
+    def discard(self, room, sid):
+        """Forget buffered state of a player who left the room."""
+        with self._lock:
+            players = self._pending.get(room)
+            if players:
+                players.pop(sid, None)
+
+    def flush(self):
+        """Emit one snapshot per room with pending changes. Returns rooms flushed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        now = time.time()
+        for room, players in pending.items():
+            if players:
+                self._emit(room, {'t': now, 'players': players})
+        return len(pending)
+
+    def run(self, sleep):
+        """Tick loop for a background task; sleep is the backend's sleep()."""
+        while True:
+            started = time.monotonic()
+            self.flush()
+            sleep(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,220 @@
+"""
+Cache-friendly serving of the static games tree (public/).
+
+At startup the whole tree is indexed once: size, mimetype, a strong
+content hash for the ETag, and the bytes themselves for files small
+enough to keep in memory. Requests are then answered without touching
+the disk:
+
+- precompressed .br/.gz siblings (made at build time, see below) are
+  picked by Accept-Encoding; nothing is compressed per request
+- strong ETags and If-None-Match give cheap 304 revalidation
+- file names carrying a content hash (main.3f9a1c2b.js) are cached by
+  browsers for a year as immutable; everything else revalidates
+- Range requests (audio seeking) get 206 partial responses
+
+Build the compressed variants once after changing the tree:
+
+    python static_assets.py build public
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, redirect, send_file
+
+# Files up to this size are held in memory; bigger ones stream from disk
+MAX_CACHED_BYTES = 1024 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# name.<8+ hex chars>.ext or name-<hash>.ext, as bundlers emit
+HASHED_NAME = re.compile(r'[.-][0-9a-fA-F]{8,}\.[A-Za-z0-9]+$')
+# Worth compressing; images/audio formats other than WAV are already compressed
+COMPRESSIBLE = ('.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.md', '.map', '.wav')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preference order
+
+mimetypes.add_type('text/javascript', '.mjs')
+
+
+class Asset:
+    """One indexed file and its precompressed variants."""
+    __slots__ = ('path', 'size', 'mtime', 'mimetype', 'etag', 'immutable', 'body', 'variants')
+
+    def __init__(self, path):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = bool(HASHED_NAME.search(os.path.basename(path)))
+        self.variants = {}  # {encoding: (path, body or None, size)}
+        self.load()
+
+    def load(self):
+        stat = os.stat(self.path)
+        self.size, self.mtime = stat.st_size, stat.st_mtime
+        digest = hashlib.sha1()
+        with open(self.path, 'rb') as f:
+            data = f.read() if self.size <= MAX_CACHED_BYTES else None
+            if data is not None:
+                digest.update(data)
+            else:
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    digest.update(block)
+        self.body = data
+        self.etag = digest.hexdigest()[:20]
+        self.variants = {}
+        for encoding, suffix in ENCODINGS:
+            variant = self.path + suffix
+            # A variant older than its source is stale; serve the original instead
+            if os.path.isfile(variant) and os.stat(variant).st_mtime >= self.mtime:
+                size = os.path.getsize(variant)
+                body = None
+                if size <= MAX_CACHED_BYTES:
+                    with open(variant, 'rb') as f:
+                        body = f.read()
+                self.variants[encoding] = (variant, body, size)
+
+    def changed_on_disk(self):
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return False
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts; q=0 means refused."""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class StaticIndex:
+    """In-memory index of a static tree, keyed by URL path."""
+
+    def __init__(self, root, check_changes=False):
+        self.root = os.path.abspath(root)
+        self.check_changes = check_changes
+        self.assets = {}
+        self.scan()
+
+    def scan(self):
+        assets = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != 'node_modules']
+            for name in filenames:
+                if name.startswith('.') or name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(dirpath, name)
+                url = os.path.relpath(path, self.root).replace(os.sep, '/')
+                assets[url] = Asset(path)
+        self.assets = assets
+        return self
+
+    def __len__(self):
+        return len(self.assets)
+
+    def lookup(self, url_path):
+        """(asset, is a directory index) for a URL path, or (None, False)."""
+        url_path = url_path.strip('/')
+        asset = self.assets.get(url_path)
+        if asset is not None:
+            return asset, False
+        asset = self.assets.get(f"{url_path}/index.html".lstrip('/'))
+        return asset, asset is not None
+
+    def response(self, url_path, request):
+        """Flask response for url_path, or None if it isn't in the tree."""
+        asset, is_index = self.lookup(url_path)
+        if asset is None:
+            return None
+        if is_index and not request.path.endswith('/'):
+            # Pages use relative asset URLs, so directories need the slash
+            return redirect(request.path + '/', code=301)
+        if self.check_changes and asset.changed_on_disk():
+            asset.load()
+
+        # Range requests are answered from the identity bytes so offsets mean
+        # what the client expects
+        encoding = None
+        if asset.variants and 'Range' not in request.headers:
+            accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+            encoding = next((e for e, _ in ENCODINGS if e in accepted and e in asset.variants), None)
+
+        if encoding:
+            path, body, _ = asset.variants[encoding]
+            etag = f"{asset.etag}-{encoding}"
+        else:
+            path, body, etag = asset.path, asset.body, asset.etag
+
+        if body is not None:
+            response = Response(body, mimetype=asset.mimetype)
+            response.set_etag(etag)
+            response = response.make_conditional(request, accept_ranges=True,
+                                                  complete_length=len(body))
+        else:
+            response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True,
+                                 max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        if asset.immutable:
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'  # revalidate with the ETag
+        return response
+
+
+def build(root, min_saving=0.1, level=9):
+    """Write .gz (and .br, if the brotli package is installed) next to compressible files."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    written = skipped = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != 'node_modules']
+        for name in filenames:
+            if not name.lower().endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            candidates = [('.gz', gzip.compress(data, compresslevel=level, mtime=0))]
+            if brotli is not None:
+                candidates.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, packed in candidates:
+                if len(packed) > len(data) * (1 - min_saving):
+                    skipped += 1
+                    continue  # not worth a Content-Encoding round trip
+                with open(path + suffix, 'wb') as f:
+                    f.write(packed)
+                written += 1
+    return written, skipped, brotli is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    make = sub.add_parser('build', help="write precompressed .gz/.br variants")
+    make.add_argument('root', nargs='?', default='public')
+    args = parser.parse_args()
+
+    written, skipped, has_brotli = build(args.root)
+    print(f"📦 {written} compressed variants written, {skipped} not worth it"
+          + ("" if has_brotli else " (pip install brotli for .br)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Encode-once MJPEG fan-out for /video_feed, adapted per viewer."""
+import itertools
+import threading
+import time
+
+BOUNDARY = b'frame'
+JPEG_QUALITY = 75
+
+# A viewer whose sends take longer than this share of its frame interval
+# is backing up and steps down a level; one that sends this fast for
+# UPGRADE_AFTER frames in a row steps back up.
+DOWNGRADE_RATIO = 0.8
+UPGRADE_RATIO = 0.25
+UPGRADE_AFTER = 30
+CHANGE_COOLDOWN = 1.0  # seconds between level changes for one viewer
+EWMA = 0.2
+
+_opencv = None  # (cv2, numpy) once imported, False if they aren't installed
+
+
+def load_opencv():
+    """(cv2, numpy), or None without OpenCV; the import is only tried once."""
+    global _opencv
+    if _opencv is None:
+        try:
+            import cv2
+            import numpy as np
+            _opencv = (cv2, np)
+        except ImportError:
+            _opencv = False
+    return _opencv or None
+
+
+def encode_jpeg(image, quality=JPEG_QUALITY):
+    """Encode a BGR image array to JPEG bytes (OpenCV is only needed here)."""
+    modules = load_opencv()
+    if modules is None:
+        raise ImportError("encoding frames needs OpenCV (cv2)")
+    cv2 = modules[0]
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def transcode_jpeg(jpeg, scale, quality):
+    """Re-encode JPEG bytes smaller; None if OpenCV isn't installed."""
+    modules = load_opencv()
+    if modules is None:
+        return None
+    cv2, np = modules
+    image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    if scale < 1.0:
+        height, width = image.shape[:2]
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return encode_jpeg(image, quality)
+
+
+def multipart_chunk(jpeg):
+    """Wrap one JPEG in its multipart/x-mixed-replace part."""
+    return (b'--' + BOUNDARY + b'\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+def quality_levels(max_fps=30.0, min_fps=5.0, min_quality=35, min_scale=0.5, steps=3):
+    """
+    Ladder of (scale, jpeg quality, fps) from full quality down to the bounds.
+
+    Level 0 passes the published JPEG through untouched (quality None);
+    each further level shrinks the picture, lowers the quality and caps
+    the frame rate a little more, ending exactly at the given minimums.
+    """
+    levels = [(1.0, None, max_fps)]
+    for i in range(1, steps + 1):
+        t = i / steps
+        levels.append((round(1.0 - (1.0 - min_scale) * t, 3),
+                       int(round(JPEG_QUALITY - (JPEG_QUALITY - min_quality) * t)),
+                       max_fps - (max_fps - min_fps) * t))
+    return levels
+
+
+class Viewer:
+    """Send-rate bookkeeping and current level for one /video_feed stream."""
+    __slots__ = ('id', 'level', 'max_level', 'send_time', 'bytes_per_sec',
+                 'sent', 'dropped', 'fast_streak', 'changed_at')
+
+    def __init__(self, vid, max_level):
+        self.id = vid
+        self.level = 0
+        self.max_level = max_level
+        self.send_time = 0.0
+        self.bytes_per_sec = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self.fast_streak = 0
+        self.changed_at = 0.0
+
+    def record_send(self, nbytes, seconds, interval):
+        """Update the send estimates and move one level if the link calls for it."""
+        self.sent += 1
+        self.send_time += EWMA * (seconds - self.send_time)
+        if seconds > 0:
+            self.bytes_per_sec += EWMA * (nbytes / seconds - self.bytes_per_sec)
+        now = time.monotonic()
+        if now - self.changed_at < CHANGE_COOLDOWN:
+            return
+        if self.send_time > interval * DOWNGRADE_RATIO and self.level < self.max_level:
+            self.level += 1
+            self.changed_at, self.fast_streak = now, 0
+        elif self.send_time < interval * UPGRADE_RATIO:
+            self.fast_streak += 1
+            if self.fast_streak >= UPGRADE_AFTER and self.level > 0:
+                self.level -= 1
+                self.changed_at, self.fast_streak = now, 0
+        else:
+            self.fast_streak = 0
+
+    def to_dict(self):
+        return {'id': self.id, 'level': self.level, 'sent': self.sent, 'dropped': self.dropped,
+                'send_ms': round(self.send_time * 1000, 2),
+                'kbytes_per_sec': round(self.bytes_per_sec / 1024, 1)}
+
+
+class FrameBroadcaster:
+    """
+    Holds the newest frame and hands it to any number of viewers.
+
+    Each published frame is encoded and framed exactly once and tagged with
+    a version. Viewers sleep on a condition variable until the version
+    moves past the one they last sent; a viewer that falls behind simply
+    gets the newest frame next, so nothing queues up per viewer.
+
+    Every viewer also times its own sends. When its socket backs up it
+    steps down the quality ladder (smaller, lower-quality, less frequent
+    frames) and climbs back when sends are fast again. Each reduced level
+    is transcoded at most once per frame and shared by all viewers on it.
+
+    offload(fn, *args) runs a transcode and returns its result; under
+    eventlet/gevent it should hand fn to a real thread so decoding and
+    encoding don't stall every other green thread. By default it runs
+    in the viewer's own thread.
+    """
+
+    def __init__(self, levels=None, offload=None):
+        self.levels = levels or quality_levels()
+        self._offload = offload or (lambda fn, *args: fn(*args))
+        self._cond = threading.Condition()
+        self._version = 0
+        self._chunk = None
+        self._jpeg = None
+        self._variants = {}  # {level: (version, chunk)}
+        self._level_locks = [threading.Lock() for _ in self.levels]
+        self._viewers = {}
+        self._viewer_ids = itertools.count(1)
+
+    @property
+    def version(self):
+        return self._version
+
+    def viewers(self):
+        """Snapshot of every connected viewer's settings and send rate."""
+        out = []
+        for viewer in list(self._viewers.values()):
+            scale, quality, fps = self.levels[viewer.level]
+            out.append({**viewer.to_dict(), 'scale': scale, 'quality': quality or JPEG_QUALITY,
+                        'fps': round(fps, 1)})
+        return out
+
+    def publish(self, frame):
+        """Store a new frame: JPEG bytes are kept as-is, arrays are encoded once."""
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            jpeg = bytes(frame)
+        else:
+            jpeg = encode_jpeg(frame)
+        chunk = multipart_chunk(jpeg)
+        with self._cond:
+            self._version += 1
+            self._jpeg = jpeg
+            self._chunk = chunk
+            self._cond.notify_all()
+        return self._version
+
+    def _wait(self, after_version, timeout):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._version > after_version, timeout):
+                return after_version, None, None
+            return self._version, self._chunk, self._jpeg
+
+    def chunk_for_level(self, version, chunk, jpeg, level):
+        """The frame's chunk at a quality level, transcoded once per frame and level."""
+        scale, quality, _ = self.levels[level]
+        if quality is None:
+            return chunk
+        with self._level_locks[level]:
+            cached = self._variants.get(level)
+            if cached and cached[0] >= version:
+                return cached[1]
+            smaller = self._offload(transcode_jpeg, jpeg, scale, quality)
+            variant = multipart_chunk(smaller) if smaller is not None else chunk
+            self._variants[level] = (version, variant)
+            return variant
+
+    def stream(self, timeout=5.0):
+        """Per-viewer generator of multipart chunks, newest frame only."""
+        viewer = Viewer(next(self._viewer_ids), len(self.levels) - 1)
+        self._viewers[viewer.id] = viewer
+        try:
+            version = 0
+            while True:
+                newest, chunk, jpeg = self._wait(version, timeout)
+                if chunk is None:
+                    continue
+                version = newest
+                out = self.chunk_for_level(version, chunk, jpeg, viewer.level)
+                interval = 1.0 / self.levels[viewer.level][2]
+                started = time.monotonic()
+                yield out
+                # The server writes the chunk before asking for the next
+                # one, so the time spent away is this viewer's send time
+                elapsed = time.monotonic() - started
+                viewer.record_send(len(out), elapsed, interval)
+                # Frames that came and were superseded while this one was
+                # transcoded and sent went stale; those passed over while
+                # pacing to the level's fps below are skipped on purpose
+                viewer.dropped += max(0, self._version - version - 1)
+                if elapsed < interval:
+                    time.sleep(interval - elapsed)
+        finally:
+            self._viewers.pop(viewer.id, None)